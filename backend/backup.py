@@ -0,0 +1,186 @@
+"""
+Sauvegarde à chaud de gridfinity.db (API de backup en ligne de SQLite).
+
+Copier le fichier pendant qu'uvicorn écrit donne une copie déchirée ; arrêter
+le service interrompt l'inventaire. Ici la copie passe par sqlite3.backup()
+dans un thread, par paquets de SCANGRID_BACKUP_PAGES pages, avec une courte
+pause entre deux paquets : le verrou de lecture est relâché entre les pas et
+les requêtes continuent. Si la base est modifiée pendant la copie, SQLite
+reprend la copie au pas suivant (comptée dans `restarts`) : le résultat est
+toujours un instantané cohérent.
+
+  - download()      : instantané temporaire, diffusé (gzip optionnel) puis supprimé
+  - backup_to_dir() : fichier horodaté dans SCANGRID_BACKUP_DIR, rotation
+                      des SCANGRID_BACKUP_KEEP plus récents
+
+En ligne de commande :
+    python backup.py [--gzip] [--dir DIR] [--keep N]
+
+Configuration (variables d'environnement) :
+  - SCANGRID_BACKUP_DIR       : répertoire des sauvegardes (défaut <SCANGRID_DB_DIR>/backups)
+  - SCANGRID_BACKUP_KEEP      : sauvegardes conservées par la rotation (7)
+  - SCANGRID_BACKUP_PAGES     : pages copiées par pas (256, soit 1 Mo en pages de 4 Ko)
+  - SCANGRID_BACKUP_PAUSE_MS  : pause entre deux pas (5 ms)
+"""
+import asyncio
+import gzip
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from database import DB_DIR, DB_PATH
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.getenv("SCANGRID_BACKUP_DIR", os.path.join(DB_DIR, "backups"))
+BACKUP_KEEP = int(os.getenv("SCANGRID_BACKUP_KEEP", "7"))
+BACKUP_PAGES = max(1, int(os.getenv("SCANGRID_BACKUP_PAGES", "256")))
+BACKUP_PAUSE = int(os.getenv("SCANGRID_BACKUP_PAUSE_MS", "5")) / 1000
+
+PREFIX = "gridfinity-"
+CHUNK = 64 * 1024
+
+# Une sauvegarde à la fois par worker (les suivantes attendent)
+_lock = asyncio.Lock()
+
+
+def _copy(source: str, target: str) -> dict:
+    """Copie source → target par pas de BACKUP_PAGES pages (exécuté dans un thread)"""
+    stats = {"pages": 0, "steps": 0, "restarts": 0}
+    remaining_before = None
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal remaining_before
+        stats["steps"] += 1
+        stats["pages"] = total
+        if remaining_before is not None and remaining > remaining_before:
+            stats["restarts"] += 1
+        remaining_before = remaining
+        if remaining and BACKUP_PAUSE:
+            # Laisse passer les écritures entre deux pas
+            time.sleep(BACKUP_PAUSE)
+
+    if not os.path.exists(source):
+        # sqlite3.connect créerait une base vide à sauvegarder
+        raise FileNotFoundError(source)
+    t0 = time.perf_counter()
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst, pages=BACKUP_PAGES, progress=progress)
+    finally:
+        dst.close()
+        src.close()
+    stats["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return stats
+
+
+def _gzip_file(source: str, target: str) -> None:
+    with open(source, "rb") as f_in, gzip.open(target, "wb", compresslevel=6) as f_out:
+        while chunk := f_in.read(CHUNK):
+            f_out.write(chunk)
+
+
+def _temp_path(directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".db")
+    os.close(fd)
+    return path
+
+
+def rotate(directory: str, keep: int) -> List[str]:
+    """Supprime les sauvegardes les plus anciennes au-delà de keep ; retourne les noms supprimés"""
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(PREFIX) and (name.endswith(".db") or name.endswith(".db.gz"))
+    )
+    removed = names[:-keep] if keep > 0 else names
+    for name in removed:
+        os.unlink(os.path.join(directory, name))
+    return removed
+
+
+async def backup_to_dir(
+    directory: Optional[str] = None,
+    compress: bool = False,
+    keep: Optional[int] = None,
+    source: Optional[str] = None,
+) -> dict:
+    """Sauvegarde horodatée dans directory, puis rotation ; retourne le rapport"""
+    directory = directory or BACKUP_DIR
+    keep = BACKUP_KEEP if keep is None else keep
+    source = source or DB_PATH
+    name = f"{PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db" + (".gz" if compress else "")
+    final = os.path.join(directory, name)
+    tmp = _temp_path(directory)
+
+    async with _lock:
+        try:
+            report = await asyncio.to_thread(_copy, source, tmp)
+            if compress:
+                await asyncio.to_thread(_gzip_file, tmp, final)
+            else:
+                os.replace(tmp, final)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        removed = await asyncio.to_thread(rotate, directory, keep)
+
+    report.update({"path": final, "bytes": os.path.getsize(final), "gzip": compress, "removed": removed})
+    logger.info(
+        "💾 Sauvegarde %s : %s pages en %s ms (%s pas, %s reprise(s))",
+        final, report["pages"], report["duration_ms"], report["steps"], report["restarts"],
+    )
+    return report
+
+
+def _stream(path: str, compress: bool) -> Iterator[bytes]:
+    """Diffuse le fichier (gzip à la volée) puis le supprime, même si le client abandonne"""
+    try:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK):
+                if compressor is None:
+                    yield chunk
+                elif data := compressor.compress(chunk):
+                    yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        os.unlink(path)
+
+
+async def download(compress: bool = False, source: Optional[str] = None):
+    """
+    Instantané cohérent prêt à diffuser : retourne (itérateur d'octets, nom de
+    fichier, rapport). Le fichier temporaire est supprimé en fin de diffusion.
+    """
+    source = source or DB_PATH
+    tmp = _temp_path(BACKUP_DIR)
+    async with _lock:
+        try:
+            report = await asyncio.to_thread(_copy, source, tmp)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    report.update({"bytes": os.path.getsize(tmp), "gzip": compress})
+    logger.info("💾 Instantané téléchargé : %s pages en %s ms", report["pages"], report["duration_ms"])
+    name = f"{PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S')}.db" + (".gz" if compress else "")
+    return _stream(tmp, compress), name, report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Sauvegarde à chaud de gridfinity.db")
+    parser.add_argument("--gzip", action="store_true", help="compresser la sauvegarde")
+    parser.add_argument("--dir", default=None, help=f"répertoire cible (défaut {BACKUP_DIR})")
+    parser.add_argument("--keep", type=int, default=None, help=f"sauvegardes conservées (défaut {BACKUP_KEEP})")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(backup_to_dir(args.dir, args.gzip, args.keep)), indent=2))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark in-process des endpoints chauds sur un inventaire synthétique.
+
+Génère un inventaire reproductible (graine), l'insère dans une base SQLite
+temporaire, puis chronomètre /locate, /bom/search, /bom/match, la liste et la
+lecture des tiroirs, la création de tiroir et le PATCH de boîte via un client
+ASGI (sans réseau). Les résultats JSON peuvent être comparés entre versions.
+
+Usage:
+    python bench_endpoints.py --drawers 50 --layers 3 --bins 40 -o avant.json
+    python bench_endpoints.py --drawers 50 --layers 3 --bins 40 --compare avant.json
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# La base temporaire doit être configurée avant l'import de database.py
+os.environ["SCANGRID_DB_DIR"] = tempfile.mkdtemp(prefix="scangrid-bench-")
+atexit.register(shutil.rmtree, os.environ["SCANGRID_DB_DIR"], ignore_errors=True)
+os.environ.setdefault("SCANGRID_SQL_DEBUG", "1")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+
+from database import async_session_maker, init_db  # noqa: E402
+from inventory_generator import generate_inventory, percentile, sample_queries, seed_database  # noqa: E402
+from main import app  # noqa: E402
+from query_budget import HEADER_COUNT  # noqa: E402
+
+
+def _summary(durations: list[float], queries: list[int]) -> dict:
+    ms = sorted(d * 1000.0 for d in durations)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 3),
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "max_ms": round(ms[-1], 3),
+        "sql_queries": int(statistics.median(queries)) if queries else None,
+    }
+
+
+async def _measure(client: AsyncClient, repeat: int, warmup: int, make_request) -> dict:
+    durations: list[float] = []
+    queries: list[int] = []
+    for i in range(warmup + repeat):
+        start = time.perf_counter()
+        response = await make_request(i)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url} → {response.status_code}: {response.text[:200]}")
+        if i >= warmup:
+            durations.append(elapsed)
+            if HEADER_COUNT in response.headers:
+                queries.append(int(response.headers[HEADER_COUNT]))
+    return _summary(durations, queries)
+
+
+async def run_benchmark(drawers: int, layers: int, bins: int, seed: int, repeat: int, warmup: int) -> dict:
+    await init_db()
+    inventory = generate_inventory(drawers, layers, bins, seed=seed)
+    async with async_session_maker() as session:
+        total_bins = await seed_database(session, inventory)
+
+    rng = random.Random(seed)
+    queries = sample_queries(inventory, count=max(repeat + warmup, 1), seed=seed)
+    bom_lines = sample_queries(inventory, count=20, seed=seed + 1)
+    extra_drawers = generate_inventory(repeat + warmup, 1, bins, seed=seed + 2)
+
+    results: dict = {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        listing = (await client.get("/api/drawers")).json()
+        drawer_ids = [d["drawer_id"] for d in listing]
+        bin_ids = [b["bin_id"] for d in listing for l in d["layers"] for b in l["bins"]]
+
+        results["locate"] = await _measure(
+            client, repeat, warmup,
+            lambda i: client.get("/api/locate", params={"query": queries[i % len(queries)]}),
+        )
+        results["bom_search"] = await _measure(
+            client, repeat, warmup,
+            lambda i: client.get("/api/bom/search", params={"q": queries[i % len(queries)]}),
+        )
+        results["bom_match"] = await _measure(
+            client, repeat, warmup,
+            lambda i: client.post("/api/bom/match", json={"lines": bom_lines}),
+        )
+        results["list_drawers"] = await _measure(
+            client, repeat, warmup, lambda i: client.get("/api/drawers"),
+        )
+        results["get_drawer"] = await _measure(
+            client, repeat, warmup,
+            lambda i: client.get(f"/api/drawers/{rng.choice(drawer_ids)}"),
+        )
+        results["update_bin"] = await _measure(
+            client, repeat, warmup,
+            lambda i: client.patch(
+                f"/api/bins/{rng.choice(bin_ids)}",
+                json={"x_grid": rng.randint(0, 5), "y_grid": rng.randint(0, 5)},
+            ),
+        )
+        results["create_or_replace_drawer"] = await _measure(
+            client, repeat, warmup,
+            lambda i: client.post("/api/drawers", json=extra_drawers[i]),
+        )
+
+    return {
+        "meta": {
+            "seed": seed,
+            "drawers": drawers,
+            "layers_per_drawer": layers,
+            "bins_per_layer": bins,
+            "total_bins": total_bins,
+            "repeat": repeat,
+            "warmup": warmup,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, max_ratio: float) -> bool:
+    """Affiche les écarts p50 par endpoint. Retourne False en cas de régression."""
+    ok = True
+    print(f"{'endpoint':<26}{'avant p50':>12}{'après p50':>12}{'ratio':>8}{'SQL':>10}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<26}{'—':>12}{cur['p50_ms']:>12.2f}{'—':>8}")
+            continue
+        ratio = cur["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+        sql = f"{base.get('sql_queries')}→{cur.get('sql_queries')}"
+        flag = ""
+        if ratio > max_ratio or (cur.get("sql_queries") or 0) > (base.get("sql_queries") or 0):
+            flag = "  ⚠️ régression"
+            ok = False
+        print(f"{name:<26}{base['p50_ms']:>12.2f}{cur['p50_ms']:>12.2f}{ratio:>8.2f}{sql:>10}{flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark des endpoints ScanGRID")
+    parser.add_argument("--drawers", type=int, default=20)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--bins", type=int, default=30, help="boîtes par couche")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("-o", "--output", help="fichier JSON de résultats")
+    parser.add_argument("--compare", help="résultats JSON de référence à comparer")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="ratio p50 toléré avant de signaler une régression")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("main").setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmark(
+        args.drawers, args.layers, args.bins, args.seed, args.repeat, args.warmup
+    ))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        return 0 if compare(report, baseline, args.max_regression) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
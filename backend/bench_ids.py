@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark UUID (36 caractères) contre ids courts (SCANGRID_SHORT_IDS=1).
+
+Le même inventaire synthétique (graine) est inséré dans deux bases
+temporaires, l'une avec des UUID, l'autre avec des ids courts. Pour chacune :
+taille des tables et des index (table virtuelle dbstat), durée des jointures
+bins → layers → drawers et project_bins → bins, des recherches par clé
+primaire, et poids JSON des lignes de boîtes.
+
+Usage:
+    python bench_ids.py --drawers 50 --layers 3 --bins 40 -o ids.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SCANGRID_DB_DIR", tempfile.mkdtemp(prefix="scangrid-bench-"))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+import bin_items  # noqa: E402,F401  (synchronisation de bin_items à chaque flush)
+import short_ids  # noqa: E402
+from database import Base  # noqa: E402
+from inventory_generator import generate_inventory, seed_database  # noqa: E402
+from models import Bin, Project, ProjectBin  # noqa: E402
+
+JOINS = {
+    "join_bins_layers_drawers": (
+        "SELECT d.name, COUNT(*), SUM(b.width_units) FROM bins b "
+        "JOIN layers l ON l.id = b.layer_id JOIN drawers d ON d.id = l.drawer_id GROUP BY d.id"
+    ),
+    "join_project_bins": (
+        "SELECT COUNT(*), SUM(pb.qty) FROM project_bins pb "
+        "JOIN bins b ON b.id = pb.bin_id JOIN layers l ON l.id = b.layer_id"
+    ),
+    "join_bin_items": (
+        "SELECT COUNT(*) FROM bin_items i JOIN bins b ON b.id = i.bin_id WHERE b.is_hole = 0"
+    ),
+}
+
+
+async def build(path: str, short: bool, drawers: int, layers: int, bins: int, seed: int) -> None:
+    short_ids.ENABLED = short
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        await seed_database(session, generate_inventory(drawers, layers, bins, seed=seed))
+        bin_ids = (await session.execute(select(Bin.id).order_by(Bin.x_grid, Bin.y_grid))).scalars().all()
+        rng = random.Random(seed)
+        for p in range(10):
+            project = Project(name=f"Projet {p}")
+            session.add(project)
+            await session.flush()
+            session.add_all(
+                ProjectBin(project_id=project.id, bin_id=bin_id, qty=rng.randint(1, 10))
+                for bin_id in rng.sample(bin_ids, min(len(bin_ids), 100))
+            )
+        await session.commit()
+    await engine.dispose()
+
+
+def _timed(conn: sqlite3.Connection, sql: str, params=(), repeat: int = 20) -> float:
+    durations = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        durations.append(time.perf_counter() - t0)
+    return round(statistics.median(durations) * 1000, 3)
+
+
+def measure(path: str, repeat: int) -> dict:
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    sizes = {
+        name: size
+        for name, size in conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY name")
+    }
+    indexes = {
+        name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    }
+    bin_ids = [row[0] for row in conn.execute("SELECT id FROM bins")]
+    lookups = random.Random(0).sample(bin_ids, min(len(bin_ids), 500))
+
+    def point_lookups():
+        for bin_id in lookups:
+            conn.execute("SELECT layer_id FROM bins WHERE id = ?", (bin_id,)).fetchone()
+
+    t = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        point_lookups()
+        t.append(time.perf_counter() - t0)
+
+    rows = conn.execute("SELECT id, layer_id, category_id, x_grid, y_grid FROM bins").fetchall()
+    report = {
+        "id_length": len(bin_ids[0]) if bin_ids else 0,
+        "file_bytes": os.path.getsize(path),
+        "table_bytes": sum(size for name, size in sizes.items() if name not in indexes),
+        "index_bytes": sum(size for name, size in sizes.items() if name in indexes),
+        "indexes": {name: size for name, size in sizes.items() if name in indexes},
+        "timings_ms": {name: _timed(conn, sql, repeat=repeat) for name, sql in JOINS.items()},
+        "bins_json_bytes": len(json.dumps([list(r) for r in rows])),
+    }
+    report["timings_ms"]["pk_lookup_x500"] = round(statistics.median(t) * 1000, 3)
+    conn.close()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark UUID / ids courts")
+    parser.add_argument("--drawers", type=int, default=50)
+    parser.add_argument("--layers", type=int, default=3)
+    parser.add_argument("--bins", type=int, default=40, help="boîtes par couche")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("-o", "--output", help="fichier JSON de résultats")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="scangrid-ids-")
+    try:
+        report = {"meta": {"drawers": args.drawers, "layers_per_drawer": args.layers,
+                           "bins_per_layer": args.bins, "seed": args.seed}}
+        for name, short in (("uuid", False), ("short", True)):
+            path = os.path.join(workdir, f"{name}.db")
+            asyncio.run(build(path, short, args.drawers, args.layers, args.bins, args.seed))
+            report[name] = measure(path, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    before, after = report["uuid"], report["short"]
+    print(f"{'mesure':<28}{'UUID':>12}{'courts':>12}{'ratio':>8}", file=sys.stderr)
+    rows = [("index_bytes", before["index_bytes"], after["index_bytes"]),
+            ("table_bytes", before["table_bytes"], after["table_bytes"]),
+            ("bins_json_bytes", before["bins_json_bytes"], after["bins_json_bytes"])]
+    rows += [(k, v, after["timings_ms"][k]) for k, v in before["timings_ms"].items()]
+    for name, b, a in rows:
+        print(f"{name:<28}{b:>12}{a:>12}{a / b if b else 0:>8.2f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
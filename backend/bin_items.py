@@ -0,0 +1,122 @@
+"""
+Table bin_items : articles des boîtes, extraits de content["items"].
+
+content["items"] reste la source de vérité exposée par l'API ; bin_items en
+est une copie normalisée et indexée (text_norm) pour les recherches SQL :
+
+  - après chaque flush ORM, les lignes des boîtes créées, dont le content a
+    changé ou supprimées sont réécrites (un DELETE + un INSERT multi-lignes
+    par flush, quel que soit l'endpoint d'écriture) ;
+  - backfill() remplit la table depuis les content existants (migration,
+    lancée au démarrage si la table est vide, ou via migrate_bin_items.py).
+
+Quantité : lue dans le texte quand elle est explicite (« 10x vis M3 »,
+« vis M3 x10 », « 25 pcs entretoise »), sinon NULL.
+"""
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm import Session
+
+from inventory_snapshot import normalize_string
+from models import Bin, BinItem
+
+logger = logging.getLogger(__name__)
+
+_QTY_PATTERNS = (
+    re.compile(r"^\s*(\d{1,5})\s*[x×]\s+", re.IGNORECASE),
+    re.compile(r"\s[x×]\s?(\d{1,5})\s*$", re.IGNORECASE),
+    re.compile(r"(?:^|\s)(\d{1,5})\s*(?:pcs|pces?|pi[eè]ces?)\b", re.IGNORECASE),
+)
+
+BACKFILL_CHUNK = 500
+
+
+def parse_qty(text: str) -> Optional[int]:
+    for pattern in _QTY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def item_rows(bin_id: str, content: Optional[Dict[str, Any]]) -> List[dict]:
+    """Lignes bin_items d'une boîte (même ordre que content["items"])"""
+    items = (content or {}).get("items") or []
+    return [
+        {
+            "bin_id": bin_id,
+            "position": position,
+            "text": str(item),
+            "text_norm": normalize_string(str(item)).strip(),
+            "qty": parse_qty(str(item)),
+        }
+        for position, item in enumerate(items)
+    ]
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_bin_items(session: Session, flush_context) -> None:
+    # Historique des attributs encore disponible dans after_flush
+    changed = [obj for obj in session.new if isinstance(obj, Bin)]
+    changed += [
+        obj for obj in session.dirty
+        if isinstance(obj, Bin) and inspect(obj).attrs.content.history.has_changes()
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Bin)]
+    if not changed and not deleted:
+        return
+
+    conn = session.connection()
+    conn.execute(delete(BinItem).where(BinItem.bin_id.in_([b.id for b in changed] + deleted)))
+    rows = [row for bin_obj in changed for row in item_rows(bin_obj.id, bin_obj.content)]
+    if rows:
+        conn.execute(insert(BinItem), rows)
+
+
+async def backfill(conn: AsyncConnection, force: bool = False) -> int:
+    """Remplit bin_items depuis bins.content (sans effet si déjà rempli, sauf force=True)"""
+    if not force and (await conn.execute(select(BinItem.bin_id).limit(1))).first() is not None:
+        return 0
+    if force:
+        await conn.execute(delete(BinItem))
+    result = await conn.execute(select(Bin.id, Bin.content))
+    rows: List[dict] = []
+    total = 0
+    for bin_id, content in result:
+        rows.extend(item_rows(bin_id, content))
+        if len(rows) >= BACKFILL_CHUNK:
+            await conn.execute(insert(BinItem), rows)
+            total += len(rows)
+            rows = []
+    if rows:
+        await conn.execute(insert(BinItem), rows)
+        total += len(rows)
+    if total:
+        logger.info("✅ bin_items : %s article(s) extrait(s) des content JSON", total)
+    return total
+
+
+async def search(db: AsyncSession, query: str, limit: int = 50) -> List[BinItem]:
+    """Articles dont le texte normalisé commence par query (parcours de l'index text_norm)"""
+    prefix = normalize_string(query).strip()
+    if not prefix:
+        return []
+    # Intervalle [prefix, prefix + U+FFFF) : utilisable par l'index, contrairement à LIKE
+    stmt = (
+        select(BinItem)
+        .where(BinItem.text_norm >= prefix, BinItem.text_norm < prefix + "\uffff")
+        .order_by(BinItem.text_norm, BinItem.bin_id, BinItem.position)
+        .limit(limit)
+    )
+    return list((await db.execute(stmt)).scalars())
+
+
+def describe(items: Iterable[BinItem]) -> List[dict]:
+    return [
+        {"bin_id": i.bin_id, "position": i.position, "text": i.text, "qty": i.qty}
+        for i in items
+    ]
@@ -0,0 +1,281 @@
+"""
+Analyse déterministe des lignes de BOM, avant tout appel au LLM.
+
+La plupart des lignes d'une nomenclature suivent quelques formes régulières :
+
+    R1 10k 0603              C3 100nF 0402 x4          U1 NE555 DIP-8
+    R5-R8 4k7 1% 0805        2x Condensateur 10µF 16V  LED1,LED2 rouge ← ambiguë
+
+parse_line() découpe la ligne en jetons et reconnaît repères (R1, LED2,
+R5-R8), valeurs avec unité (10k, 4k7, 2R2, 100nF, 10µH, 16MHz), boîtiers
+(0603, SOT-23, SOIC-8…), quantités (x4, 4x, 4 pcs, qté 4, entier isolé),
+références fabricant (NE555, 1N4148) et précisions (1%, 16V, X7R, 1/4W).
+Une ligne n'est acceptée que si chaque jeton est reconnu et que le composant
+est identifié (type + valeur, ou référence fabricant) ; sinon elle est
+« ambiguë » et part au LLM (features/ai.py). En-têtes de colonnes et numéros
+de page sont ignorés sans appel au modèle.
+
+Les composants produits ont la même forme que ceux du LLM (designation,
+qty, reference, package) et sont fusionnés avec eux par désignation.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from inventory_snapshot import normalize_string
+
+RULES = "rules"
+LLM = "llm"
+IGNORED = "ignored"
+# Lignes ambiguës restées sans réponse (LLM indisponible)
+UNRESOLVED = "unresolved"
+
+# Préfixe du repère → type de composant
+_PREFIX_KIND = {
+    "R": "resistor", "C": "capacitor", "L": "inductor", "D": "diode", "LED": "led",
+    "Q": "transistor", "T": "transistor", "U": "ic", "IC": "ic", "Y": "crystal", "X": "crystal",
+    "F": "fuse", "FB": "ferrite", "J": "connector", "P": "connector", "CN": "connector",
+    "SW": "switch", "K": "relay",
+}
+# Mots (sans accents, minuscules) désignant le type
+_KIND_WORDS = {
+    "resistance": "resistor", "resistances": "resistor", "resistor": "resistor", "resistors": "resistor",
+    "condensateur": "capacitor", "condensateurs": "capacitor", "capacitor": "capacitor",
+    "capacitors": "capacitor", "capa": "capacitor",
+    "inductance": "inductor", "inductances": "inductor", "inductor": "inductor", "self": "inductor",
+    "diode": "diode", "diodes": "diode", "led": "led", "leds": "led",
+    "transistor": "transistor", "transistors": "transistor", "mosfet": "transistor",
+    "quartz": "crystal", "crystal": "crystal",
+    "fusible": "fuse", "fuse": "fuse", "ferrite": "ferrite",
+    "connecteur": "connector", "connector": "connector",
+    "interrupteur": "switch", "switch": "switch", "relais": "relay", "relay": "relay",
+}
+_LABELS = {
+    "resistor": "Résistance", "capacitor": "Condensateur", "inductor": "Inductance",
+    "diode": "Diode", "led": "LED", "transistor": "Transistor", "crystal": "Quartz",
+    "fuse": "Fusible", "ferrite": "Ferrite", "connector": "Connecteur", "switch": "Interrupteur",
+    "relay": "Relais", "ic": "",
+}
+# Types dont la valeur suffit à identifier le composant
+_VALUE_KINDS = {"resistor", "capacitor", "inductor", "crystal"}
+
+# Mots sans information pour l'identification (jetés)
+_FILLER = {"cms", "smd", "tht", "traversant", "-", "/", "|", ":", "de", "of"}
+_QTY_WORDS = {"pcs", "pc", "pces", "pce", "pieces", "piece", "ea", "units"}
+_QTY_PREFIX = {"qty", "qte", "quantite", "quantity", "qty:", "qte:"}
+_HEADER_WORDS = {
+    "designator", "designators", "reference", "references", "ref", "refs", "repere", "reperes",
+    "value", "valeur", "package", "boitier", "footprint", "qty", "qte", "quantite", "quantity",
+    "description", "designation", "part", "partnumber", "mpn", "manufacturer", "fabricant",
+    "comment", "#", "item", "no", "n°", "bom",
+}
+
+_SEPARATORS = re.compile(r"[\s,;\t]+")
+_DESIGNATOR = re.compile(r"^([A-Z]{1,3})(\d{1,4})$")
+_DESIGNATOR_RANGE = re.compile(r"^([A-Z]{1,3})(\d{1,4})[-–]([A-Z]{1,3})?(\d{1,4})$")
+_RKM = re.compile(r"^(\d+)([RKM])(\d+)$", re.IGNORECASE)
+_RESISTANCE = re.compile(r"^(\d+(?:[.,]\d+)?)([kKmMG]?)(Ω|ohms?|R)?$")
+_CAPACITANCE = re.compile(r"^(\d+(?:[.,]\d+)?)([pnuµμm])F$", re.IGNORECASE)
+_INDUCTANCE = re.compile(r"^(\d+(?:[.,]\d+)?)([pnuµμm]?)H$")
+_FREQUENCY = re.compile(r"^(\d+(?:[.,]\d+)?)([kMG]?)Hz$", re.IGNORECASE)
+_CURRENT = re.compile(r"^\d+(?:[.,]\d+)?m?A$")
+_EXTRA = re.compile(
+    r"^(?:±?\d+(?:[.,]\d+)?%|\d+(?:[.,]\d+)?[mk]?V|\d+/\d+W|\d+(?:[.,]\d+)?m?W|X5R|X7R|X7S|C0G|NP0|Y5V)$",
+    re.IGNORECASE,
+)
+_PACKAGE = re.compile(
+    r"^(?:0201|0402|0603|0805|1206|1210|1812|2010|2512"
+    r"|(?:SOT|SOD|SOIC|SO|TSSOP|SSOP|MSOP|QFN|DFN|LQFP|TQFP|QFP|DIP|PDIP|TO|SIP|SOP)-?\d+[A-Z]?(?:-\d+)?"
+    r"|SMA|SMB|SMC|DPAK|D2PAK|MELF|MINIMELF)$",
+    re.IGNORECASE,
+)
+_QTY_MARK = re.compile(r"^(?:[x×](\d{1,5})|(\d{1,5})[x×])$", re.IGNORECASE)
+_INTEGER = re.compile(r"^\d{1,5}$")
+_PART_NUMBER = re.compile(r"^(?=.*[A-Za-z])(?=.*\d)[A-Za-z0-9][A-Za-z0-9.\-/+]{2,}$")
+_PAGE = re.compile(r"^(?:page|p\.)\s*\d+(?:\s*(?:/|sur|of)\s*\d+)?$", re.IGNORECASE)
+
+_MULTIPLIERS = {"": "", "k": "k", "K": "k", "m": "m", "M": "M", "G": "G"}
+_RKM_MULTIPLIERS = {"R": "", "K": "k", "M": "M"}
+_SUBMULTIPLIERS = {"p": "p", "n": "n", "u": "µ", "µ": "µ", "μ": "µ", "m": "m", "": ""}
+_DIELECTRICS = {"X5R", "X7R", "X7S", "C0G", "NP0", "Y5V"}
+
+
+@dataclass
+class ParsedLine:
+    designation: str
+    qty: int = 1
+    reference: str = ""
+    package: str = ""
+
+
+def _number(text: str) -> str:
+    return text.replace(",", ".")
+
+
+def _resistance(token: str) -> Optional[Tuple[str, bool]]:
+    """(valeur normalisée, unité explicite) pour 10k, 4k7, 2R2, 100R, 10kΩ"""
+    match = _RKM.match(token)
+    if match:
+        whole, mult, frac = match.groups()
+        return f"{whole}.{frac}{_RKM_MULTIPLIERS[mult.upper()]}Ω", mult.upper() == "R"
+    match = _RESISTANCE.match(token)
+    if match and (match.group(2) or match.group(3)):
+        return f"{_number(match.group(1))}{_MULTIPLIERS[match.group(2)]}Ω", bool(match.group(3))
+    return None
+
+
+def _value(token: str) -> Optional[Tuple[str, str, bool]]:
+    """(valeur normalisée, type de composant, unité explicite) ou None"""
+    match = _CAPACITANCE.match(token)
+    if match:
+        return f"{_number(match.group(1))}{_SUBMULTIPLIERS[match.group(2).lower()]}F", "capacitor", True
+    match = _INDUCTANCE.match(token)
+    if match:
+        return f"{_number(match.group(1))}{_SUBMULTIPLIERS[match.group(2)]}H", "inductor", True
+    match = _FREQUENCY.match(token)
+    if match:
+        return f"{_number(match.group(1))}{match.group(2)}Hz", "crystal", True
+    resistance = _resistance(token)
+    if resistance:
+        return resistance[0], "resistor", resistance[1]
+    return None
+
+
+def _package(token: str) -> str:
+    package = token.upper()
+    match = re.match(r"^([A-Z]+)-?(\d.*)$", package)
+    return f"{match.group(1)}-{match.group(2)}" if match else package
+
+
+def _designators(token: str) -> Optional[Tuple[str, int]]:
+    """(préfixe, nombre de composants) pour R1, LED2 ou R5-R8"""
+    match = _DESIGNATOR.match(token)
+    if match and match.group(1) in _PREFIX_KIND:
+        return match.group(1), 1
+    match = _DESIGNATOR_RANGE.match(token)
+    if match and match.group(1) in _PREFIX_KIND and match.group(3) in (None, match.group(1)):
+        first, last = int(match.group(2)), int(match.group(4))
+        if last > first:
+            return match.group(1), last - first + 1
+    return None
+
+
+def is_ignorable(line: str) -> bool:
+    """En-tête de colonnes, numéro de page ou ligne sans contenu"""
+    stripped = line.strip()
+    if len(stripped) < 3 or _PAGE.match(stripped):
+        return True
+    words = [normalize_string(w) for w in _SEPARATORS.split(stripped) if w]
+    return all(w in _HEADER_WORDS or w in _FILLER for w in words)
+
+
+def parse_line(line: str) -> Optional[ParsedLine]:
+    """Composant de la ligne, ou None si elle est ambiguë (à confier au LLM)"""
+    tokens = [t for t in _SEPARATORS.split(line.strip()) if t]
+    kind: Optional[str] = None
+    references: List[str] = []
+    designator_count = 0
+    value: Optional[Tuple[str, str, bool]] = None
+    part_number = package = None
+    extras: List[str] = []
+    qty: Optional[int] = None
+    integers: List[str] = []
+
+    def set_kind(new_kind: str) -> bool:
+        nonlocal kind
+        if kind not in (None, new_kind):
+            return False
+        kind = new_kind
+        return True
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        word = normalize_string(token)
+        i += 1
+
+        designators = _designators(token)
+        if designators:
+            if not set_kind(_PREFIX_KIND[designators[0]]):
+                return None
+            references.append(token)
+            designator_count += designators[1]
+        elif word in _KIND_WORDS:
+            if not set_kind(_KIND_WORDS[word]):
+                return None
+        elif word in _FILLER:
+            continue
+        elif word in _QTY_PREFIX and i < len(tokens) and _INTEGER.match(tokens[i]):
+            if qty is not None:
+                return None
+            qty = int(tokens[i])
+            i += 1
+        elif word in _QTY_WORDS and integers:
+            if qty is not None:
+                return None
+            qty = int(integers.pop())
+        elif _QTY_MARK.match(token):
+            if qty is not None:
+                return None
+            match = _QTY_MARK.match(token)
+            qty = int(match.group(1) or match.group(2))
+        elif _PACKAGE.match(token):
+            if package is not None:
+                return None
+            package = _package(token)
+        elif _INTEGER.match(token):
+            integers.append(token)
+        elif _value(token):
+            if value is not None:
+                return None
+            value = _value(token)
+        elif _EXTRA.match(token) or _CURRENT.match(token):
+            extras.append(token.upper() if token.upper() in _DIELECTRICS else token)
+        elif _PART_NUMBER.match(token):
+            if part_number is not None:
+                return None
+            part_number = token
+        else:
+            # Mot libre (couleur, fabricant, commentaire…) : au LLM
+            return None
+
+    # Entier isolé : valeur d'une résistance (« R1 100 »), sinon quantité
+    if integers and kind == "resistor" and value is None:
+        value = (f"{integers.pop(0)}Ω", "resistor", True)
+    if len(integers) > 1 or (integers and qty is not None):
+        return None
+    if integers:
+        qty = int(integers[0])
+
+    if value is not None:
+        text, value_kind, explicit = value
+        if kind is None:
+            # « 10k » seul : résistance probable, mais rien ne le confirme
+            if not explicit:
+                return None
+            kind = value_kind
+        elif kind != value_kind:
+            return None
+    if kind in _VALUE_KINDS and value is None:
+        return None
+    if part_number is None and (value is None or kind is None):
+        return None
+
+    parts = [_LABELS.get(kind, "") if kind else "", part_number, value[0] if value else None, *extras, package]
+    designation = " ".join(p for p in parts if p)
+    if qty is None:
+        qty = designator_count or 1
+    return ParsedLine(designation=designation, qty=max(1, qty), reference=",".join(references),
+                      package=package or "")
+
+
+def classify(lines: List[str]) -> List[Tuple[str, str, Optional[ParsedLine]]]:
+    """(ligne, chemin, composant) pour chaque ligne : rules, ignored ou llm"""
+    results = []
+    for line in lines:
+        if is_ignorable(line):
+            results.append((line, IGNORED, None))
+            continue
+        parsed = parse_line(line)
+        results.append((line, RULES if parsed else LLM, parsed))
+    return results
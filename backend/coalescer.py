@@ -0,0 +1,169 @@
+"""
+Regroupement des PATCH /api/bins/{bin_id} (glisser-déposer dans l'éditeur 3D).
+
+Un déplacement de boîte envoie des rafales de PATCH sur la même boîte. Avec
+SCANGRID_COALESCE_MS > 0, la première requête d'une rafale devient « meneuse » :
+elle attend la fenêtre, prend le verrou d'écriture, puis applique en une seule
+transaction toutes les mises à jour reçues entre-temps (dans l'ordre d'arrivée,
+toutes boîtes confondues). Chaque requête reçoit l'état final de sa boîte.
+
+Une requête invalide (couche destination inconnue) échoue seule : les autres
+mises à jour du lot sont appliquées.
+
+Configuration (variables d'environnement) :
+  - SCANGRID_COALESCE_MS : fenêtre de regroupement en ms (0 = désactivé, défaut)
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import inventory_snapshot
+import metrics
+import response_cache
+from database import write_transaction
+from models import Bin, Category, Layer
+from schemas import BinResponse
+
+logger = logging.getLogger(__name__)
+
+COALESCE_MS = float(os.getenv("SCANGRID_COALESCE_MS", "0"))
+
+
+class _Batch:
+    """Mises à jour en attente, par boîte, dans l'ordre d'arrivée"""
+
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries: Dict[str, List[Tuple[dict, asyncio.Future]]] = {}
+
+    def futures(self):
+        return [fut for entries in self.entries.values() for _, fut in entries]
+
+
+class BinUpdateCoalescer:
+    def __init__(self, window_ms: float = 0.0):
+        self.window = window_ms / 1000.0
+        self._batch: Optional[_Batch] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def submit(self, db: AsyncSession, bin_id: str, changes: dict) -> BinResponse:
+        """Met à jour une boîte (éventuellement avec d'autres) et retourne son état final"""
+        metrics.BIN_UPDATES.inc()
+        fut = asyncio.get_running_loop().create_future()
+        batch = self._batch if self.enabled else None
+        if batch is not None:
+            batch.entries.setdefault(bin_id, []).append((changes, fut))
+            return await fut
+
+        batch = _Batch()
+        batch.entries[bin_id] = [(changes, fut)]
+        if self.enabled:
+            self._batch = batch
+        try:
+            if self.enabled:
+                await asyncio.sleep(self.window)
+            async with write_transaction(db):
+                # Les requêtes arrivées pendant l'attente du verrou rejoignent encore le lot
+                if self._batch is batch:
+                    self._batch = None
+                await self._apply(db, batch)
+        except BaseException as exc:
+            if self._batch is batch:
+                self._batch = None
+            for pending in batch.futures():
+                if pending.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    pending.cancel()
+                else:
+                    pending.set_exception(exc)
+            raise
+        return await fut
+
+    async def _apply(self, db: AsyncSession, batch: _Batch) -> None:
+        result = await db.execute(select(Bin).where(Bin.id.in_(list(batch.entries))))
+        bins = {bin_obj.id: bin_obj for bin_obj in result.scalars()}
+
+        layer_ids = {
+            changes["layer_id"]
+            for entries in batch.entries.values() for changes, _ in entries
+            if "layer_id" in changes
+        }
+        known_layers = set()
+        if layer_ids:
+            known_layers = set((await db.execute(select(Layer.id).where(Layer.id.in_(layer_ids)))).scalars())
+        # Clés étrangères actives : une catégorie inconnue ferait échouer tout le lot
+        category_ids = {
+            changes["category_id"]
+            for entries in batch.entries.values() for changes, _ in entries
+            if changes.get("category_id") is not None
+        }
+        known_categories = set()
+        if category_ids:
+            known_categories = set(
+                (await db.execute(select(Category.id).where(Category.id.in_(category_ids)))).scalars()
+            )
+
+        applied: List[Tuple[Bin, asyncio.Future]] = []
+        tags = {"inventory"}
+        for bin_id, entries in batch.entries.items():
+            bin_obj = bins.get(bin_id)
+            if bin_obj is None:
+                logger.warning("⚠️ Boîte non trouvée: %s", bin_id)
+                for _, fut in entries:
+                    if not fut.done():
+                        fut.set_exception(HTTPException(
+                            status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Boîte {bin_id} non trouvée"
+                        ))
+                continue
+            for changes, fut in entries:
+                new_layer_id = changes.get("layer_id")
+                if new_layer_id is not None and new_layer_id not in known_layers:
+                    if not fut.done():
+                        fut.set_exception(HTTPException(
+                            status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Couche destination {new_layer_id} non trouvée"
+                        ))
+                    continue
+                new_category_id = changes.get("category_id")
+                if new_category_id is not None and new_category_id not in known_categories:
+                    if not fut.done():
+                        fut.set_exception(HTTPException(
+                            status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Catégorie {new_category_id} non trouvée"
+                        ))
+                    continue
+                # Ancienne et nouvelle couche : les deux tiroirs en cache sont périmés
+                tags.update((f"bin:{bin_id}", f"layer:{bin_obj.layer_id}"))
+                for field, value in changes.items():
+                    setattr(bin_obj, field, value)
+                tags.add(f"layer:{bin_obj.layer_id}")
+                applied.append((bin_obj, fut))
+
+        if not applied:
+            return
+        await db.commit()
+        metrics.BIN_UPDATE_COMMITS.inc()
+        inventory_snapshot.store.bins_changed({id(b): b for b, _ in applied}.values())
+        response_cache.invalidate(*tags)
+        if len(applied) > 1:
+            logger.info("📦 %d mise(s) à jour de boîtes regroupée(s) en un commit (%d boîte(s))",
+                        len(applied), len({id(b) for b, _ in applied}))
+        # Tous les demandeurs d'une même boîte reçoivent son état final
+        # (un suiveur annulé entre-temps n'attend plus rien : commit conservé)
+        for bin_obj, fut in applied:
+            if not fut.done():
+                fut.set_result(BinResponse.model_validate(bin_obj))
+
+
+bin_updates = BinUpdateCoalescer(COALESCE_MS)
@@ -0,0 +1,93 @@
+"""
+Fixtures partagées pour les tests de l'API ScanGRID
+"""
+import os
+import tempfile
+
+# Isoler la base de données des tests avant tout import de database.py
+os.environ.setdefault("SCANGRID_DB_DIR", tempfile.mkdtemp(prefix="scangrid-test-"))
+# En-têtes X-SQL-Query-Count sur chaque réponse pour surveiller les régressions
+os.environ.setdefault("SCANGRID_SQL_DEBUG", "1")
+
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import inventory_snapshot
+import metrics
+import query_budget
+import response_cache
+from main import app
+from database import Base, configure_sqlite, get_db
+
+# Cache de réponses désactivé par défaut : les tests l'activent sur ces routes
+CACHE_ROUTES = "list_categories,get_drawer,locate_box,bom_search"
+
+
+@pytest_asyncio.fixture
+async def client():
+    """Client HTTP branché sur une base SQLite en mémoire, neuve à chaque test"""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    # Mêmes PRAGMA que la base réelle (clés étrangères : cascades des suppressions)
+    event.listen(engine.sync_engine, "connect", configure_sqlite)
+    metrics.instrument_engine(engine)
+    query_budget.instrument_engine(engine)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _get_db():
+        async with session_maker() as session:
+            yield session
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # L'instantané mémoire et le cache de réponses reflètent la base précédente
+    inventory_snapshot.store.clear()
+    response_cache.clear()
+    previous_routes = response_cache.cache.routes
+    response_cache.cache.routes = response_cache.parse_routes(CACHE_ROUTES, response_cache.TTL)
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = _get_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            yield c
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous
+        inventory_snapshot.store.clear()
+        response_cache.clear()
+        response_cache.cache.routes = previous_routes
+        await engine.dispose()
+
+
+def bin_spec(x, title, items=()):
+    """Boîte 1×1 de la rangée 0 en colonne x, pour create_drawer"""
+    return {"x_grid": x, "y_grid": 0, "width_units": 1, "depth_units": 1,
+            "content": {"title": title, "items": list(items)}}
+
+
+async def create_drawer(client, name="Tiroir Test", bins=None):
+    """Crée un tiroir à une couche via l'API et retourne le JSON de réponse"""
+    bins = bins if bins is not None else [
+        {"x_grid": 0, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": "Résistances 10k", "items": ["10k 0603"]}},
+    ]
+    response = await client.post("/api/drawers", json={
+        "name": name, "width_units": 10, "depth_units": 10,
+        "layers": [{"z_index": 0, "bins": bins}],
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def sql_count(response):
+    """Nombre de requêtes SQL d'une réponse (en-tête X-SQL-Query-Count)"""
+    return int(response.headers[query_budget.HEADER_COUNT])
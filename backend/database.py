@@ -2,17 +2,25 @@
 Configuration de la base de données SQLite avec SQLAlchemy 2.0
 """
 import os
+from contextlib import asynccontextmanager
+from fastapi import Depends
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
 import logging
 
+import metrics
+import query_budget
+import writer
+
 logger = logging.getLogger(__name__)
 
 # Répertoire persistant pour la base de données
 DB_DIR = os.getenv("SCANGRID_DB_DIR", "/var/lib/scangrid")
 os.makedirs(DB_DIR, exist_ok=True)
 
-DATABASE_URL = f"sqlite+aiosqlite:///{DB_DIR}/gridfinity.db"
+DB_PATH = os.path.join(DB_DIR, "gridfinity.db")
+DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
 # Création du moteur asynchrone
 engine = create_async_engine(
@@ -20,6 +28,30 @@ engine = create_async_engine(
     echo=False,  # Mettre à True pour voir les requêtes SQL en dev
     future=True,
 )
+# Journal WAL : les lectures des autres workers ne bloquent pas pendant une écriture.
+# synchronous=NORMAL : en WAL, pas de fsync à chaque commit (seulement aux checkpoints)
+SQLITE_JOURNAL_MODE = os.getenv("SCANGRID_SQLITE_JOURNAL", "WAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SCANGRID_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    # ON DELETE CASCADE / SET NULL appliqués par SQLite (désactivés par défaut)
+    cursor.execute("PRAGMA foreign_keys=ON")
+    if SQLITE_JOURNAL_MODE:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        if SQLITE_JOURNAL_MODE.upper() == "WAL":
+            cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+event.listen(engine.sync_engine, "connect", configure_sqlite)
+
+# Compteurs / durées des requêtes SQL pour /api/metrics
+metrics.instrument_engine(engine)
+# Budget SQL par requête HTTP (actif si SCANGRID_SQL_DEBUG=1)
+query_budget.instrument_engine(engine)
 
 # Session factory
 async_session_maker = async_sessionmaker(
@@ -29,6 +61,15 @@ async_session_maker = async_sessionmaker(
 )
 
 
+# Verrou d'écriture partagé entre workers + compteur de génération (writer.py)
+write_coordinator = writer.WriteCoordinator(DB_DIR)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session):
+    session.info["committed"] = True
+
+
 class Base(DeclarativeBase):
     """Classe de base pour tous les modèles SQLAlchemy"""
     pass
@@ -36,9 +77,11 @@ class Base(DeclarativeBase):
 
 async def init_db():
     """Initialise la base de données en créant toutes les tables"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info(f"Base de données initialisée à {DATABASE_URL}")
+    # Un seul worker crée le schéma à la fois
+    async with write_coordinator.write_lock():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    logger.info("Base de données initialisée à %s", DATABASE_URL)
 
 
 async def get_db():
@@ -48,3 +91,24 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+
+@asynccontextmanager
+async def write_transaction(session: AsyncSession):
+    """
+    Section d'écriture : verrou partagé entre workers, puis signalement du
+    commit (compteur de génération) pour invalider les caches des autres workers.
+    """
+    async with write_coordinator.write_lock():
+        try:
+            yield session
+        finally:
+            if session.info.pop("committed", False):
+                write_coordinator.bump_generation()
+
+
+async def get_write_db(session: AsyncSession = Depends(get_db)):
+    """Session pour les endpoints qui modifient la base (verrou tenu pendant toute la requête)"""
+    async with write_transaction(session):
+        yield session
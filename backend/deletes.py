@@ -0,0 +1,139 @@
+"""
+Suppressions ensemblistes (tiroirs, catégories, projets, boîtes).
+
+Un seul DELETE sur la ligne parente : SQLite applique les ON DELETE CASCADE
+du schéma (PRAGMA foreign_keys=ON, database.configure_sqlite) :
+
+    drawers → layers → bins → bin_items      (CASCADE)
+    categories → bins.category_id            (UPDATE … SET NULL explicite)
+    projects → project_bins                  (CASCADE)
+
+Les bases migrées par migrate_categories.py ont reçu bins.category_id par
+ALTER TABLE, sans clé étrangère : delete_category remet donc les boîtes à
+NULL par un UPDATE ensembliste avant le DELETE au lieu de compter sur SET NULL.
+
+Aucun enfant n'est chargé en mémoire : supprimer un tiroir de 500 boîtes
+coûte le même nombre de requêtes qu'un tiroir vide, dans une transaction.
+Les relations portent passive_deletes=True pour que l'ORM s'en remette
+aussi à la base.
+
+project_bins.bin_id est une référence souple (pas de clé étrangère, un projet
+garde la trace d'un composant disparu). SCANGRID_PROJECT_BIN_ON_DELETE décide
+de son sort quand la boîte est supprimée :
+  - keep (défaut) : la ligne reste comme pierre tombale (qté, note), affichée
+    « [Bin supprimé: …] » / found=false dans le projet ;
+  - delete : les associations partent dans la même transaction ; les ids des
+    projets touchés sont retournés à l'appelant (invalidation du cache).
+purge_orphan_project_bins() nettoie après coup les références mortes.
+
+Usage (nettoyage des références mortes) :
+    python deletes.py --purge-project-bins
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from models import Bin, Category, Drawer, Layer, Project, ProjectBin
+
+logger = logging.getLogger(__name__)
+
+PROJECT_BIN_POLICIES = ("keep", "delete")
+PROJECT_BIN_POLICY = os.getenv("SCANGRID_PROJECT_BIN_ON_DELETE", "keep")
+if PROJECT_BIN_POLICY not in PROJECT_BIN_POLICIES:
+    logger.warning("⚠️ SCANGRID_PROJECT_BIN_ON_DELETE=%s inconnu, 'keep' utilisé", PROJECT_BIN_POLICY)
+    PROJECT_BIN_POLICY = "keep"
+
+
+async def _drop_project_bins(db: AsyncSession, bin_ids: Union[Select, Iterable[str]]) -> List[str]:
+    """
+    Applique la politique des références souples aux boîtes bin_ids (ids ou
+    sous-requête) ; retourne les ids des projets dont des lignes sont parties.
+    """
+    if PROJECT_BIN_POLICY != "delete":
+        return []
+    result = await db.execute(
+        delete(ProjectBin).where(ProjectBin.bin_id.in_(bin_ids)).returning(ProjectBin.project_id)
+    )
+    return sorted(set(result.scalars()))
+
+
+async def delete_drawer(db: AsyncSession, drawer_id: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Supprime un tiroir, ses couches, boîtes et articles (cascade SQL).
+    Retourne (ids des couches supprimées, ids des projets touchés) pour
+    l'invalidation du cache, None si le tiroir n'existe pas. Le commit reste
+    à l'appelant.
+    """
+    layer_ids = (await db.execute(select(Layer.id).where(Layer.drawer_id == drawer_id))).scalars().all()
+    project_ids = await _drop_project_bins(db, select(Bin.id).join(Layer).where(Layer.drawer_id == drawer_id))
+    result = await db.execute(delete(Drawer).where(Drawer.id == drawer_id))
+    if not result.rowcount:
+        return None
+    return list(layer_ids), project_ids
+
+
+async def delete_bin(db: AsyncSession, bin_id: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Supprime une boîte et ses articles ; retourne (id de sa couche, ids des
+    projets touchés), None si absente
+    """
+    layer_id = await db.scalar(select(Bin.layer_id).where(Bin.id == bin_id))
+    if layer_id is None:
+        return None
+    project_ids = await _drop_project_bins(db, [bin_id])
+    await db.execute(delete(Bin).where(Bin.id == bin_id))
+    return layer_id, project_ids
+
+
+async def delete_category(db: AsyncSession, category_id: str) -> bool:
+    """Supprime une catégorie ; ses boîtes passent à category_id NULL"""
+    # Pas de SET NULL sur les bases où category_id a été ajoutée par ALTER TABLE
+    await db.execute(update(Bin).where(Bin.category_id == category_id).values(category_id=None))
+    result = await db.execute(delete(Category).where(Category.id == category_id))
+    return bool(result.rowcount)
+
+
+async def delete_project(db: AsyncSession, project_id: str) -> bool:
+    """Supprime un projet et ses associations (CASCADE)"""
+    result = await db.execute(delete(Project).where(Project.id == project_id))
+    return bool(result.rowcount)
+
+
+async def purge_orphan_project_bins(db: AsyncSession) -> int:
+    """Supprime les associations de projet dont la boîte n'existe plus"""
+    result = await db.execute(
+        delete(ProjectBin).where(~exists().where(Bin.id == ProjectBin.bin_id))
+    )
+    return result.rowcount
+
+
+async def _purge() -> int:
+    from database import async_session_maker, write_transaction
+
+    async with async_session_maker() as session, write_transaction(session):
+        count = await purge_orphan_project_bins(session)
+        await session.commit()
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Nettoyage des références souples project_bins")
+    parser.add_argument("--purge-project-bins", action="store_true",
+                        help="supprime les associations vers des boîtes disparues")
+    args = parser.parse_args()
+    if not args.purge_project_bins:
+        parser.print_help()
+        return 1
+    print(f"{asyncio.run(_purge())} association(s) supprimée(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
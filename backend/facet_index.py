@@ -0,0 +1,126 @@
+"""
+Index bitmap des facettes de l'inventaire pour /api/bom/search.
+
+Chaque boîte a un ordinal : sa position dans InventorySnapshot.rows() (ordre
+de parcours habituel, trous compris). Pour chaque valeur de facette (catégorie,
+tiroir, numéro de couche, couleur, trou) l'index garde l'ensemble des ordinaux
+sous forme de bitset : un int Python, dont les & / | / bit_count() sont
+calculés en C. Les filtres se combinent en OU à l'intérieur d'une facette et
+en ET entre facettes avant tout calcul de score ; les comptes par facette sont
+des popcounts de (résultats & bitset).
+
+Reconstruit une fois par instantané (comme les colonnes de stats.py), en
+O(nombre de boîtes).
+"""
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional
+
+from inventory_snapshot import InventorySnapshot
+
+# Positions des bits à 1 de chaque octet : parcours d'un bitset octet par octet
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def _bitmaps(values: Iterable[Hashable], size: int) -> Dict[Hashable, int]:
+    """valeur → bitset des ordinaux qui la portent"""
+    buffers: Dict[Hashable, bytearray] = {}
+    nbytes = (size + 7) // 8
+    for ordinal, value in enumerate(values):
+        buf = buffers.get(value)
+        if buf is None:
+            buf = buffers[value] = bytearray(nbytes)
+        buf[ordinal >> 3] |= 1 << (ordinal & 7)
+    return {value: int.from_bytes(buf, "little") for value, buf in buffers.items()}
+
+
+def ordinals(mask: int) -> Iterator[int]:
+    """Ordinaux présents dans le bitset, croissants"""
+    if not mask:
+        return
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+def normalize_color(color: Optional[str]) -> Optional[str]:
+    return color.strip().lower() if color else None
+
+
+class FacetIndex:
+    """Bitsets par catégorie, tiroir, couche (1-based), couleur et trou"""
+
+    __slots__ = ("snapshot", "rows", "all", "holes", "by_category", "by_drawer", "by_layer", "by_color")
+
+    def __init__(self, snap: InventorySnapshot):
+        self.snapshot = snap
+        self.rows = snap.rows()
+        n = len(self.rows)
+        self.all = (1 << n) - 1
+        self.holes = _bitmaps((b.is_hole for _, _, b in self.rows), n).get(True, 0)
+        self.by_category = _bitmaps((b.category_id for _, _, b in self.rows), n)
+        self.by_drawer = _bitmaps((d.id for d, _, _ in self.rows), n)
+        self.by_layer = _bitmaps((l.z_index + 1 for _, l, _ in self.rows), n)
+        self.by_color = _bitmaps((normalize_color(b.color) for _, _, b in self.rows), n)
+
+    @staticmethod
+    def _any_of(bitmaps: Dict[Hashable, int], values: Optional[Iterable[Hashable]]) -> Optional[int]:
+        """OU des bitsets des valeurs demandées (None = facette non filtrée)"""
+        if values is None:
+            return None
+        mask = 0
+        for value in values:
+            mask |= bitmaps.get(value, 0)
+        return mask
+
+    def select(
+        self,
+        category_ids: Optional[List[Optional[str]]] = None,
+        drawer_ids: Optional[List[str]] = None,
+        layers: Optional[List[int]] = None,
+        colors: Optional[List[Optional[str]]] = None,
+        is_hole: Optional[bool] = False,
+    ) -> int:
+        """ET des facettes filtrées ; is_hole=None garde trous et boîtes"""
+        mask = self.all
+        if is_hole is not None:
+            mask &= self.holes if is_hole else ~self.holes
+        for facet in (
+            self._any_of(self.by_category, category_ids),
+            self._any_of(self.by_drawer, drawer_ids),
+            self._any_of(self.by_layer, layers),
+            self._any_of(self.by_color, [normalize_color(c) for c in colors] if colors is not None else None),
+        ):
+            if facet is not None:
+                mask &= facet
+        return mask & self.all
+
+    def counts(self, hits: int) -> dict:
+        """Nombre de résultats par catégorie et par tiroir (valeurs sans résultat omises)"""
+        snap = self.snapshot
+        categories = [
+            {"category_id": cid, "name": snap.category_name(cid), "count": count}
+            for cid, bitmap in self.by_category.items()
+            if (count := (hits & bitmap).bit_count())
+        ]
+        drawers = [
+            {"drawer_id": did, "name": snap.drawers[did].name, "count": count}
+            for did, bitmap in self.by_drawer.items()
+            if (count := (hits & bitmap).bit_count())
+        ]
+        categories.sort(key=lambda f: f["count"], reverse=True)
+        drawers.sort(key=lambda f: f["count"], reverse=True)
+        return {"category": categories, "drawer": drawers}
+
+
+_cache: Optional[FacetIndex] = None
+
+
+def index_for(snap: InventorySnapshot) -> FacetIndex:
+    """Index de l'instantané courant (reconstruit quand l'instantané change)"""
+    global _cache
+    cached = _cache
+    if cached is None or cached.snapshot is not snap:
+        cached = _cache = FacetIndex(snap)
+    return cached
@@ -0,0 +1,127 @@
+"""
+Fonctionnalités optionnelles chargées à la demande.
+
+Les modules IA (Ollama), PDF (pypdf) et projets ne sont importés qu'à la
+première requête qui les concerne : /api/health répond dès que le cœur
+(tiroirs, boîtes, recherche) est prêt, ce qui raccourcit le démarrage du Pi
+après une coupure de courant.
+
+Configuration (variables d'environnement) :
+  - SCANGRID_FEATURES      : fonctionnalités actives (défaut "ai,pdf,projects")
+  - SCANGRID_LAZY_FEATURES : 1 (défaut) = import à la première requête,
+                             0 = import au démarrage (lifespan)
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from fastapi import FastAPI
+
+import startup
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api"
+
+
+@dataclass
+class Feature:
+    name: str
+    module: str
+    # Préfixes de chemins (sous /api) servis par le module
+    paths: Tuple[str, ...]
+    loaded: bool = False
+    load_seconds: Optional[float] = None
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def matches(self, path: str) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in self.paths)
+
+
+FEATURES: Dict[str, Feature] = {
+    f.name: f for f in (
+        Feature("ai", "features.ai", ("/api/improve-description", "/api/bom/ai-parse", "/api/ai")),
+        Feature("pdf", "features.bom_pdf", ("/api/bom/extract-pdf",)),
+        Feature("projects", "features.projects", ("/api/projects",)),
+    )
+}
+
+ENABLED = {
+    name.strip() for name in os.getenv("SCANGRID_FEATURES", ",".join(FEATURES)).split(",")
+    if name.strip() in FEATURES
+}
+LAZY = os.getenv("SCANGRID_LAZY_FEATURES", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _move_catch_all_last(app: FastAPI) -> None:
+    """La route SPA /{full_path:path} doit rester la dernière de la table"""
+    routes = app.router.routes
+    catch_all = [r for r in routes if getattr(r, "path", None) == "/{full_path:path}"]
+    for r in catch_all:
+        routes.remove(r)
+        routes.append(r)
+
+
+def _mount(app: FastAPI, feature: Feature, module, start: float) -> None:
+    app.include_router(module.router, prefix=API_PREFIX)
+    _move_catch_all_last(app)
+    app.openapi_schema = None  # régénérer /docs avec les nouvelles routes
+    feature.load_seconds = time.perf_counter() - start
+    feature.loaded = True
+    startup.record_feature(feature.name, feature.load_seconds)
+    logger.info("🧩 Fonctionnalité '%s' chargée en %.0f ms", feature.name, feature.load_seconds * 1000)
+
+
+async def ensure_loaded(app: FastAPI, feature: Feature) -> None:
+    """Importe le module et monte son routeur une seule fois"""
+    if feature.loaded:
+        return
+    async with feature._lock:
+        if not feature.loaded:
+            start = time.perf_counter()
+            # Import dans un thread : les autres requêtes continuent d'être servies
+            module = await asyncio.to_thread(importlib.import_module, feature.module)
+            _mount(app, feature, module, start)
+
+
+async def load_all(app: FastAPI) -> None:
+    """Chargement immédiat de toutes les fonctionnalités actives"""
+    for name in sorted(ENABLED):
+        await ensure_loaded(app, FEATURES[name])
+
+
+def status_report() -> Dict[str, dict]:
+    return {
+        name: {
+            "enabled": name in ENABLED,
+            "loaded": f.loaded,
+            "load_ms": round(f.load_seconds * 1000, 1) if f.load_seconds is not None else None,
+        }
+        for name, f in FEATURES.items()
+    }
+
+
+class LazyFeatureMiddleware:
+    """
+    Middleware ASGI : à la première requête visant une fonctionnalité active
+    non encore chargée, importe son module et monte ses routes avant le routage.
+    """
+
+    def __init__(self, app, fastapi_app: FastAPI):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope.get("path", "")
+            if path.startswith(API_PREFIX + "/"):
+                for name in ENABLED:
+                    feature = FEATURES[name]
+                    if not feature.loaded and feature.matches(path):
+                        await ensure_loaded(self.fastapi_app, feature)
+                        break
+        await self.app(scope, receive, send)
@@ -0,0 +1,267 @@
+"""
+Fonctionnalités IA locales (Ollama) : amélioration de description, parsing de BOM.
+Module chargé à la demande (voir features/__init__.py).
+"""
+import json as _json
+import logging
+import time
+from dataclasses import asdict
+
+import httpx
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel
+
+import bom_rules
+import ollama_client
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def _require_ollama() -> ollama_client.OllamaClient:
+    """Client partagé, 503 immédiat si Ollama ne répond pas (sonde en cache)"""
+    client = ollama_client.client
+    if not await client.reachable():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Ollama introuvable sur {client.base_url}. Vérifiez que le service tourne (ollama serve)."
+        )
+    return client
+
+
+@router.get("/ai/status", tags=["AI"], summary="État du service Ollama")
+async def ai_status():
+    """URL, modèle, joignabilité (sonde en cache) et préchauffage"""
+    return await ollama_client.client.report()
+
+
+# ============= AI DESCRIPTION IMPROVEMENT =============
+
+@router.post(
+    "/improve-description",
+    tags=["AI"],
+    summary="Améliorer une description avec IA locale"
+)
+async def improve_description(
+    title: str,
+    content: str = "",
+    instruction: str = "Description pour un inventaire de composants électroniques"
+):
+    """
+    Utilise Ollama (SCANGRID_OLLAMA_MODEL) pour générer une description ultra-concise.
+    """
+    client = await _require_ollama()
+    
+    logger.info("🤖 AI Description - Titre: %s...", title[:50])
+    
+    # Construction du prompt optimisé
+    prompt = f"""Tu es un assistant technique spécialisé dans l'inventaire de composants électroniques et de visserie.
+
+Génère une description ultra-concise (maximum 50 mots) pour cet article :
+
+Titre : {title}
+{f"Détails : {content}" if content else ""}
+
+Règles strictes :
+- Réponds UNIQUEMENT avec la description, sans préambule
+- Style direct et factuel, sans adjectifs marketing
+- Une seule phrase claire et précise
+- Base-toi sur le titre et les détails fournis
+- N'invente pas de spécifications non mentionnées
+
+Description :"""
+
+    try:
+        response = await client.generate(
+            prompt,
+            temperature=0.2,    # Très bas pour rester factuel
+            num_predict=60,     # Limite la longueur (économie CPU)
+            top_p=0.9,          # Diversité contrôlée
+        )
+        
+        improved_description = response['response'].strip()
+        
+        logger.info("✅ Description générée: %s...", improved_description[:50])
+        
+        return {
+            "improved_description": improved_description,
+            "model": client.model
+        }
+        
+    except Exception as e:
+        logger.error("❌ Erreur Ollama: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la génération: {str(e)}"
+        )
+
+
+# ============= AI BOM PARSE (Ollama) =============
+
+class AIParseRequest(BaseModel):
+    text: str
+    max_chars: int = 12000   # guard: llama3.2:3b context ~128k tokens
+    rules: bool = True       # analyse par règles avant le LLM (bom_rules.py)
+
+class AIComponentEntry(BaseModel):
+    designation: str
+    qty: int = 1
+    reference: str = ""
+    package: str = ""
+
+class AILineReport(BaseModel):
+    line: str
+    path: str   # rules | llm | ignored | unresolved (LLM indisponible)
+
+class AIParseResult(BaseModel):
+    components: list[AIComponentEntry]
+    raw_response: str
+    model: str
+    lines: list[AILineReport] = []
+    stats: dict[str, float] = {}
+
+_BOM_SYSTEM_PROMPT = """Tu es un parseur de nomenclature électronique (BOM). 
+RÈGLES STRICTES :
+- Réponds UNIQUEMENT avec un tableau JSON valide, sans texte avant ou après.
+- Chaque élément du tableau doit avoir exactement ces 4 champs : "designation", "qty", "reference", "package".
+- "designation" : nom du composant sans la quantité (ex: "Résistance 10kΩ 0603").
+- "qty" : quantité entière (1 si non précisée).
+- "reference" : référence schématique si présente (R1, C2, U3…), sinon "".  
+- "package" : boîtier si présent (0402, SOT-23, DIP-8…), sinon "".
+- IGNORE les lignes qui ne sont pas des composants : en-têtes de colonnes, titres, pieds de page, numéros de page, noms de sociétés, URLs, dates.
+- ÉLIMINE les doublons (garde 1 ligne unique par composant, additionne les quantités).
+- NE JAMAIS inclure de commentaires ou de texte libre dans la réponse.
+FORMAT OBLIGATOIRE :
+[{"designation":"...","qty":1,"reference":"","package":""},...]"""
+
+async def _llm_components(text: str) -> tuple[list, str]:
+    """Éléments JSON bruts renvoyés par le LLM pour text, et sa réponse brute"""
+    client = await _require_ollama()
+
+    try:
+        data = await client.generate(
+            f"{_BOM_SYSTEM_PROMPT}\n\nTexte à analyser :\n{text}",
+            operation="bom_parse",
+            temperature=0.05,   # quasi-déterministe
+            num_predict=2048,
+            stop=["\n\n\n"],    # évite les divagations
+        )
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Ollama introuvable sur {client.base_url}. Vérifiez que le service tourne (ollama serve)."
+        )
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail=f"Ollama n'a pas répondu dans les {client.timeout:.0f}s.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur Ollama : {e}")
+
+    raw_response: str = data.get("response", "").strip()
+
+    # ─── Parsing du JSON retourné par Ollama ──────────────────────────────────
+    # Le LLM peut mettre des ```json ... ``` autour — on les enlève
+    cleaned = raw_response
+    for fence in ("```json", "```JSON", "```"):
+        cleaned = cleaned.replace(fence, "")
+    cleaned = cleaned.strip().strip("`").strip()
+
+    # Détecte si la réponse est un tableau [...] ou un objet unique {...}
+    # Certains modèles retournent un seul objet quand il n'y a qu'un composant.
+    arr_start = cleaned.find("[")
+    obj_start = cleaned.find("{")
+
+    raw_list = None
+
+    # Cas 1 : tableau JSON classique [...]
+    if arr_start != -1 and (obj_start == -1 or arr_start < obj_start):
+        end = cleaned.rfind("]")
+        if end != -1 and end > arr_start:
+            try:
+                raw_list = _json.loads(cleaned[arr_start:end + 1])
+            except _json.JSONDecodeError:
+                pass
+
+    # Cas 2 : objet unique {...} — on l'emballe dans une liste
+    if raw_list is None and obj_start != -1:
+        end = cleaned.rfind("}")
+        if end != -1 and end > obj_start:
+            try:
+                obj = _json.loads(cleaned[obj_start:end + 1])
+                raw_list = [obj] if isinstance(obj, dict) else None
+            except _json.JSONDecodeError:
+                pass
+
+    if raw_list is None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Le modèle n'a pas retourné un JSON valide. Réponse brute : {raw_response[:400]}"
+        )
+
+    return raw_list, raw_response
+
+
+@router.post("/bom/ai-parse", response_model=AIParseResult)
+async def bom_ai_parse(req: AIParseRequest):
+    """
+    Structure le texte extrait d'un PDF en composants dédoublonnés.
+
+    Les lignes régulières (« R1 10k 0603 », « C3 100nF 0402 x4 ») sont
+    analysées par règles (bom_rules.py) en quelques microsecondes ; seules les
+    lignes ambiguës partent à Ollama (SCANGRID_OLLAMA_MODEL) pour un filtrage
+    sémantique. lines indique le chemin suivi par chaque ligne.
+    """
+    text_to_parse = req.text[:req.max_chars]
+    lines = [ln.strip() for ln in text_to_parse.splitlines() if ln.strip()]
+
+    t0 = time.perf_counter()
+    if req.rules:
+        classified = bom_rules.classify(lines)
+    else:
+        classified = [(line, bom_rules.LLM, None) for line in lines]
+    rules_ms = (time.perf_counter() - t0) * 1000
+
+    raw_list: list = [asdict(parsed) for _, _, parsed in classified if parsed is not None]
+    ambiguous = [line for line, path, _ in classified if path == bom_rules.LLM]
+    # model reste le nom du modèle configuré ; le chemin de chaque ligne est dans lines / stats
+    raw_response, llm_path = "", bom_rules.LLM
+    model = ollama_client.client.model
+    if ambiguous:
+        try:
+            llm_list, raw_response = await _llm_components("\n".join(ambiguous))
+            raw_list += llm_list
+        except HTTPException as e:
+            # Résultat partiel plutôt qu'une erreur quand les règles ont trouvé des composants
+            if not raw_list:
+                raise
+            logger.warning("⚠️ LLM indisponible (%s) : %s ligne(s) non résolue(s)", e.detail, len(ambiguous))
+            llm_path = bom_rules.UNRESOLVED
+
+    # ─── Normalisation & dédoublonnage ────────────────────────────────────────
+    seen: dict[str, AIComponentEntry] = {}
+    for item in raw_list:
+        if not isinstance(item, dict):
+            continue
+        designation = str(item.get("designation", "")).strip()
+        if not designation or len(designation) < 2:
+            continue
+        qty = max(1, int(item.get("qty", 1)))
+        ref = str(item.get("reference", "")).strip()
+        pkg = str(item.get("package", "")).strip()
+        key = designation.lower()
+        if key in seen:
+            seen[key].qty += qty    # additionne les quantités si doublon
+        else:
+            seen[key] = AIComponentEntry(designation=designation, qty=qty, reference=ref, package=pkg)
+
+    components = list(seen.values())
+    report = [AILineReport(line=line, path=llm_path if path == bom_rules.LLM else path)
+              for line, path, _ in classified]
+    stats = {bom_rules.RULES: 0, bom_rules.LLM: 0, bom_rules.IGNORED: 0, bom_rules.UNRESOLVED: 0}
+    for entry in report:
+        stats[entry.path] += 1
+    logger.info("✅ AI BOM parse : %s lignes (%s par règles en %.1f ms, %s au LLM) → %s composants uniques",
+                len(lines), stats[bom_rules.RULES], rules_ms, len(ambiguous), len(components))
+
+    return AIParseResult(components=components, raw_response=raw_response, model=model,
+                         lines=report, stats={**stats, "rules_ms": round(rules_ms, 3)})
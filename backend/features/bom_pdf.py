@@ -0,0 +1,66 @@
+"""
+Extraction du texte des BOM au format PDF (pypdf).
+Module chargé à la demande (voir features/__init__.py).
+"""
+import io
+
+import pypdf
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from pydantic import BaseModel
+
+import metrics
+
+router = APIRouter()
+
+
+# ============= BOM PDF EXTRACT =============
+
+class BOMExtractResult(BaseModel):
+    lines: list[str]
+    raw_text: str
+    page_count: int
+
+@router.post("/bom/extract-pdf", response_model=BOMExtractResult)
+async def bom_extract_pdf(file: UploadFile = File(...)):
+    """
+    Extrait le texte d'un fichier PDF uploadé (multipart/form-data).
+    Retourne les lignes tokenisées prêtes à être envoyées à /bom/match.
+    Utilise pypdf — aucune dépendance lourde, pas de serveur externe.
+    """
+    if file.content_type not in ("application/pdf", "application/octet-stream"):
+        # Accept octet-stream too in case browser sends it that way
+        if not (file.filename or "").lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="Le fichier doit être un PDF.")
+
+    try:
+        raw_bytes = await file.read()
+        if not raw_bytes:
+            raise HTTPException(status_code=400, detail="Le fichier PDF est vide.")
+
+        with metrics.track_external("pypdf", "extract_text"):
+            reader = pypdf.PdfReader(io.BytesIO(raw_bytes))
+            page_count = len(reader.pages)
+
+            full_text_parts = []
+            for page in reader.pages:
+                text = page.extract_text()
+                if text:
+                    full_text_parts.append(text.strip())
+
+        raw_text = "\n".join(full_text_parts)
+
+        # Tokenise: split by newlines, remove blank lines & very short tokens
+        lines = [
+            ln.strip()
+            for ln in raw_text.splitlines()
+            if ln.strip() and len(ln.strip()) >= 3
+        ]
+
+        return BOMExtractResult(lines=lines, raw_text=raw_text, page_count=page_count)
+
+    except HTTPException:
+        raise
+    except pypdf.errors.PdfReadError as e:
+        raise HTTPException(status_code=422, detail=f"PDF illisible : {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur extraction PDF : {e}")
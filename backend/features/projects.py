@@ -0,0 +1,250 @@
+"""
+Projets : liste de composants de l'inventaire, localisation et export CSV.
+Module chargé à la demande (voir features/__init__.py).
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import deletes
+import inventory_snapshot
+import response_cache
+import short_ids
+from database import get_db, get_write_db
+from models import Project, ProjectBin
+
+router = APIRouter()
+
+
+class ProjectCreate(BaseModel):
+    name: str
+    description: str | None = None
+
+class ProjectUpdate(BaseModel):
+    name: str | None = None
+    description: str | None = None
+
+class ProjectBinAdd(BaseModel):
+    bin_id: str
+    qty: int = 1
+    note: str | None = None
+    url: str | None = None
+
+    # Ancien UUID d'une boîte migrée : on enregistre l'id courant, pas une référence morte
+    _resolve_bin_id = field_validator("bin_id")(short_ids.resolve)
+
+
+# ============= PROJECTS — CRUD =============
+
+@router.get("/projects")
+async def list_projects(db: AsyncSession = Depends(get_db)):
+    """Liste tous les projets (sans les bins pour légèreté : compte SQL)."""
+    bin_count = (
+        select(func.count(ProjectBin.id))
+        .where(ProjectBin.project_id == Project.id)
+        .correlate(Project)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Project.id, Project.name, Project.description, Project.created_at, bin_count.label("bin_count"))
+        .order_by(Project.created_at.desc())
+    )
+    response_cache.tag("projects")
+    return [dict(row._mapping) for row in result]
+
+
+@router.post("/projects", status_code=201)
+async def create_project(data: ProjectCreate, db: AsyncSession = Depends(get_write_db)):
+    """Crée un nouveau projet."""
+    project = Project(name=data.name, description=data.description)
+    db.add(project)
+    await db.commit()
+    await db.refresh(project)
+    response_cache.invalidate("projects")
+    return {"id": project.id, "name": project.name, "description": project.description,
+            "created_at": project.created_at, "bin_count": 0}
+
+
+@router.patch("/projects/{project_id}")
+async def update_project(project_id: str, data: ProjectUpdate, db: AsyncSession = Depends(get_write_db)):
+    """Modifie le nom ou la description d'un projet."""
+    result = await db.execute(select(Project).where(Project.id == project_id))
+    project = result.scalar_one_or_none()
+    if not project:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+    if data.name is not None:
+        project.name = data.name
+    if data.description is not None:
+        project.description = data.description
+    await db.commit()
+    await db.refresh(project)
+    response_cache.invalidate(f"project:{project_id}", "projects")
+    return {"id": project.id, "name": project.name, "description": project.description,
+            "created_at": project.created_at}
+
+
+@router.delete("/projects/{project_id}")
+async def delete_project(project_id: str, db: AsyncSession = Depends(get_write_db)):
+    """Supprime un projet et ses associations (cascade)."""
+    # Associations supprimées par la cascade SQL
+    if not await deletes.delete_project(db, project_id):
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+    await db.commit()
+    response_cache.invalidate(f"project:{project_id}", "projects")
+    return {"message": "Projet supprimé."}
+
+
+# ============= PROJECTS — Bin management =============
+
+@router.get("/projects/{project_id}/bins")
+async def get_project_bins(project_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Retourne les composants du projet avec leur localisation actuelle résolue
+    depuis l'inventaire (tiroir, couche, position XY).
+    """
+    result = await db.execute(
+        select(Project).options(selectinload(Project.project_bins)).where(Project.id == project_id)
+    )
+    project = result.scalar_one_or_none()
+    if not project:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+
+    # Localisation résolue depuis l'instantané mémoire de l'inventaire
+    snapshot = await inventory_snapshot.store.get(db)
+    response_cache.tag(f"project:{project_id}", "inventory")
+
+    enriched = []
+    for pb in project.project_bins:
+        drawer, layer, bin_obj = snapshot.locate(pb.bin_id) or (None, None, None)
+        entry = {
+            "pb_id": pb.id,
+            "bin_id": pb.bin_id,
+            "qty": pb.qty,
+            "note": pb.note,
+            "url": pb.url,
+            "found": bin_obj is not None,
+        }
+        if bin_obj and bin_obj.content:
+            entry.update({
+                "title": bin_obj.content.get("title", "—"),
+                "description": bin_obj.content.get("description", ""),
+                "color": bin_obj.color,
+                "x": bin_obj.x_grid,
+                "y": bin_obj.y_grid,
+                "layer": layer.z_index if layer else None,
+                "drawer": drawer.name if drawer else "—",
+                "drawer_id": drawer.id if drawer else None,
+            })
+        else:
+            entry.update({
+                "title": f"[Bin supprimé: {pb.bin_id[:8]}...]",
+                "description": "",
+                "color": None,
+                "x": None,
+                "y": None,
+                "layer": None,
+                "drawer": "—",
+                "drawer_id": None,
+            })
+        enriched.append(entry)
+
+    return enriched
+
+
+@router.post("/projects/{project_id}/bins", status_code=201)
+async def add_project_bin(project_id: str, data: ProjectBinAdd, db: AsyncSession = Depends(get_write_db)):
+    """Ajoute un composant au projet (liaison soft par bin_id string)."""
+    exists = await db.scalar(select(Project.id).where(Project.id == project_id))
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+
+    # Empêcher les doublons (seule l'association de ce bin est lue)
+    result = await db.execute(
+        select(ProjectBin).where(ProjectBin.project_id == project_id, ProjectBin.bin_id == data.bin_id)
+    )
+    existing = result.scalars().first()
+    if existing:
+        existing.qty += data.qty
+        if data.url:
+            existing.url = data.url
+        await db.commit()
+        response_cache.invalidate(f"project:{project_id}", "projects")
+        return {"pb_id": existing.id, "bin_id": existing.bin_id, "qty": existing.qty,
+                "note": existing.note, "url": existing.url}
+
+    pb = ProjectBin(project_id=project_id, bin_id=data.bin_id, qty=data.qty,
+                    note=data.note, url=data.url)
+    db.add(pb)
+    await db.commit()
+    await db.refresh(pb)
+    response_cache.invalidate(f"project:{project_id}", "projects")
+    return {"pb_id": pb.id, "bin_id": pb.bin_id, "qty": pb.qty, "note": pb.note, "url": pb.url}
+
+
+@router.delete("/projects/{project_id}/bins/{pb_id}")
+async def remove_project_bin(project_id: str, pb_id: str, db: AsyncSession = Depends(get_write_db)):
+    """Retire un composant du projet."""
+    result = await db.execute(
+        select(ProjectBin).where(ProjectBin.id == pb_id, ProjectBin.project_id == project_id)
+    )
+    pb = result.scalar_one_or_none()
+    if not pb:
+        raise HTTPException(status_code=404, detail="Association introuvable.")
+    await db.delete(pb)
+    await db.commit()
+    response_cache.invalidate(f"project:{project_id}", "projects")
+    return {"message": "Composant retiré du projet."}
+
+
+# ============= PROJECTS — CSV export =============
+
+@router.get("/projects/{project_id}/bom.csv")
+async def export_project_csv(project_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Exporte la BOM du projet au format CSV (StreamingResponse).
+    Le fichier est généré à la volée, sans écriture sur disque.
+    """
+    result = await db.execute(select(Project).options(selectinload(Project.project_bins)).where(Project.id == project_id))
+    project = result.scalar_one_or_none()
+    if not project:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+
+    snapshot = await inventory_snapshot.store.get(db)
+    response_cache.tag(f"project:{project_id}", "inventory")
+
+    import csv, io as _io
+    output = _io.StringIO()
+    writer = csv.writer(output, delimiter=";")
+
+    # Entête
+    writer.writerow(["#", "Bin ID", "Référence", "Désignation", "Tiroir", "Couche", "X", "Y", "Qté", "Note"])
+
+    for i, pb in enumerate(project.project_bins, 1):
+        drawer, layer, bin_obj = snapshot.locate(pb.bin_id) or (None, None, None)
+        if bin_obj and bin_obj.content:
+            writer.writerow([
+                i,
+                pb.bin_id,
+                bin_obj.content.get("title", ""),
+                bin_obj.content.get("description", ""),
+                drawer.name if drawer else "—",
+                layer.z_index if layer else "—",
+                bin_obj.x_grid,
+                bin_obj.y_grid,
+                pb.qty,
+                pb.note or "",
+            ])
+        else:
+            writer.writerow([i, pb.bin_id, "[Supprimé]", "", "—", "—", "—", "—", pb.qty, pb.note or ""])
+
+    csv_content = output.getvalue()
+    output.close()
+
+    return StreamingResponse(
+        iter([csv_content]),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename=BOM_{project_id[:8]}.csv"},
+    )
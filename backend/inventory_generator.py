@@ -0,0 +1,165 @@
+"""
+Générateur d'inventaire synthétique reproductible (graine fixe).
+
+Produit N tiroirs × couches × boîtes au format de POST /api/drawers, avec des
+titres, articles et hauteurs multi-couches réalistes. Utilisé par les
+benchmarks (bench_endpoints.py) et l'outil de charge (load_test_data.py),
+qui partagent aussi percentile() pour leurs rapports de latence.
+"""
+import random
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Drawer, Layer, Bin
+
+_RESISTOR_VALUES = ["10Ω", "47Ω", "100Ω", "220Ω", "330Ω", "1kΩ", "2.2kΩ", "4.7kΩ", "10kΩ", "47kΩ", "100kΩ", "1MΩ"]
+_CAP_VALUES = ["10pF", "22pF", "100pF", "1nF", "10nF", "100nF", "1µF", "4.7µF", "10µF", "100µF", "470µF"]
+_PACKAGES = ["0402", "0603", "0805", "1206", "SOT-23", "SOIC-8", "DIP-8", "TO-220", "QFN-32"]
+_SCREWS = ["M2", "M2.5", "M3", "M4", "M5"]
+_LENGTHS = ["6", "8", "10", "12", "16", "20", "25"]
+_ICS = ["NE555", "LM358", "LM7805", "ATmega328P", "ESP32-WROOM", "CH340G", "AMS1117-3.3", "TL072", "74HC595"]
+_MISC = [
+    "Pile bouton CR2032", "Connecteurs JST-XH", "Headers mâles 2.54mm", "Borniers à vis",
+    "Interrupteurs tactiles", "Potentiomètres 10k", "Quartz 16MHz", "Diodes 1N4148",
+    "Diodes Schottky SS34", "Transistors 2N2222", "MOSFET IRLZ44N", "Fusibles 5x20",
+    "Gaine thermo", "Fils Dupont", "Aimants néodyme", "Ressorts", "Entretoises laiton",
+]
+_COLORS = ["#3b82f6", "#ef4444", "#22c55e", "#eab308", "#a855f7", "#f97316", "#64748b"]
+_HEIGHTS = [1.0, 1.0, 1.0, 0.5, 2.0, 3.0]
+
+
+def _component(rng: random.Random) -> tuple[str, str, List[str]]:
+    """(titre, description, articles) d'une boîte aléatoire"""
+    kind = rng.random()
+    if kind < 0.3:
+        values = rng.sample(_RESISTOR_VALUES, rng.randint(1, 4))
+        pkg = rng.choice(_PACKAGES[:4])
+        title = f"Résistances {values[0]} {pkg}"
+        items = [f"R {v} {pkg}" for v in values]
+        desc = f"Résistances CMS {pkg} 1% 1/10W"
+    elif kind < 0.55:
+        values = rng.sample(_CAP_VALUES, rng.randint(1, 4))
+        pkg = rng.choice(_PACKAGES[:4])
+        title = f"Condensateurs {values[0]} {pkg}"
+        items = [f"C {v} {pkg}" for v in values]
+        desc = f"Condensateurs céramique {pkg} X7R"
+    elif kind < 0.7:
+        size = rng.choice(_SCREWS)
+        lengths = rng.sample(_LENGTHS, rng.randint(1, 3))
+        title = f"Vis {size}x{lengths[0]}"
+        items = [f"Vis {size}x{length} tête cylindrique" for length in lengths] + [f"Écrou {size}"]
+        desc = f"Visserie inox {size}"
+    elif kind < 0.85:
+        chips = rng.sample(_ICS, rng.randint(1, 3))
+        title = chips[0]
+        items = [f"{c} {rng.choice(_PACKAGES[4:])}" for c in chips]
+        desc = "Circuits intégrés"
+    else:
+        title = rng.choice(_MISC)
+        items = [title] if rng.random() < 0.5 else []
+        desc = ""
+    return title, desc, items
+
+
+def generate_inventory(
+    drawers: int = 10,
+    layers: int = 2,
+    bins_per_layer: int = 20,
+    seed: int = 42,
+) -> List[Dict[str, Any]]:
+    """
+    Liste de tiroirs prêts pour POST /api/drawers. Même graine = même inventaire.
+    Les boîtes de hauteur > 1 simulent des boîtes traversant plusieurs couches.
+    """
+    rng = random.Random(seed)
+    result = []
+    for d in range(drawers):
+        width = rng.randint(6, 12)
+        depth = rng.randint(6, 12)
+        drawer = {
+            "name": f"Tiroir {d + 1:03d}",
+            "width_units": width,
+            "depth_units": depth,
+            "layers": [],
+        }
+        for z in range(layers):
+            layer_bins = []
+            for b in range(bins_per_layer):
+                title, desc, items = _component(rng)
+                unplaced = rng.random() < 0.05
+                w = rng.randint(1, 3)
+                dp = rng.randint(1, 3)
+                layer_bins.append({
+                    "x_grid": -1 if unplaced else (b * 2) % width,
+                    "y_grid": -1 if unplaced else (b // max(width // 2, 1)) % depth,
+                    "width_units": w,
+                    "depth_units": dp,
+                    "height_units": rng.choice(_HEIGHTS),
+                    "z_offset": rng.choice([0.0, 0.0, 0.5]),
+                    "content": {"title": title, "description": desc or None, "items": items},
+                    "color": rng.choice(_COLORS),
+                    "is_hole": rng.random() < 0.02,
+                })
+            drawer["layers"].append({"z_index": z, "bins": layer_bins})
+        result.append(drawer)
+    return result
+
+
+def sample_queries(inventory: List[Dict[str, Any]], count: int = 20, seed: int = 42) -> List[str]:
+    """
+    Requêtes réalistes tirées de l'inventaire : titres, articles, et
+    fautes de frappe / dictée (lettres supprimées) pour solliciter le fuzzy.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for drawer in inventory:
+        for layer in drawer["layers"]:
+            for b in layer["bins"]:
+                texts.append(b["content"]["title"])
+                texts.extend(b["content"]["items"])
+    if not texts:
+        return []
+    queries = []
+    for _ in range(count):
+        text = rng.choice(texts)
+        if rng.random() < 0.3 and len(text) > 5:
+            i = rng.randrange(1, len(text) - 1)
+            text = text[:i] + text[i + 1:]
+        queries.append(text)
+    return queries
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentile (0 ≤ pct ≤ 1) d'une liste triée, par interpolation linéaire"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def seed_database(db: AsyncSession, inventory: List[Dict[str, Any]]) -> int:
+    """
+    Insère directement l'inventaire via l'ORM (plus rapide que l'API et
+    conserve height_units / z_offset). Retourne le nombre de boîtes créées.
+    """
+    total = 0
+    for drawer_data in inventory:
+        drawer = Drawer(
+            name=drawer_data["name"],
+            width_units=drawer_data["width_units"],
+            depth_units=drawer_data["depth_units"],
+        )
+        db.add(drawer)
+        await db.flush()
+        for layer_data in drawer_data["layers"]:
+            layer = Layer(drawer_id=drawer.id, z_index=layer_data["z_index"])
+            db.add(layer)
+            await db.flush()
+            for b in layer_data["bins"]:
+                db.add(Bin(layer_id=layer.id, **b))
+                total += 1
+    await db.commit()
+    return total
@@ -0,0 +1,438 @@
+"""
+Instantané en mémoire de l'inventaire pour les endpoints de lecture intensive
+(/locate, /bom/search, /bom/match, composants et export CSV des projets).
+
+L'instantané est immuable : enregistrements à slots, chaînes internées, textes
+déjà normalisés (accents, casse) pour le scoring. Les lecteurs prennent la
+référence courante sans verrou et itèrent dessus ; chaque mutation publie un
+nouvel instantané qui partage tout ce qui n'a pas changé (copie sur écriture).
+
+Cohérence : un instantané porte la génération d'écriture (writer.py) qu'il
+reflète. Les mutations le patchent sous le verrou d'écriture, après commit ;
+si un autre worker a écrit, ou si une mutation n'est pas patchée, les
+générations divergent et l'instantané est reconstruit depuis SQLite à la
+lecture suivante.
+"""
+import asyncio
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import write_coordinator
+from models import Bin, Category, Drawer, Layer
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def normalize_string(s: str) -> str:
+    if not s:
+        return ""
+    # Enlever accents et passer en minuscule
+    s = str(s)
+    s = unicodedata.normalize('NFD', s).encode('ascii', 'ignore').decode('utf-8')
+    return s.lower()
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
+class DrawerRecord:
+    id: str
+    name: str
+    width_units: int
+    depth_units: int
+
+
+@dataclass(frozen=True, slots=True)
+class LayerRecord:
+    id: str
+    drawer_id: str
+    z_index: int
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryRecord:
+    id: str
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class BinRecord:
+    id: str
+    layer_id: str
+    category_id: Optional[str]
+    x_grid: int
+    y_grid: int
+    width_units: int
+    depth_units: int
+    height_units: float
+    z_offset: float
+    color: Optional[str]
+    is_hole: bool
+    content: Mapping[str, Any]
+    # Champs dérivés pour le scoring (calculés une fois)
+    items: Tuple[str, ...]
+    title_norm: str
+    desc_norm: str
+    items_norm: Tuple[str, ...]
+
+    @classmethod
+    def build(cls, id, layer_id, category_id, x_grid, y_grid, width_units, depth_units,
+              height_units, z_offset, content, color, is_hole) -> "BinRecord":
+        title = description = ""
+        items: Tuple[str, ...] = ()
+        if content and isinstance(content, dict):
+            t_val = content.get("title", "")
+            d_val = content.get("description", "")
+            title = str(t_val) if t_val else ""
+            description = str(d_val) if d_val else ""
+            items = tuple(str(i) for i in (content.get("items") or []))
+            content = MappingProxyType(dict(content))
+        else:
+            content = _EMPTY
+        return cls(
+            id=sys.intern(id),
+            layer_id=sys.intern(layer_id),
+            category_id=_intern(category_id),
+            x_grid=x_grid,
+            y_grid=y_grid,
+            width_units=width_units,
+            depth_units=depth_units,
+            height_units=height_units if height_units is not None else 1.0,
+            z_offset=z_offset if z_offset is not None else 0.0,
+            color=_intern(color),
+            is_hole=bool(is_hole),
+            content=content,
+            items=items,
+            title_norm=normalize_string(title),
+            desc_norm=normalize_string(description),
+            items_norm=tuple(normalize_string(i) for i in items),
+        )
+
+    @classmethod
+    def from_orm(cls, bin_obj: Bin) -> "BinRecord":
+        return cls.build(
+            bin_obj.id, bin_obj.layer_id, bin_obj.category_id, bin_obj.x_grid, bin_obj.y_grid,
+            bin_obj.width_units, bin_obj.depth_units, bin_obj.height_units, bin_obj.z_offset,
+            bin_obj.content, bin_obj.color, bin_obj.is_hole,
+        )
+
+    def replace(self, **changes) -> "BinRecord":
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        values.update(changes)
+        return BinRecord(**values)
+
+
+class InventorySnapshot:
+    """État immuable de l'inventaire à une génération d'écriture donnée"""
+
+    __slots__ = ("generation", "built_at", "drawers", "layers", "categories", "bins",
+                 "layers_by_drawer", "bins_by_layer", "_rows")
+
+    def __init__(self, generation: int, drawers: Dict[str, DrawerRecord], layers: Dict[str, LayerRecord],
+                 categories: Dict[str, CategoryRecord], bins: Dict[str, BinRecord],
+                 layers_by_drawer: Dict[str, Tuple[str, ...]], bins_by_layer: Dict[str, Tuple[str, ...]],
+                 built_at: Optional[float] = None):
+        self.generation = generation
+        self.built_at = built_at if built_at is not None else time.time()
+        self.drawers = drawers
+        self.layers = layers
+        self.categories = categories
+        self.bins = bins
+        # Couches triées par z_index ; boîtes dans l'ordre de la base
+        self.layers_by_drawer = layers_by_drawer
+        self.bins_by_layer = bins_by_layer
+        self._rows: Optional[Tuple[Tuple[DrawerRecord, LayerRecord, BinRecord], ...]] = None
+
+    def _replace(self, generation: int, **changes) -> "InventorySnapshot":
+        values = {name: getattr(self, name) for name in (
+            "drawers", "layers", "categories", "bins", "layers_by_drawer", "bins_by_layer")}
+        values.update(changes)
+        return InventorySnapshot(generation, built_at=self.built_at, **values)
+
+    def rows(self) -> Tuple[Tuple[DrawerRecord, LayerRecord, BinRecord], ...]:
+        """(tiroir, couche, boîte) dans l'ordre de parcours des anciens endpoints, calculé une fois"""
+        if self._rows is None:
+            self._rows = tuple(
+                (drawer, self.layers[layer_id], self.bins[bin_id])
+                for drawer in self.drawers.values()
+                for layer_id in self.layers_by_drawer.get(drawer.id, ())
+                for bin_id in self.bins_by_layer.get(layer_id, ())
+            )
+        return self._rows
+
+    def iter_bins(self, include_holes: bool = False) -> Iterator[Tuple[DrawerRecord, LayerRecord, BinRecord]]:
+        for row in self.rows():
+            if include_holes or not row[2].is_hole:
+                yield row
+
+    def category_name(self, category_id: Optional[str]) -> Optional[str]:
+        category = self.categories.get(category_id) if category_id else None
+        return category.name if category else None
+
+    def locate(self, bin_id: str) -> Optional[Tuple[DrawerRecord, LayerRecord, BinRecord]]:
+        bin_rec = self.bins.get(bin_id)
+        if bin_rec is None:
+            return None
+        layer = self.layers.get(bin_rec.layer_id)
+        drawer = self.drawers.get(layer.drawer_id) if layer else None
+        return drawer, layer, bin_rec
+
+    def counts(self) -> Dict[str, int]:
+        return {"drawers": len(self.drawers), "layers": len(self.layers),
+                "categories": len(self.categories), "bins": len(self.bins)}
+
+
+# ============= CONSTRUCTION =============
+
+def _assemble(generation: int, drawers: Iterable[DrawerRecord], layers: Iterable[LayerRecord],
+              categories: Iterable[CategoryRecord], bins: Iterable[BinRecord]) -> InventorySnapshot:
+    drawer_map = {d.id: d for d in drawers}
+    layer_map = {l.id: l for l in layers}
+    by_drawer: Dict[str, list] = {}
+    for layer in layer_map.values():
+        by_drawer.setdefault(layer.drawer_id, []).append(layer)
+    layers_by_drawer = {
+        drawer_id: tuple(l.id for l in sorted(group, key=lambda l: l.z_index))
+        for drawer_id, group in by_drawer.items()
+    }
+    bin_map: Dict[str, BinRecord] = {}
+    by_layer: Dict[str, list] = {}
+    for bin_rec in bins:
+        bin_map[bin_rec.id] = bin_rec
+        by_layer.setdefault(bin_rec.layer_id, []).append(bin_rec.id)
+    return InventorySnapshot(
+        generation, drawer_map, layer_map, {c.id: c for c in categories}, bin_map,
+        layers_by_drawer, {layer_id: tuple(ids) for layer_id, ids in by_layer.items()},
+    )
+
+
+async def load_snapshot(db: AsyncSession, generation: int) -> InventorySnapshot:
+    """Construit un instantané complet (4 SELECT en colonnes, sans objets ORM)"""
+    drawers = [DrawerRecord(sys.intern(i), sys.intern(n), w, d) for i, n, w, d in (await db.execute(
+        select(Drawer.id, Drawer.name, Drawer.width_units, Drawer.depth_units))).all()]
+    layers = [LayerRecord(sys.intern(i), sys.intern(d), z)
+              for i, d, z in (await db.execute(select(Layer.id, Layer.drawer_id, Layer.z_index))).all()]
+    categories = [CategoryRecord(sys.intern(i), sys.intern(n))
+                  for i, n in (await db.execute(select(Category.id, Category.name))).all()]
+    rows = (await db.execute(select(
+        Bin.id, Bin.layer_id, Bin.category_id, Bin.x_grid, Bin.y_grid,
+        Bin.width_units, Bin.depth_units, Bin.height_units, Bin.z_offset, Bin.content, Bin.color, Bin.is_hole,
+    ))).all()
+    return _assemble(generation, drawers, layers, categories, (BinRecord.build(*row) for row in rows))
+
+
+# ============= PATCHS (copie sur écriture) =============
+
+def _with_bins(snap: InventorySnapshot, generation: int, upserts: Iterable[BinRecord] = (),
+               removals: Iterable[str] = ()) -> InventorySnapshot:
+    bins = dict(snap.bins)
+    by_layer = dict(snap.bins_by_layer)
+    for bin_id in removals:
+        old = bins.pop(bin_id, None)
+        if old is not None:
+            by_layer[old.layer_id] = tuple(i for i in by_layer.get(old.layer_id, ()) if i != bin_id)
+    for rec in upserts:
+        if rec.layer_id not in snap.layers:
+            raise KeyError(rec.layer_id)
+        old = bins.get(rec.id)
+        if old is not None and old.layer_id != rec.layer_id:
+            by_layer[old.layer_id] = tuple(i for i in by_layer.get(old.layer_id, ()) if i != rec.id)
+        if old is None or old.layer_id != rec.layer_id:
+            by_layer[rec.layer_id] = by_layer.get(rec.layer_id, ()) + (rec.id,)
+        bins[rec.id] = rec
+    return snap._replace(generation, bins=bins, bins_by_layer=by_layer)
+
+
+def _with_layers(snap: InventorySnapshot, generation: int, upserts: Iterable[LayerRecord]) -> InventorySnapshot:
+    layers = dict(snap.layers)
+    touched = set()
+    for rec in upserts:
+        if rec.drawer_id not in snap.drawers:
+            raise KeyError(rec.drawer_id)
+        layers[rec.id] = rec
+        touched.add(rec.drawer_id)
+    by_drawer = dict(snap.layers_by_drawer)
+    for drawer_id in touched:
+        group = [l for l in layers.values() if l.drawer_id == drawer_id]
+        by_drawer[drawer_id] = tuple(l.id for l in sorted(group, key=lambda l: l.z_index))
+    return snap._replace(generation, layers=layers, layers_by_drawer=by_drawer)
+
+
+def _without_drawer(snap: InventorySnapshot, generation: int, drawer_id: str) -> InventorySnapshot:
+    if drawer_id not in snap.drawers:
+        return snap
+    drawers = dict(snap.drawers)
+    drawers.pop(drawer_id, None)
+    layer_ids = snap.layers_by_drawer.get(drawer_id, ())
+    layers = {k: v for k, v in snap.layers.items() if v.drawer_id != drawer_id}
+    layers_by_drawer = {k: v for k, v in snap.layers_by_drawer.items() if k != drawer_id}
+    doomed = {bin_id for layer_id in layer_ids for bin_id in snap.bins_by_layer.get(layer_id, ())}
+    bins = {k: v for k, v in snap.bins.items() if k not in doomed}
+    bins_by_layer = {k: v for k, v in snap.bins_by_layer.items() if k not in layer_ids}
+    return snap._replace(generation, drawers=drawers, layers=layers, layers_by_drawer=layers_by_drawer,
+                         bins=bins, bins_by_layer=bins_by_layer)
+
+
+class SnapshotStore:
+    """
+    Instantané courant + reconstruction à la demande. Les méthodes *_changed /
+    *_removed sont appelées par les endpoints d'écriture, sous le verrou
+    d'écriture et après commit (le compteur de génération est incrémenté juste après).
+    """
+
+    def __init__(self, coordinator):
+        self.coordinator = coordinator
+        self._current: Optional[InventorySnapshot] = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+        self.patches = 0
+
+    @property
+    def current(self) -> Optional[InventorySnapshot]:
+        return self._current
+
+    def clear(self) -> None:
+        self._current = None
+
+    async def get(self, db: AsyncSession) -> InventorySnapshot:
+        """Instantané à jour (reconstruit si une écriture non patchée est survenue)"""
+        snap = self._current
+        if snap is not None and snap.generation == self.coordinator.current_generation():
+            return snap
+        async with self._lock:
+            generation = self.coordinator.current_generation()
+            snap = self._current
+            if snap is not None and snap.generation == generation:
+                return snap
+            snap = await load_snapshot(db, generation)
+            self._current = snap
+            self.builds += 1
+            return snap
+
+    def _patch(self, fn) -> None:
+        snap = self._current
+        generation = self.coordinator.current_generation()
+        # generation + 1 : déjà patché par cette même transaction
+        if snap is None or snap.generation not in (generation, generation + 1):
+            self._current = None
+            return
+        try:
+            self._current = fn(snap, generation + 1)
+            self.patches += 1
+        except KeyError:
+            # Parent absent de l'instantané : reconstruction à la prochaine lecture
+            self._current = None
+
+    def bins_changed(self, bin_objs: Iterable[Bin]) -> None:
+        records = [BinRecord.from_orm(b) for b in bin_objs]
+        self._patch(lambda snap, gen: _with_bins(snap, gen, upserts=records))
+
+    def bins_removed(self, bin_ids: Iterable[str]) -> None:
+        ids = list(bin_ids)
+        self._patch(lambda snap, gen: _with_bins(snap, gen, removals=ids))
+
+    def layer_changed(self, layer: Layer) -> None:
+        rec = LayerRecord(sys.intern(layer.id), sys.intern(layer.drawer_id), layer.z_index)
+        self._patch(lambda snap, gen: _with_layers(snap, gen, [rec]))
+
+    def drawer_changed(self, drawer: Drawer) -> None:
+        """Tiroir créé ou remplacé, avec ses couches et boîtes chargées"""
+        drawer_rec = DrawerRecord(sys.intern(drawer.id), sys.intern(drawer.name),
+                                  drawer.width_units, drawer.depth_units)
+        layer_recs = [LayerRecord(sys.intern(l.id), drawer_rec.id, l.z_index) for l in drawer.layers]
+        bin_recs = [BinRecord.from_orm(b) for l in drawer.layers for b in l.bins]
+
+        def apply(snap, gen):
+            snap = _without_drawer(snap, gen, drawer_rec.id)
+            snap = snap._replace(gen, drawers={**snap.drawers, drawer_rec.id: drawer_rec})
+            snap = _with_layers(snap, gen, layer_recs)
+            return _with_bins(snap, gen, upserts=bin_recs)
+
+        self._patch(apply)
+
+    def drawer_removed(self, drawer_id: str) -> None:
+        self._patch(lambda snap, gen: _without_drawer(snap, gen, drawer_id))
+
+    def category_changed(self, category: Category) -> None:
+        rec = CategoryRecord(sys.intern(category.id), sys.intern(category.name))
+        self._patch(lambda snap, gen: snap._replace(gen, categories={**snap.categories, rec.id: rec}))
+
+    def category_removed(self, category_id: str) -> None:
+        def apply(snap, gen):
+            categories = {k: v for k, v in snap.categories.items() if k != category_id}
+            orphans = [b.replace(category_id=None) for b in snap.bins.values() if b.category_id == category_id]
+            snap = snap._replace(gen, categories=categories)
+            return _with_bins(snap, gen, upserts=orphans) if orphans else snap
+
+        self._patch(apply)
+
+    # ---- Diagnostic ----
+
+    async def verify(self, db: AsyncSession) -> dict:
+        """Compare l'instantané courant à un instantané reconstruit depuis la base"""
+        snap = await self.get(db)
+        fresh = await load_snapshot(db, snap.generation)
+        report: Dict[str, Any] = {"generation": snap.generation, "consistent": True}
+        for kind in ("drawers", "layers", "categories", "bins"):
+            mine, theirs = getattr(snap, kind), getattr(fresh, kind)
+            diff = {
+                "missing": sorted(set(theirs) - set(mine)),
+                "extra": sorted(set(mine) - set(theirs)),
+                "different": sorted(k for k in set(mine) & set(theirs) if mine[k] != theirs[k]),
+            }
+            if any(diff.values()):
+                report["consistent"] = False
+                report[kind] = diff
+        for kind in ("layers_by_drawer", "bins_by_layer"):
+            mine, theirs = getattr(snap, kind), getattr(fresh, kind)
+            keys = {k for k in set(mine) | set(theirs) if set(mine.get(k, ())) != set(theirs.get(k, ()))}
+            if keys:
+                report["consistent"] = False
+                report[kind] = sorted(keys)
+        return report
+
+
+def memory_footprint(snap: InventorySnapshot) -> dict:
+    """
+    Taille mémoire approximative (sys.getsizeof récursif, objets partagés
+    comptés une fois) et projection pour 10 000 boîtes.
+    """
+    seen: set = set()
+
+    def size(obj) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, (dict, MappingProxyType)):
+            items = obj.items() if isinstance(obj, dict) else dict(obj).items()
+            total += sum(size(k) + size(v) for k, v in items)
+        elif isinstance(obj, (tuple, list, set, frozenset)):
+            total += sum(size(v) for v in obj)
+        elif hasattr(obj, "__slots__") and not isinstance(obj, type):
+            total += sum(size(getattr(obj, f.name)) for f in fields(obj))
+        return total
+
+    parts = {kind: size(getattr(snap, kind)) for kind in (
+        "drawers", "layers", "categories", "bins", "layers_by_drawer", "bins_by_layer")}
+    total = sum(parts.values())
+    bin_count = len(snap.bins)
+    per_bin = total / bin_count if bin_count else 0.0
+    return {
+        "total_bytes": total,
+        "bytes_by_part": parts,
+        "bytes_per_bin": round(per_bin, 1),
+        "projected_10k_bins_mb": round(per_bin * 10_000 / (1024 * 1024), 2),
+    }
+
+
+store = SnapshotStore(write_coordinator)
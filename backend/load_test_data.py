@@ -1,108 +1,357 @@
 #!/usr/bin/env python3
 """
-Script pour charger les données de test dans l'API
-Usage: python load_test_data.py
+Générateur de charge concurrent pour l'API ScanGRID.
+
+Démarre (par défaut) une instance uvicorn locale sur une base temporaire
+(SCANGRID_DB_DIR), la peuple via POST /api/drawers avec un inventaire
+synthétique, puis envoie un mélange configurable de lectures, recherches et
+PATCH à un débit / une concurrence cible. Affiche le débit, les latences
+p50/p95/p99 et le taux d'erreurs par endpoint.
+
+Usage:
+    python load_test_data.py --duration 30 --rps 50 --concurrency 16
+    python load_test_data.py --mix get_drawer=40,locate=30,patch_bin=30 --workers 4
+    python load_test_data.py --url http://raspberrypi.local:8000 --no-seed
+    python load_test_data.py --scaling 1,2,4 --duration 15 --concurrency 32
 """
+import argparse
 import asyncio
+import contextlib
 import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
 import httpx
 
+from inventory_generator import generate_inventory, percentile, sample_queries
 
-async def load_test_data():
-    """Charge les données de test depuis test_data.json"""
-    base_url = "http://localhost:8000"
-    
-    print("📦 Chargement des données de test...")
-    print("=" * 50)
-    
-    # Lire le fichier JSON
-    with open("test_data.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    async with httpx.AsyncClient() as client:
-        # Vérifier que le serveur est accessible
-        try:
-            response = await client.get(f"{base_url}/")
-            if response.status_code != 200:
-                print("❌ Serveur non accessible")
-                return
-            print(f"✅ Serveur accessible: {response.json()['service']}\n")
-        except Exception as e:
-            print(f"❌ Erreur de connexion: {e}")
-            print("\n⚠️  Assurez-vous que le serveur est lancé:")
-            print("   cd backend && ./dev.sh")
-            return
-        
-        # Créer chaque tiroir
-        created_ids = []
-        for i, drawer_data in enumerate(data["drawers"], 1):
-            print(f"{i}. Création du tiroir '{drawer_data['name']}'...")
-            
+DEFAULT_MIX = "list_drawers=5,get_drawer=30,get_bin=10,locate=20,bom_search=15,patch_bin=20"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"❌ Opération(s) inconnue(s) : {', '.join(sorted(unknown))} "
+                         f"(disponibles : {', '.join(OPERATIONS)})")
+    return mix
+
+
+# ============= SERVEUR LOCAL =============
+
+class LocalServer:
+    """Instance uvicorn éphémère sur une base temporaire"""
+
+    def __init__(self, workers: int = 1, port: int | None = None, show_logs: bool = False):
+        self.workers = workers
+        self.show_logs = show_logs
+        self.port = port or _free_port()
+        self.db_dir = tempfile.mkdtemp(prefix="scangrid-load-")
+        self.proc: subprocess.Popen | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def __aenter__(self):
+        env = {**os.environ, "SCANGRID_DB_DIR": self.db_dir, "SCANGRID_WORKERS": str(self.workers)}
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            stdout=None if self.show_logs else subprocess.DEVNULL,
+            stderr=None if self.show_logs else subprocess.DEVNULL,
+        )
+        async with httpx.AsyncClient() as client:
+            for _ in range(150):
+                if self.proc.poll() is not None:
+                    raise RuntimeError("❌ uvicorn s'est arrêté au démarrage")
+                try:
+                    if (await client.get(f"{self.url}/api/health")).status_code == 200:
+                        return self
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError("❌ uvicorn ne répond pas sur /api/health")
+
+    async def __aexit__(self, *exc):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
             try:
-                response = await client.post(
-                    f"{base_url}/drawers",
-                    json=drawer_data
-                )
-                
-                if response.status_code == 201:
-                    result = response.json()
-                    drawer_id = result["drawer_id"]
-                    created_ids.append(drawer_id)
-                    
-                    total_bins = sum(len(layer["bins"]) for layer in result["layers"])
-                    print(f"   ✅ ID: {drawer_id}")
-                    print(f"      Couches: {len(result['layers'])}")
-                    print(f"      Boîtes: {total_bins}")
-                else:
-                    print(f"   ❌ Erreur {response.status_code}: {response.text}")
-            
-            except Exception as e:
-                print(f"   ❌ Erreur: {e}")
-            
-            print()
-        
-        # Afficher le résumé
-        print("=" * 50)
-        print(f"✅ {len(created_ids)} tiroir(s) créé(s) avec succès!")
-        print("\n📋 IDs créés:")
-        for drawer_id in created_ids:
-            print(f"   - {drawer_id}")
-        
-        # Lister tous les tiroirs
-        print("\n📊 Liste complète des tiroirs:")
-        response = await client.get(f"{base_url}/drawers")
-        drawers = response.json()
-        
-        for drawer in drawers:
-            total_bins = sum(len(layer["bins"]) for layer in drawer["layers"])
-            print(f"\n   📦 {drawer['name']}")
-            print(f"      ID: {drawer['drawer_id']}")
-            print(f"      Couches: {len(drawer['layers'])}")
-            print(f"      Boîtes: {total_bins}")
-            
-            # Détail des boîtes
-            for layer in drawer["layers"]:
-                print(f"      └─ Z={layer['z_index']}: {len(layer['bins'])} boîte(s)")
-                for bin_obj in layer["bins"]:
-                    pos = f"({bin_obj['x_grid']},{bin_obj['y_grid']})"
-                    size = f"{bin_obj['width_units']}x{bin_obj['depth_units']}"
-                    label = bin_obj['label_text'] or "Sans label"
-                    print(f"         • {pos} {size} - {label}")
-        
-        print("\n" + "=" * 50)
-        print("🎉 Données de test chargées avec succès!")
-        print(f"\n🌐 Accédez à l'API sur: {base_url}/docs")
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        shutil.rmtree(self.db_dir, ignore_errors=True)
 
 
-if __name__ == "__main__":
+# ============= CHARGE =============
+
+class Workload:
+    """État partagé : ids connus et requêtes de recherche réalistes"""
+
+    def __init__(self, inventory, seed: int):
+        self.rng = random.Random(seed)
+        self.queries = sample_queries(inventory, count=200, seed=seed) or ["vis"]
+        self.drawer_ids: list[str] = []
+        self.bin_ids: list[str] = []
+
+
+async def _op_list_drawers(client, w):
+    return await client.get("/api/drawers")
+
+
+async def _op_get_drawer(client, w):
+    return await client.get(f"/api/drawers/{w.rng.choice(w.drawer_ids)}")
+
+
+async def _op_get_bin(client, w):
+    return await client.get(f"/api/bins/{w.rng.choice(w.bin_ids)}")
+
+
+async def _op_locate(client, w):
+    return await client.get("/api/locate", params={"query": w.rng.choice(w.queries)})
+
+
+async def _op_bom_search(client, w):
+    return await client.get("/api/bom/search", params={"q": w.rng.choice(w.queries)})
+
+
+async def _op_patch_bin(client, w):
+    return await client.patch(
+        f"/api/bins/{w.rng.choice(w.bin_ids)}",
+        json={"x_grid": w.rng.randint(0, 8), "y_grid": w.rng.randint(0, 8)},
+    )
+
+
+OPERATIONS = {
+    "list_drawers": _op_list_drawers,
+    "get_drawer": _op_get_drawer,
+    "get_bin": _op_get_bin,
+    "locate": _op_locate,
+    "bom_search": _op_bom_search,
+    "patch_bin": _op_patch_bin,
+}
+
+
+async def seed(client: httpx.AsyncClient, inventory, concurrency: int) -> tuple[list[str], list[str]]:
+    """Peuple la base via le chemin bulk POST /api/drawers (tiroirs complets)"""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def post(drawer):
+        async with sem:
+            r = await client.post("/api/drawers", json=drawer)
+            r.raise_for_status()
+            return r.json()
+
+    created = await asyncio.gather(*(post(d) for d in inventory))
+    drawer_ids = [d["drawer_id"] for d in created]
+    bin_ids = [b["bin_id"] for d in created for l in d["layers"] for b in l["bins"]]
+    return drawer_ids, bin_ids
+
+
+async def drive(client, workload: Workload, mix: dict[str, float], duration: float,
+                rps: float, concurrency: int) -> tuple[dict, float]:
+    """
+    Boucle ouverte si rps > 0 (les requêtes partent à cadence fixe, bornées par
+    la concurrence), sinon boucle fermée avec `concurrency` clients en continu.
+    En boucle ouverte, la latence part de l'heure d'envoi prévue : l'attente
+    d'une place de concurrence compte (pas d'omission coordonnée, p95/p99
+    honnêtes quand le serveur sature).
+    """
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    sem = asyncio.Semaphore(concurrency)
+    pending: set[asyncio.Task] = set()
+
+    async def one(scheduled: float | None = None):
+        name = workload.rng.choices(names, weights)[0]
+        start = time.perf_counter() if scheduled is None else scheduled
+        try:
+            r = await OPERATIONS[name](client, workload)
+            if r.status_code >= 400:
+                errors[name] += 1
+        except httpx.HTTPError:
+            errors[name] += 1
+        samples[name].append(time.perf_counter() - start)
+
+    async def paced(scheduled: float):
+        async with sem:
+            await one(scheduled)
+
+    started = time.perf_counter()
+    deadline = started + duration
+    if rps > 0:
+        interval = 1.0 / rps
+        next_at = started
+        while time.perf_counter() < deadline:
+            task = asyncio.create_task(paced(next_at))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        if pending:
+            await asyncio.gather(*pending)
+    else:
+        async def worker():
+            while time.perf_counter() < deadline:
+                await one()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for name in names:
+        ms = sorted(s * 1000.0 for s in samples[name])
+        n = len(ms)
+        report[name] = {
+            "requests": n,
+            "errors": errors[name],
+            "error_rate": round(errors[name] / n, 4) if n else 0.0,
+            "throughput_rps": round(n / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(ms, 0.50), 2),
+            "p95_ms": round(percentile(ms, 0.95), 2),
+            "p99_ms": round(percentile(ms, 0.99), 2),
+        }
+    return report, elapsed
+
+
+def print_report(report: dict, elapsed: float) -> None:
+    total = sum(r["requests"] for r in report.values())
+    total_err = sum(r["errors"] for r in report.values())
+    print("=" * 78)
+    print(f"{'endpoint':<14}{'req':>8}{'req/s':>9}{'err %':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in report.items():
+        print(f"{name:<14}{r['requests']:>8}{r['throughput_rps']:>9.1f}{r['error_rate'] * 100:>8.2f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    print("-" * 78)
+    print(f"Total : {total} requêtes en {elapsed:.1f}s → {total / elapsed if elapsed else 0:.1f} req/s, "
+          f"{total_err} erreur(s)")
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    inventory = generate_inventory(args.drawers, args.layers, args.bins, seed=args.seed)
+    workload = Workload(inventory, args.seed)
+
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            base_url = args.url
+        else:
+            server = await stack.enter_async_context(LocalServer(workers=args.workers, port=args.port, show_logs=args.server_logs))
+            base_url = server.url
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits)
+        )
+        if not args.no_seed:
+            print(f"📦 Peuplement : {args.drawers} tiroir(s) × {args.layers} couche(s) × {args.bins} boîte(s)…")
+            t0 = time.perf_counter()
+            workload.drawer_ids, workload.bin_ids = await seed(client, inventory, args.concurrency)
+            print(f"✅ {len(workload.bin_ids)} boîtes créées en {time.perf_counter() - t0:.1f}s")
+        else:
+            listing = (await client.get("/api/drawers")).json()
+            workload.drawer_ids = [d["drawer_id"] for d in listing]
+            workload.bin_ids = [b["bin_id"] for d in listing for l in d["layers"] for b in l["bins"]]
+        if not workload.drawer_ids or not workload.bin_ids:
+            raise SystemExit("❌ Inventaire vide : rien à solliciter")
+
+        target = f"{args.rps} req/s" if args.rps > 0 else "boucle fermée"
+        print(f"🚀 Charge : {args.duration}s, {target}, concurrence {args.concurrency}, {base_url}")
+        report, elapsed = await drive(client, workload, mix, args.duration, args.rps, args.concurrency)
+
+    print_report(report, elapsed)
+    return {
+        "meta": {
+            "workers": args.workers, "rps": args.rps, "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2), "mix": mix, "seed": args.seed,
+            "drawers": args.drawers, "layers": args.layers, "bins_per_layer": args.bins,
+        },
+        "results": report,
+    }
+
+
+async def run_scaling(args, worker_counts: list[int]) -> dict:
+    """Même charge contre 1..N workers : débit total et accélération relative"""
+    runs = {}
+    for workers in worker_counts:
+        print(f"\n===== {workers} worker(s) =====")
+        args.workers = workers
+        runs[str(workers)] = await run(args)
+
+    print("=" * 78)
+    print(f"{'workers':<10}{'req/s':>10}{'x':>8}{'p95 ms':>10}{'err %':>8}")
+    base_rps = None
+    for workers, result in runs.items():
+        results = result["results"].values()
+        total = sum(r["requests"] for r in results)
+        errors = sum(r["errors"] for r in results)
+        rps = total / result["meta"]["duration_s"] if result["meta"]["duration_s"] else 0.0
+        base_rps = base_rps or rps
+        p95 = max((r["p95_ms"] for r in results), default=0.0)
+        result["meta"]["total_rps"] = round(rps, 1)
+        print(f"{workers:<10}{rps:>10.1f}{rps / base_rps if base_rps else 0:>8.2f}{p95:>10.1f}"
+              f"{errors / total * 100 if total else 0:>8.2f}")
+    return {"scaling": runs}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Générateur de charge ScanGRID")
+    parser.add_argument("--url", help="cibler un serveur existant au lieu d'en démarrer un")
+    parser.add_argument("--port", type=int, help="port du serveur local (défaut: libre)")
+    parser.add_argument("--workers", type=int, default=1, help="workers uvicorn du serveur local")
+    parser.add_argument("--scaling", help="liste de nombres de workers à comparer, ex. 1,2,4")
+    parser.add_argument("--server-logs", action="store_true", help="afficher les logs du serveur local")
+    parser.add_argument("--no-seed", action="store_true", help="utiliser l'inventaire existant")
+    parser.add_argument("--drawers", type=int, default=20)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--bins", type=int, default=30, help="boîtes par couche")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pondérations (défaut: {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=20.0, help="durée de la charge (s)")
+    parser.add_argument("--rps", type=float, default=0.0, help="débit cible (0 = boucle fermée)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("-o", "--output", help="fichier JSON de résultats")
+    args = parser.parse_args()
+
+    if args.scaling and args.url:
+        parser.error("--scaling démarre ses propres serveurs : incompatible avec --url")
+
     try:
-        asyncio.run(load_test_data())
+        if args.scaling:
+            result = asyncio.run(run_scaling(args, [int(n) for n in args.scaling.split(",") if n.strip()]))
+        else:
+            result = asyncio.run(run(args))
     except KeyboardInterrupt:
-        print("\n\n⚠️  Chargement interrompu")
-    except FileNotFoundError:
-        print("❌ Fichier test_data.json non trouvé")
-        print("   Assurez-vous d'être dans le répertoire backend/")
-    except Exception as e:
-        print(f"❌ Erreur: {e}")
-        import traceback
-        traceback.print_exc()
+        print("\n\n⚠️  Charge interrompue")
+        return 130
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    runs = result["scaling"].values() if "scaling" in result else [result]
+    errors = sum(r["errors"] for run_result in runs for r in run_result["results"].values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Pipeline de logs non bloquant.
+
+Les handlers applicatifs n'écrivent jamais directement sur stdout/journald :
+chaque enregistrement est posé dans une file en mémoire (QueueHandler) et un
+thread dédié (QueueListener) le formate puis l'écrit. Le formatage des
+arguments `%`-style est lui aussi différé dans ce thread.
+
+Configuration (variables d'environnement) :
+  - LOG_LEVEL              : DEBUG, INFO (défaut), WARNING, ERROR
+  - SCANGRID_LOG_FORMAT    : "text" (défaut) ou "json" (une ligne JSON par log)
+  - SCANGRID_LOG_SAMPLING  : échantillonnage des logs INFO/DEBUG par endpoint,
+                             ex. "update_bin=0.1,get_drawer=0.2" ("" = aucun)
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Endpoints les plus fréquents (drag & drop, rafraîchissements) : 1 log INFO sur N
+DEFAULT_SAMPLING = "update_bin=0.1,get_bin=0.1,get_drawer=0.2"
+
+# Loggers uvicorn dont les handlers synchrones sont aussi déportés dans la file
+_UVICORN_LOGGERS = ("uvicorn", "uvicorn.access")
+
+_listeners: list[tuple] = []
+_configured = False
+
+
+class lazy:
+    """
+    Argument de log évalué seulement au formatage (dans le thread d'écriture) :
+        logger.info("Données: %s", lazy(model.model_dump, exclude_none=True))
+    """
+
+    __slots__ = ("_fn", "_args", "_kwargs")
+
+    def __init__(self, fn: Callable, *args, **kwargs):
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self._fn(*self._args, **self._kwargs))
+
+    __repr__ = __str__
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler qui ne formate rien dans le thread appelant : la file est
+    en mémoire (pas de pickling), l'enregistrement brut suffit.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Ne garde qu'une fraction des logs INFO/DEBUG émis depuis certains endpoints
+    (identifiés par le nom de la fonction handler). WARNING et plus : toujours gardés.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.funcName)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement (journald / pm2 / collecteurs)"""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "color_message"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "func": record.funcName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                payload[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def parse_sampling(spec: Optional[str]) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            rates[name.strip()] = max(0.0, min(1.0, float(value)))
+        except ValueError:
+            continue
+    return rates
+
+
+def _make_formatter(fmt: str) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def _defer(logger: logging.Logger, sampling: Optional[SamplingFilter]) -> None:
+    """Remplace les handlers d'un logger par une file + un thread d'écriture"""
+    handlers = [h for h in logger.handlers if not isinstance(h, QueueHandler)]
+    if not handlers:
+        return
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(q)
+    if sampling is not None:
+        queue_handler.addFilter(sampling)
+    for h in handlers:
+        logger.removeHandler(h)
+    logger.addHandler(queue_handler)
+    listener = QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append((logger, queue_handler, listener, handlers))
+
+
+def configure_logging() -> None:
+    """
+    Installe le pipeline (idempotent). Comme logging.basicConfig, le logger
+    racine n'est pas touché s'il a déjà des handlers (pytest, application hôte).
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    fmt = os.getenv("SCANGRID_LOG_FORMAT", "text").lower()
+    sampling = SamplingFilter(parse_sampling(os.getenv("SCANGRID_LOG_SAMPLING", DEFAULT_SAMPLING)))
+
+    root = logging.getLogger()
+    if not root.handlers:
+        root.setLevel(level)
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(_make_formatter(fmt))
+        root.addHandler(stream)
+        _defer(root, sampling)
+
+    for name in _UVICORN_LOGGERS:
+        uv_logger = logging.getLogger(name)
+        if fmt == "json":
+            for h in uv_logger.handlers:
+                h.setFormatter(_make_formatter(fmt))
+        _defer(uv_logger, None)
+
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Vide les files, arrête les threads d'écriture et restaure les handlers"""
+    global _configured
+    _configured = False
+    while _listeners:
+        logger, queue_handler, listener, handlers = _listeners.pop()
+        listener.stop()
+        logger.removeHandler(queue_handler)
+        for h in handlers:
+            logger.addHandler(h)
@@ -2,25 +2,52 @@
 API FastAPI pour la gestion d'inventaire Gridfinity
 Serveur ultra-léger pour Raspberry Pi
 """
+import time
+import startup
+# Chronométrage des imports pour le rapport de démarrage (/api/health/startup)
+startup.start_import_timer()
+
+import asyncio
 import logging
 import os
 from pathlib import Path
 from contextlib import asynccontextmanager
-from typing import List
-import unicodedata
+from typing import List, Optional
+from functools import lru_cache
 import difflib
+import heapq
 
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, Query, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy import select, delete, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from pydantic import BaseModel
-from database import get_db, init_db
-from models import Drawer, Layer, Bin, Category, Project, ProjectBin
+from pydantic import BaseModel, Field
+import backup
+import bin_items
+import coalescer
+import deletes
+import facet_index
+import features
+import inventory_snapshot
+import metrics
+import ollama_client
+import phonetic
+import photo_store
+import query_budget
+import response_cache
+import semantic_index
+import short_ids
+import stats
+import transfer
+import writer
+from logging_setup import configure_logging, shutdown_logging
+from database import async_session_maker, get_db, get_write_db, init_db, write_coordinator
+from models import Drawer, Layer, Bin, Category
+from inventory_snapshot import BinRecord, normalize_string
 from schemas import (
     DrawerCreate,
     DrawerResponse,
@@ -35,18 +62,8 @@ from schemas import (
     CategoryResponse,
 )
 
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
-    logger.warning("⚠️ Ollama non disponible - pip install ollama")
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configuration du logging : file en mémoire + thread d'écriture (jamais bloquant)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -54,7 +71,9 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Initialise la base de données au démarrage"""
     logger.info("🚀 Démarrage du serveur ScanGRID...")
+    t0 = time.perf_counter()
     await init_db()
+    startup.record_phase("init_db", time.perf_counter() - t0)
 
     # ---- Migrations de colonnes (ALTER TABLE idempotent) ----
     # SQLite ne supporte pas "ADD COLUMN IF NOT EXISTS",
@@ -64,17 +83,62 @@ async def lifespan(app: FastAPI):
     _migrations = [
         "ALTER TABLE project_bins ADD COLUMN url TEXT",
     ]
-    async with _engine.begin() as conn:
+    async with write_coordinator.write_lock(), _engine.begin() as conn:
         for stmt in _migrations:
             try:
                 await conn.execute(text(stmt))
-                logger.info(f"✅ Migration OK : {stmt}")
+                logger.info("✅ Migration OK : %s", stmt)
             except Exception:
                 # Colonne déjà présente — on ignore silencieusement
                 pass
+        # Articles extraits de content["items"] (table neuve ou vide)
+        await bin_items.backfill(conn)
+        # Anciens UUID → ids courts (après migrate_short_ids.py)
+        await short_ids.load_aliases(conn)
+
+    # Instantané mémoire de l'inventaire, prêt avant la première recherche
+    t0 = time.perf_counter()
+    async with async_session_maker() as session:
+        await inventory_snapshot.store.get(session)
+    startup.record_phase("inventory_snapshot", time.perf_counter() - t0)
+
+    # IA / PDF / projets : import à la première requête, sauf SCANGRID_LAZY_FEATURES=0
+    if not features.LAZY:
+        t0 = time.perf_counter()
+        await features.load_all(app)
+        startup.record_phase("features", time.perf_counter() - t0)
+
+    # Client Ollama partagé : créé (httpx importé) à la première requête IA ;
+    # au démarrage seulement pour précharger le modèle (SCANGRID_OLLAMA_WARMUP)
+    if "ai" in features.ENABLED and ollama_client.WARMUP:
+        t0 = time.perf_counter()
+        app.state.ollama_warmup = asyncio.create_task(ollama_client.client.warm_up())
+        startup.record_phase("ollama_client", time.perf_counter() - t0)
+
+    # Embeddings des boîtes nouvelles ou modifiées, en tâche de fond
+    if semantic_index.ENABLED:
+        app.state.semantic_prefill = asyncio.create_task(_semantic_prefill())
 
     yield
     logger.info("🛑 Arrêt du serveur ScanGRID")
+    for task_name in ("ollama_warmup", "semantic_prefill"):
+        task = getattr(app.state, task_name, None)
+        if task is not None and not task.done():
+            task.cancel()
+    # Client Ollama créé à la demande (IA, index sémantique) : fermé s'il a servi
+    await ollama_client.client.aclose()
+    photo_store.shutdown()
+    shutdown_logging()
+
+
+async def _semantic_prefill():
+    """Synchronise l'index sémantique au démarrage (Ollama absent : à la première requête)"""
+    try:
+        async with async_session_maker() as session:
+            snapshot = await inventory_snapshot.store.get(session)
+            await semantic_index.index.sync(session, snapshot)
+    except semantic_index.SemanticUnavailable as e:
+        logger.warning("⚠️ Index sémantique non préparé : %s", e)
 
 
 # Création de l'application FastAPI
@@ -86,7 +150,11 @@ app = FastAPI(
     # root_path="/api" # REMOVED: C'est peut-être la source du problème si Cloudflare n'enlève pas le préfixe
 )
 
-# CORS mis en PREMIER, avant le montage du routeur
+# Cache des GET répétés, au plus près du routeur (SCANGRID_CACHE_ROUTES)
+app.add_middleware(response_cache.ResponseCacheMiddleware)
+# Anciens UUID réécrits en ids courts avant le cache et le routage
+app.add_middleware(short_ids.IdAliasMiddleware)
+# CORS juste au-dessus du cache (en-têtes propres à chaque requête), avant le montage du routeur
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -95,6 +163,17 @@ app.add_middleware(
     allow_credentials=True,
     expose_headers=["*"]
 )
+# Latence / volume par route pour /api/metrics
+app.add_middleware(metrics.MetricsMiddleware)
+# Comptage SQL par requête + détection N+1 (SCANGRID_SQL_DEBUG=1)
+app.add_middleware(query_budget.QueryBudgetMiddleware)
+# Invalidation des caches quand un autre worker a écrit (SCANGRID_WORKERS > 1)
+app.add_middleware(writer.InvalidationMiddleware, coordinator=write_coordinator)
+write_coordinator.register_invalidation_hook(response_cache.on_remote_write)
+# Montage à la demande des routes IA / PDF / projets
+app.add_middleware(features.LazyFeatureMiddleware, fastapi_app=app)
+# Délai processus → première réponse (rapport de démarrage)
+app.add_middleware(startup.FirstRequestMiddleware)
 
 # Création d'un routeur principal pour ajouter le préfixe /api
 api_router = APIRouter()
@@ -117,7 +196,7 @@ async def health_api():
     return {"status": "healthy"}
 
 if FRONTEND_DIST.exists():
-    logger.info(f"📦 Serving frontend from {FRONTEND_DIST}")
+    logger.info("📦 Serving frontend from %s", FRONTEND_DIST)
     app.mount("/assets", StaticFiles(directory=FRONTEND_DIST / "assets"), name="assets")
 
 
@@ -133,6 +212,81 @@ async def health():
     }
 
 
+@api_router.get("/health/startup", tags=["Health"])
+async def health_startup():
+    """Rapport de démarrage : imports, init_db, fonctionnalités, 1re requête"""
+    return {**startup.report(), "features": features.status_report()}
+
+
+@api_router.get("/health/snapshot", tags=["Health"])
+async def health_snapshot(verify: bool = False, db: AsyncSession = Depends(get_db)):
+    """
+    Instantané mémoire de l'inventaire : taille, empreinte mémoire (projection
+    pour 10 000 boîtes) et, avec ?verify=true, comparaison complète avec la base.
+    """
+    store = inventory_snapshot.store
+    snapshot = await store.get(db)
+    report = {
+        "generation": snapshot.generation,
+        "built_at": snapshot.built_at,
+        "builds": store.builds,
+        "patches": store.patches,
+        "counts": snapshot.counts(),
+        "memory": inventory_snapshot.memory_footprint(snapshot),
+    }
+    if verify:
+        report["consistency"] = await store.verify(db)
+    return report
+
+
+@api_router.get("/health/cache", tags=["Health"])
+async def health_cache():
+    """Cache des réponses GET : routes actives, TTL, taux de hit, taille"""
+    return response_cache.cache.report()
+
+
+@api_router.get("/health/semantic", tags=["Health"])
+async def health_semantic():
+    """Index sémantique : activation, modèle, boîtes indexées, embeddings calculés"""
+    return semantic_index.index.report()
+
+
+@api_router.get("/backup", tags=["Health"], summary="Télécharger un instantané de la base")
+async def download_backup(gzip: bool = False):
+    """
+    Instantané cohérent de gridfinity.db (API de backup en ligne de SQLite,
+    par petits pas : le service continue de répondre pendant la copie).
+    """
+    try:
+        chunks, filename, report = await backup.download(compress=gzip)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Base de données introuvable")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else "application/vnd.sqlite3",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Backup-Pages": str(report["pages"]),
+            "X-Backup-Duration-Ms": str(report["duration_ms"]),
+        },
+    )
+
+
+@api_router.post("/backup", tags=["Health"], summary="Sauvegarder la base dans SCANGRID_BACKUP_DIR")
+async def create_backup(gzip: bool = False, keep: Optional[int] = Query(None, ge=1)):
+    """Sauvegarde horodatée avec rotation ; retourne durée, pages copiées et fichiers supprimés"""
+    try:
+        return await backup.backup_to_dir(compress=gzip, keep=keep)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Base de données introuvable")
+
+
+@api_router.get("/metrics", tags=["Health"], include_in_schema=False)
+async def prometheus_metrics():
+    """Métriques au format texte Prometheus (requêtes, SQL, Ollama, pypdf)"""
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
+
+
 @api_router.post(
     "/drawers",
     response_model=DrawerResponse,
@@ -142,14 +296,14 @@ async def health():
 )
 async def create_or_replace_drawer(
     drawer_data: DrawerCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Crée ou remplace un tiroir complet avec ses couches et boîtes.
     Opération transactionnelle : si une insertion échoue, tout est annulé.
     """
     try:
-        logger.info(f"📥 POST /drawers - Création du tiroir '{drawer_data.name}' ({drawer_data.width_units}x{drawer_data.depth_units})")
+        logger.info("📥 POST /drawers - Création du tiroir '%s' (%sx%s)", drawer_data.name, drawer_data.width_units, drawer_data.depth_units)
         
         # Créer le tiroir
         drawer = Drawer(
@@ -170,13 +324,14 @@ async def create_or_replace_drawer(
             await db.flush()  # Force l'assignation de layer.id avant de créer les bins
             
             for bin_data in layer_data.bins:
+                content = bin_data.content.model_dump() if hasattr(bin_data.content, 'model_dump') else bin_data.content
                 bin_obj = Bin(
                     layer_id=layer.id,
                     x_grid=bin_data.x_grid,
                     y_grid=bin_data.y_grid,
                     width_units=bin_data.width_units,
                     depth_units=bin_data.depth_units,
-                    content=bin_data.content.model_dump() if hasattr(bin_data.content, 'model_dump') else bin_data.content,
+                    content=await photo_store.externalize_async(content),
                     color=bin_data.color,
                     is_hole=bin_data.is_hole
                 )
@@ -192,13 +347,15 @@ async def create_or_replace_drawer(
             .where(Drawer.id == drawer.id)
         )
         drawer = result.scalar_one()
+        inventory_snapshot.store.drawer_changed(drawer)
+        response_cache.invalidate("inventory")
         
-        logger.info(f"✅ Tiroir créé avec succès: {drawer.id}")
+        logger.info("✅ Tiroir créé avec succès: %s", drawer.id)
         return DrawerResponse.model_validate(drawer)
         
     except Exception as e:
         await db.rollback()
-        logger.error(f"❌ Erreur lors de la création du tiroir: {str(e)}")
+        logger.error("❌ Erreur lors de la création du tiroir: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la création du tiroir: {str(e)}"
@@ -218,7 +375,7 @@ async def get_drawer(
     """
     Récupère l'état complet d'un tiroir avec toutes ses couches et boîtes.
     """
-    logger.info(f"📤 GET /drawers/{drawer_id}")
+    logger.info("📤 GET /drawers/%s", drawer_id)
     
     # Requête avec chargement eager des relations
     result = await db.execute(
@@ -229,13 +386,14 @@ async def get_drawer(
     drawer = result.scalar_one_or_none()
     
     if not drawer:
-        logger.warning(f"⚠️ Tiroir non trouvé: {drawer_id}")
+        logger.warning("⚠️ Tiroir non trouvé: %s", drawer_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tiroir {drawer_id} non trouvé"
         )
     
-    logger.info(f"✅ Tiroir récupéré: {drawer.name}")
+    logger.info("✅ Tiroir récupéré: %s", drawer.name)
+    response_cache.tag(f"drawer:{drawer.id}", *(f"layer:{layer.id}" for layer in drawer.layers))
     return DrawerResponse.model_validate(drawer)
 
 
@@ -259,10 +417,18 @@ async def list_drawers(
     )
     drawers = result.scalars().all()
     
-    logger.info(f"✅ {len(drawers)} tiroir(s) récupéré(s)")
+    logger.info("✅ %s tiroir(s) récupéré(s)", len(drawers))
+    response_cache.tag("inventory")
     return [DrawerResponse.model_validate(d) for d in drawers]
 
 
+def _project_tags(project_ids: List[str]) -> tuple:
+    """Tags de cache des projets dont des associations ont été supprimées"""
+    if not project_ids:
+        return ()
+    return ("projects", *(f"project:{project_id}" for project_id in project_ids))
+
+
 @api_router.delete(
     "/drawers/{drawer_id}",
     response_model=SuccessResponse,
@@ -271,28 +437,29 @@ async def list_drawers(
 )
 async def delete_drawer(
     drawer_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Supprime un tiroir et toutes ses couches/boîtes (cascade).
     """
-    logger.info(f"🗑️ DELETE /drawers/{drawer_id}")
+    logger.info("🗑️ DELETE /drawers/%s", drawer_id)
     
-    result = await db.execute(
-        select(Drawer).where(Drawer.id == drawer_id)
-    )
-    drawer = result.scalar_one_or_none()
+    # DELETE ensembliste : couches, boîtes et articles supprimés par la cascade SQL
+    deleted = await deletes.delete_drawer(db, drawer_id)
     
-    if not drawer:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tiroir {drawer_id} non trouvé"
         )
     
-    await db.delete(drawer)
     await db.commit()
+    layer_ids, project_ids = deleted
+    inventory_snapshot.store.drawer_removed(drawer_id)
+    response_cache.invalidate(f"drawer:{drawer_id}", *(f"layer:{layer_id}" for layer_id in layer_ids), "inventory",
+                              *_project_tags(project_ids))
     
-    logger.info(f"✅ Tiroir supprimé: {drawer_id}")
+    logger.info("✅ Tiroir supprimé: %s", drawer_id)
     return SuccessResponse(message=f"Tiroir {drawer_id} supprimé avec succès")
 
 
@@ -309,48 +476,19 @@ async def update_bin(
 ):
     """
     Met à jour le texte du label ou les dimensions d'une boîte spécifique.
+    Les rafales de PATCH (glisser-déposer) peuvent être regroupées en un seul
+    commit : voir coalescer.py (SCANGRID_COALESCE_MS).
     """
-    logger.info(f"🔄 PATCH /bins/{bin_id} - Données: {bin_update.model_dump(exclude_none=True)}")
-    
-    result = await db.execute(
-        select(Bin).where(Bin.id == bin_id)
-    )
-    bin_obj = result.scalar_one_or_none()
-    
-    if not bin_obj:
-        logger.warning(f"⚠️ Boîte non trouvée: {bin_id}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Boîte {bin_id} non trouvée"
-        )
-    
-    # Mise à jour des champs fournis
     update_data = bin_update.model_dump(exclude_none=True)
-    
-    # Handle layer_id explicitly if present
-    if "layer_id" in update_data:
-        new_layer_id = update_data.pop("layer_id")
-        
-        # Verify new layer exists
-        layer_result = await db.execute(select(Layer).where(Layer.id == new_layer_id))
-        new_layer = layer_result.scalar_one_or_none()
-        
-        if not new_layer:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Couche destination {new_layer_id} non trouvée"
-            )
-            
-        bin_obj.layer_id = new_layer_id
-        
-    for field, value in update_data.items():
-        setattr(bin_obj, field, value)
-    
-    await db.commit()
-    await db.refresh(bin_obj)
-    
-    logger.info(f"✅ Boîte mise à jour: {bin_id}")
-    return BinResponse.model_validate(bin_obj)
+    logger.info("🔄 PATCH /bins/%s - Données: %s", bin_id, update_data)
+    if "content" in update_data:
+        update_data["content"] = await photo_store.externalize_async(update_data["content"])
+
+    # Mise à jour des champs fournis (verrou d'écriture pris par le regroupeur)
+    response = await coalescer.bin_updates.submit(db, bin_id, update_data)
+
+    logger.info("✅ Boîte mise à jour: %s", bin_id)
+    return response
 
 
 @api_router.get(
@@ -366,7 +504,7 @@ async def get_bin(
     """
     Récupère les détails d'une boîte spécifique.
     """
-    logger.info(f"📤 GET /bins/{bin_id}")
+    logger.info("📤 GET /bins/%s", bin_id)
     
     result = await db.execute(
         select(Bin).where(Bin.id == bin_id)
@@ -379,7 +517,8 @@ async def get_bin(
             detail=f"Boîte {bin_id} non trouvée"
         )
     
-    logger.info(f"✅ Boîte récupérée: {bin_id}")
+    logger.info("✅ Boîte récupérée: %s", bin_id)
+    response_cache.tag(f"bin:{bin_id}", f"layer:{bin_obj.layer_id}")
     return BinResponse.model_validate(bin_obj)
 
 
@@ -393,18 +532,17 @@ async def get_bin(
 async def create_layer(
     drawer_id: str,
     layer_data: LayerCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Ajoute une nouvelle couche à un tiroir.
     """
-    logger.info(f"➕ POST /drawers/{drawer_id}/layers - Ajout couche (z_index={layer_data.z_index})")
+    logger.info("➕ POST /drawers/%s/layers - Ajout couche (z_index=%s)", drawer_id, layer_data.z_index)
     
-    # Vérifier que le drawer existe
-    result = await db.execute(select(Drawer).where(Drawer.id == drawer_id))
-    drawer = result.scalar_one_or_none()
+    # Vérifier que le drawer existe (id seul, sans charger ses couches)
+    exists = await db.scalar(select(Drawer.id).where(Drawer.id == drawer_id))
     
-    if not drawer:
+    if exists is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tiroir {drawer_id} non trouvé"
@@ -413,14 +551,16 @@ async def create_layer(
     # Créer la couche
     layer = Layer(
         drawer_id=drawer_id,
-        z_index=layer_data.z_index
+        z_index=layer_data.z_index,
+        bins=[]  # couche neuve : collection connue, rien à recharger
     )
     
     db.add(layer)
     await db.commit()
-    await db.refresh(layer)
+    inventory_snapshot.store.layer_changed(layer)
+    response_cache.invalidate(f"drawer:{drawer_id}", "inventory")
     
-    logger.info(f"✅ Couche créée: {layer.id}")
+    logger.info("✅ Couche créée: %s", layer.id)
     return LayerResponse.model_validate(layer)
 
 
@@ -434,18 +574,17 @@ async def create_layer(
 async def create_bin(
     layer_id: str,
     bin_data: BinCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Ajoute une nouvelle boîte dans une couche spécifique.
     """
-    logger.info(f"➕ POST /layers/{layer_id}/bins - Ajout boîte à ({bin_data.x_grid}, {bin_data.y_grid})")
+    logger.info("➕ POST /layers/%s/bins - Ajout boîte à (%s, %s)", layer_id, bin_data.x_grid, bin_data.y_grid)
     
-    # Vérifier que la layer existe
-    result = await db.execute(select(Layer).where(Layer.id == layer_id))
-    layer = result.scalar_one_or_none()
+    # Vérifier que la layer existe (id seul)
+    exists = await db.scalar(select(Layer.id).where(Layer.id == layer_id))
     
-    if not layer:
+    if exists is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Couche {layer_id} non trouvée"
@@ -458,7 +597,7 @@ async def create_bin(
         y_grid=bin_data.y_grid,
         width_units=bin_data.width_units,
         depth_units=bin_data.depth_units,
-        content=bin_data.content.model_dump(),
+        content=await photo_store.externalize_async(bin_data.content.model_dump()),
         color=bin_data.color,
         is_hole=bin_data.is_hole
     )
@@ -466,8 +605,10 @@ async def create_bin(
     db.add(bin_obj)
     await db.commit()
     await db.refresh(bin_obj)
+    inventory_snapshot.store.bins_changed([bin_obj])
+    response_cache.invalidate(f"layer:{layer_id}", "inventory")
     
-    logger.info(f"✅ Boîte créée: {bin_obj.id}")
+    logger.info("✅ Boîte créée: %s", bin_obj.id)
     return BinResponse.model_validate(bin_obj)
 
 
@@ -479,31 +620,191 @@ async def create_bin(
 )
 async def delete_bin(
     bin_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Supprime une boîte spécifique.
     """
-    logger.info(f"🗑️ DELETE /bins/{bin_id}")
+    logger.info("🗑️ DELETE /bins/%s", bin_id)
     
-    result = await db.execute(
-        select(Bin).where(Bin.id == bin_id)
-    )
-    bin_obj = result.scalar_one_or_none()
+    deleted = await deletes.delete_bin(db, bin_id)
     
-    if not bin_obj:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Boîte {bin_id} non trouvée"
         )
     
-    await db.delete(bin_obj)
     await db.commit()
+    layer_id, project_ids = deleted
+    inventory_snapshot.store.bins_removed([bin_id])
+    response_cache.invalidate(f"bin:{bin_id}", f"layer:{layer_id}", "inventory", *_project_tags(project_ids))
     
-    logger.info(f"✅ Boîte supprimée: {bin_id}")
+    logger.info("✅ Boîte supprimée: %s", bin_id)
     return SuccessResponse(message=f"Boîte {bin_id} supprimée avec succès")
 
 
+@api_router.get(
+    "/items/search",
+    tags=["Bins"],
+    summary="Chercher un article par début de texte (index SQL)"
+)
+async def search_items(
+    q: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Articles (content.items) dont le texte normalisé commence par `q`, lus
+    dans la table indexée bin_items, avec la boîte et sa localisation.
+    """
+    items = await bin_items.search(db, q, limit)
+    snapshot = await inventory_snapshot.store.get(db)
+    response_cache.tag("inventory")
+    results = []
+    for entry in bin_items.describe(items):
+        found = snapshot.locate(entry["bin_id"])
+        if found is not None:
+            drawer, layer, bin_rec = found
+            entry.update({
+                "title": bin_rec.content.get("title", ""),
+                "drawer": drawer.name if drawer else None,
+                "layer": layer.z_index + 1 if layer else None,
+                "x": bin_rec.x_grid + 1,
+                "y": bin_rec.y_grid + 1,
+            })
+        results.append(entry)
+    return results
+
+
+
+# ============= PHOTOS =============
+
+@api_router.post(
+    "/photos",
+    status_code=status.HTTP_201_CREATED,
+    tags=["Bins"],
+    summary="Importer une photo de boîte"
+)
+async def upload_photo(file: UploadFile = File(...)):
+    """
+    Enregistre l'image (JPEG, PNG, GIF, WebP) dans le store adressé par
+    contenu et retourne son URL, à placer dans content.photos.
+    """
+    data = await file.read(photo_store.MAX_BYTES + 1)
+    try:
+        photo_id = await asyncio.to_thread(photo_store.save, data)
+    except photo_store.PhotoError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {
+        "id": photo_id,
+        "url": photo_store.url_for(photo_id),
+        "thumbnail_url": photo_store.url_for(photo_id) + "/thumb",
+    }
+
+
+def _photo_response(request: Request, path: Optional[str], etag: str,
+                    cache_control: str = photo_store.IMMUTABLE) -> Response:
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Photo introuvable")
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    ext = path.rsplit(".", 1)[-1]
+    return FileResponse(path, media_type=photo_store.MEDIA_TYPES.get(ext), headers=headers)
+
+
+@api_router.get("/photos/{photo_id}", tags=["Bins"], summary="Photo de boîte (immuable)")
+async def get_photo(photo_id: str, request: Request):
+    return _photo_response(request, photo_store.path_for(photo_id), f'"{photo_id}"')
+
+
+@api_router.get("/photos/{photo_id}/thumb", tags=["Bins"], summary="Miniature d'une photo de boîte")
+async def get_photo_thumbnail(photo_id: str, request: Request):
+    """Générée au premier appel (Pillow) ; l'original est servi sans Pillow"""
+    path = await photo_store.thumbnail_path(photo_id)
+    # ETag distinct selon que la miniature existe ou que l'original la remplace ;
+    # l'original n'est gardé en cache que brièvement (pas immutable)
+    if path and path.endswith(".thumb.jpg"):
+        return _photo_response(request, path, f'"{photo_id}-thumb"')
+    return _photo_response(request, path, f'"{photo_id}-orig"', photo_store.FALLBACK)
+
+
+
+# ============= EXPORT / IMPORT =============
+
+def _transfer_format(fmt: str) -> str:
+    if fmt not in transfer.MEDIA_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Format attendu : ndjson ou msgpack")
+    if fmt == "msgpack" and not transfer.MSGPACK_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Export MessagePack indisponible (pip install msgpack)",
+        )
+    return fmt
+
+
+@api_router.get("/export", tags=["Inventory"], summary="Exporter tout l'inventaire (flux)")
+async def export_inventory(format: str = "ndjson", db: AsyncSession = Depends(get_db)):
+    """
+    Catégories, tiroirs, couches, boîtes, projets et leurs boîtes, un
+    enregistrement par ligne (NDJSON) ou par objet (MessagePack), lus par
+    paquets dans une seule transaction : mémoire constante.
+    """
+    fmt = _transfer_format(format)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return StreamingResponse(
+        # Connexion propre au flux : la session de la requête peut être fermée avant la fin
+        transfer.export_stream(db.bind, fmt),
+        media_type=transfer.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=scangrid-{stamp}.{fmt}"},
+    )
+
+
+@api_router.post("/import", tags=["Inventory"], summary="Importer un export d'inventaire (flux)")
+async def import_inventory(
+    request: Request,
+    format: Optional[str] = None,
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_write_db)
+):
+    """
+    Lit le flux au fil de l'eau et insère par lots (un commit par lot), avec
+    de nouveaux ids : l'import s'ajoute à l'inventaire existant (catégories
+    fusionnées par nom). dry_run=true valide le flux sans rien écrire.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "msgpack" if "msgpack" in content_type else "ndjson"
+    fmt = _transfer_format(format)
+    parse = transfer.msgpack_records if fmt == "msgpack" else transfer.ndjson_records
+
+    t0 = time.perf_counter()
+    importer = transfer.Importer(db, dry_run=dry_run)
+    try:
+        await importer.start()
+        async for record in parse(request.stream()):
+            await importer.add(record)
+        report = await importer.finish()
+    except transfer.TransferError as e:
+        await db.rollback()
+        # Le lot en cours vient d'être annulé : seuls les lots déjà validés restent écrits
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": str(e), "committed": importer.committed, "validated": importer.counts,
+                    "batches": importer.batches},
+        )
+    finally:
+        if importer.batches:
+            # Lots déjà validés : instantané et cache reconstruits
+            inventory_snapshot.store.clear()
+            response_cache.cache.clear(reason="import")
+
+    report["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    logger.info("📦 Import %s : %s", "simulé" if dry_run else "terminé", report["counts"])
+    return report
+
+
 # ============= CATEGORIES =============
 
 @api_router.get(
@@ -522,6 +823,7 @@ async def list_categories(
     
     result = await db.execute(select(Category).order_by(Category.name))
     categories = result.scalars().all()
+    response_cache.tag("categories")
     
     return [CategoryResponse.model_validate(c) for c in categories]
 
@@ -535,12 +837,12 @@ async def list_categories(
 )
 async def create_category(
     category_in: CategoryCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Crée une nouvelle catégorie.
     """
-    logger.info(f"➕ POST /categories - Nouvelle catégorie: {category_in.name}")
+    logger.info("➕ POST /categories - Nouvelle catégorie: %s", category_in.name)
     
     new_category = Category(
         name=category_in.name,
@@ -550,6 +852,8 @@ async def create_category(
     db.add(new_category)
     await db.commit()
     await db.refresh(new_category)
+    inventory_snapshot.store.category_changed(new_category)
+    response_cache.invalidate("categories", "inventory")
     
     return CategoryResponse.model_validate(new_category)
 
@@ -562,167 +866,170 @@ async def create_category(
 )
 async def delete_category(
     category_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Supprime une catégorie.
     """
-    logger.info(f"🗑️ DELETE /categories/{category_id}")
-    
-    result = await db.execute(select(Category).where(Category.id == category_id))
-    category = result.scalar_one_or_none()
+    logger.info("🗑️ DELETE /categories/%s", category_id)
     
-    if not category:
+    # Les boîtes passent à category_id NULL côté SQLite (ON DELETE SET NULL)
+    if not await deletes.delete_category(db, category_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Catégorie {category_id} non trouvée"
         )
     
-    await db.delete(category)
     await db.commit()
+    inventory_snapshot.store.category_removed(category_id)
+    # Les boîtes de la catégorie passent à NULL : tiroirs et boîtes en cache sont touchés
+    response_cache.cache.clear(reason="category")
     
     return SuccessResponse(message=f"Catégorie {category_id} supprimée avec succès")
 
 
-# ============= AI DESCRIPTION IMPROVEMENT =============
+# ============= STATISTIQUES =============
 
-@api_router.post(
-    "/improve-description",
-    tags=["AI"],
-    summary="Améliorer une description avec IA locale"
+@api_router.get(
+    "/stats",
+    tags=["Stats"],
+    summary="Remplissage des tiroirs, couches et catégories"
 )
-async def improve_description(
-    title: str,
-    content: str = "",
-    instruction: str = "Description pour un inventaire de composants électroniques"
+async def inventory_stats(
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Utilise Ollama (llama3.2:3b) pour générer une description ultra-concise.
+    Remplissage surface / volume par tiroir, couche et catégorie, boîtes non
+    placées et fragmentation de l'espace libre (calcul vectorisé NumPy).
     """
-    if not OLLAMA_AVAILABLE:
+    if not stats.NUMPY_AVAILABLE:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Service Ollama non disponible. Installez ollama: pip install ollama"
+            detail="Statistiques indisponibles : installer numpy (pip install numpy)"
         )
-    
-    logger.info(f"🤖 AI Description - Titre: {title[:50]}...")
-    
-    # Construction du prompt optimisé
-    prompt = f"""Tu es un assistant technique spécialisé dans l'inventaire de composants électroniques et de visserie.
+    snapshot = await inventory_snapshot.store.get(db)
+    response_cache.tag("inventory")
+    return stats.compute_stats(stats.columns_for(snapshot))
 
-Génère une description ultra-concise (maximum 50 mots) pour cet article :
 
-Titre : {title}
-{f"Détails : {content}" if content else ""}
+# ============= SIRI / HOME ASSISTANT LOCATE API =============
 
-Règles strictes :
-- Réponds UNIQUEMENT avec la description, sans préambule
-- Style direct et factuel, sans adjectifs marketing
-- Une seule phrase claire et précise
-- Base-toi sur le titre et les détails fournis
-- N'invente pas de spécifications non mentionnées
+FUZZY_THRESHOLD = 0.78
+# Candidats (au moins) re-classés avec difflib après le balayage phonétique
+RERANK_MIN = 32
 
-Description :"""
 
-    try:
-        response = ollama.generate(
-            model='llama3.2:3b',
-            prompt=prompt,
-            options={
-                'temperature': 0.2,    # Très bas pour rester factuel
-                'num_predict': 60,     # Limite la longueur (économie CPU)
-                'top_p': 0.9           # Diversité contrôlée
-            }
-        )
-        
-        improved_description = response['response'].strip()
-        
-        logger.info(f"✅ Description générée: {improved_description[:50]}...")
-        
-        return {
-            "improved_description": improved_description,
-            "model": "llama3.2:3b"
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Erreur Ollama: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la génération: {str(e)}"
-        )
+@lru_cache(maxsize=65536)
+def _similar(word: str, candidate: str) -> bool:
+    """difflib ratio > 0.78, précédé des bornes bon marché (longueurs, multiset)"""
+    # ratio = 2·M / (la + lb) ≤ 2·min(la, lb) / (la + lb)
+    if 2 * min(len(word), len(candidate)) <= FUZZY_THRESHOLD * (len(word) + len(candidate)):
+        return False
+    matcher = difflib.SequenceMatcher(None, word, candidate)
+    return matcher.quick_ratio() > FUZZY_THRESHOLD and matcher.ratio() > FUZZY_THRESHOLD
 
 
-# ============= SIRI / HOME ASSISTANT LOCATE API =============
+def _maybe_similar(word: str, candidate: str) -> bool:
+    """Borne supérieure de _similar : seule la longueur est comparée"""
+    return 2 * min(len(word), len(candidate)) > FUZZY_THRESHOLD * (len(word) + len(candidate))
+
+
+def _any_similar(similar):
+    """similar(mot, candidat) → fuzzy(mot, mots) : au moins un mot proche"""
+    return lambda word, words: any(similar(word, w) for w in words)
+
+
+_difflib_fuzzy = _any_similar(_similar)
+
+
+@lru_cache(maxsize=4096)
+def _norm_ns(value: str) -> str:
+    return normalize_string(value).replace(" ", "")
+
+
+class LocateQuery:
+    """Requête /locate normalisée une fois pour tout l'inventaire"""
+
+    __slots__ = ("q", "q_ns", "words")
+
+    def __init__(self, query: str):
+        self.q = normalize_string(query)
+        self.q_ns = self.q.replace(" ", "")
+        self.words = [w for w in self.q.split() if len(w) >= 3]
+
+
+class _BinText:
+    """Textes normalisés d'une boîte pour le scoring /locate (partagés entre requêtes)"""
+
+    __slots__ = ("title", "title_ns", "title_words", "desc", "desc_ns", "desc_words",
+                 "items", "category_ns", "drawer_ns")
+
+    def __init__(self, bin_rec: BinRecord, drawer_name: str, category_name: str | None):
+        self.title = bin_rec.title_norm
+        self.title_ns = self.title.replace(" ", "")
+        self.title_words = self.title.split()
+        self.desc = bin_rec.desc_norm
+        self.desc_ns = self.desc.replace(" ", "")
+        self.desc_words = self.desc.split()
+        # (texte d'origine, normalisé, sans espaces, mots)
+        self.items = tuple(
+            (item_str, item_norm, item_norm.replace(" ", ""), item_norm.split())
+            for item_str, item_norm in zip(bin_rec.items, bin_rec.items_norm)
+        )
+        self.category_ns = _norm_ns(str(category_name)) if category_name else None
+        self.drawer_ns = _norm_ns(str(drawer_name))
+
 
 def _score_bin(
-    bin_obj: Bin,
-    query: str,
+    bin_rec: BinRecord,
+    lq: LocateQuery,
     drawer_name: str,
     category_name: str | None,
     match_info: dict | None = None,
+    similar=_similar,
 ) -> int:
     """
     Calcule un score de pertinence entre une boîte et la requête.
     Plus le score est élevé, plus la boîte est pertinente.
     Si match_info est fourni, il sera rempli avec :
       - matched_item : premier article de la liste items qui matche
+    Avec similar=_maybe_similar, retourne une borne supérieure du score sans
+    aucun appel difflib (les comparaisons exactes restent identiques).
     """
-    q = normalize_string(query)
-    q_ns = q.replace(" ", "")
-    score: int = 0
+    return _score_text(_BinText(bin_rec, drawer_name, category_name), lq, match_info, _any_similar(similar))
 
-    title: str = ""
-    description: str = ""
-    items: list = []
 
-    if bin_obj.content and isinstance(bin_obj.content, dict):
-        t_val = bin_obj.content.get("title", "")
-        d_val = bin_obj.content.get("description", "")
-        items = bin_obj.content.get("items") or []
-        
-        title = normalize_string(str(t_val) if t_val else "")
-        description = normalize_string(str(d_val) if d_val else "")
-
-    title_ns = title.replace(" ", "")
-    desc_ns = description.replace(" ", "")
+def _score_text(text: _BinText, lq: LocateQuery, match_info: dict | None = None, fuzzy=_difflib_fuzzy) -> int:
+    """Cœur de _score_bin sur des textes déjà préparés (fuzzy(mot, mots) : correspondance approchée)"""
+    q_ns = lq.q_ns
+    score: int = 0
 
     # Correspondance exacte dans le titre → score très élevé
-    if q_ns and q_ns == title_ns:
+    if q_ns and q_ns == text.title_ns:
         score += 100
-    elif q_ns and q_ns in title_ns:
+    elif q_ns and q_ns in text.title_ns:
         score += 60
     else:
         # Chaque mot de la requête trouvé dans le titre
-        for word in str(q).split():
-            if len(word) >= 3:
-                if word in str(title):
-                    score += 20
-                else:
-                    for t_word in str(title).split():
-                        if difflib.SequenceMatcher(None, word, t_word).ratio() > 0.78:
-                            score += 15
-                            break
+        for word in lq.words:
+            if word in text.title:
+                score += 20
+            elif fuzzy(word, text.title_words):
+                score += 15
 
     # Description
-    if q_ns and q_ns in desc_ns:
+    if q_ns and q_ns in text.desc_ns:
         score += 30
     else:
-        for word in str(q).split():
-            if len(word) >= 3:
-                if word in str(description):
-                    score += 10
-                else:
-                    for d_word in str(description).split():
-                        if difflib.SequenceMatcher(None, word, d_word).ratio() > 0.78:
-                            score += 8
-                            break
+        for word in lq.words:
+            if word in text.desc:
+                score += 10
+            elif fuzzy(word, text.desc_words):
+                score += 8
 
     # Articles contenus dans la boîte (items)
     matched_item = None
-    for item in items:
-        item_str = str(item)
-        item_norm = normalize_string(item_str)
-        item_ns = item_norm.replace(" ", "")
+    for item_str, item_norm, item_ns, item_words in text.items:
         if q_ns == item_ns:
             score += 80          # correspondance exacte item
             matched_item = item_str
@@ -732,104 +1039,187 @@ def _score_bin(
             if matched_item is None:
                 matched_item = item_str
         else:
-            for word in str(q).split():
-                if len(word) >= 3:
-                    if word in item_norm:
-                        score += 15
-                        if matched_item is None:
-                            matched_item = item_str
-                    else:
-                        for i_word in str(item_norm).split():
-                            if difflib.SequenceMatcher(None, word, i_word).ratio() > 0.78:
-                                score += 10
-                                if matched_item is None:
-                                    matched_item = item_str
-                                break
+            for word in lq.words:
+                if word in item_norm:
+                    score += 15
+                    if matched_item is None:
+                        matched_item = item_str
+                elif fuzzy(word, item_words):
+                    score += 10
+                    if matched_item is None:
+                        matched_item = item_str
 
     if match_info is not None:
         match_info["matched_item"] = matched_item
-        match_info["items"] = [str(i) for i in items]
+        match_info["items"] = [item[0] for item in text.items]
 
     # Catégorie
-    if category_name:
-        cat_norm = normalize_string(str(category_name))
-        if q_ns in cat_norm.replace(" ", ""):
-            score += 15
+    if text.category_ns is not None and q_ns in text.category_ns:
+        score += 15
 
     # Nom du tiroir
-    drawer_norm = normalize_string(str(drawer_name))
-    if q_ns in drawer_norm.replace(" ", ""):
+    if q_ns in text.drawer_ns:
         score += 5
 
     return score
 
 
-@api_router.get(
-    "/locate",
-    tags=["Siri"],
-    summary="Localiser une boîte par son nom ou contenu"
-)
-async def locate_box(
-    query: str,
-    db: AsyncSession = Depends(get_db)
-):
+class _LocateIndex:
+    """Textes préparés par boîte et index phonétique du vocabulaire, pour un instantané"""
+
+    __slots__ = ("snapshot", "rows", "positions", "phonetic")
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        # (tiroir, couche, boîte, catégorie, textes) dans l'ordre de parcours
+        self.rows = []
+        vocabulary = set()
+        for drawer, layer, bin_rec in snapshot.iter_bins():
+            cat_name = snapshot.category_name(bin_rec.category_id)
+            text = _BinText(bin_rec, drawer.name, cat_name)
+            self.rows.append((drawer, layer, bin_rec, cat_name, text))
+            vocabulary.update(text.title_words)
+            vocabulary.update(text.desc_words)
+            for item in text.items:
+                vocabulary.update(item[3])
+        self.phonetic = phonetic.PhoneticIndex(vocabulary)
+        self.positions = {row[2].id: position for position, row in enumerate(self.rows)}
+
+
+_index_cache: _LocateIndex | None = None
+
+
+def _locate_index(snapshot) -> _LocateIndex:
+    """Index /locate de l'instantané courant (reconstruit quand l'instantané change)"""
+    global _index_cache
+    cached = _index_cache
+    if cached is None or cached.snapshot is not snapshot:
+        cached = _index_cache = _LocateIndex(snapshot)
+    return cached
+
+
+def _rank_bins(snapshot, lq: LocateQuery, limit: int) -> list[tuple[int, dict]]:
     """
-    Recherche la boîte la plus probable correspondant à la requête.
-    Parcourt tous les tiroirs, couches et boîtes.
-    Retourne la localisation humaine + une phrase spoken pour Siri.
+    Top-k des boîtes par score décroissant (à score égal : ordre de parcours).
+
+    1. Balayage de toutes les boîtes sans difflib : correspondances exactes et
+       voisins phonétiques (un lookup dans l'index par mot de la requête).
+    2. Re-classement des max(4·k, RERANK_MIN) meilleurs candidats avec difflib
+       en plus : tas borné de taille k, une boîte dont la borne supérieure ne
+       dépasse pas le k-ième score courant est écartée sans difflib.
     """
-    logger.info(f"🔍 /locate?query={query}")
+    index = _locate_index(snapshot)
+    neighbours = {word: index.phonetic.neighbours(word) for word in lq.words}
 
-    if not query or len(query.strip()) < 2:
-        raise HTTPException(status_code=400, detail="La requête est trop courte (min 2 caractères).")
+    def phonetic_fuzzy(word, words):
+        return not neighbours[word].isdisjoint(words)
 
-    # Charger tous les tiroirs avec leurs couches et boîtes
-    result = await db.execute(
-        select(Drawer).options(
-            selectinload(Drawer.layers).selectinload(Layer.bins).selectinload(Bin.category)
-        )
-    )
-    drawers = result.scalars().all()
+    def bound_fuzzy(word, words):
+        return phonetic_fuzzy(word, words) or any(_maybe_similar(word, w) for w in words)
+
+    def final_fuzzy(word, words):
+        return phonetic_fuzzy(word, words) or _difflib_fuzzy(word, words)
+
+    size = max(4 * limit, RERANK_MIN)
+    candidates: list[tuple[int, int]] = []
+    for position, row in enumerate(index.rows):
+        score = _score_text(row[4], lq, fuzzy=phonetic_fuzzy)
+        if score <= 0:
+            continue
+        entry = (score, -position)
+        if len(candidates) < size:
+            heapq.heappush(candidates, entry)
+        elif entry > candidates[0]:
+            heapq.heapreplace(candidates, entry)
+
+    heap: list[tuple[int, int, dict]] = []
+    for position in sorted(-neg for _, neg in candidates):
+        drawer, layer, bin_rec, cat_name, text = index.rows[position]
+        floor = heap[0][0] if len(heap) == limit else 0
+        if _score_text(text, lq, fuzzy=bound_fuzzy) <= floor:
+            continue
+        info: dict = {}
+        score = _score_text(text, lq, info, final_fuzzy)
+        if score <= floor:
+            continue
+        entry = (score, -position, {
+            "bin": bin_rec,
+            "layer": layer,
+            "drawer": drawer,
+            "category": cat_name,
+            "matched_item": info.get("matched_item"),
+            "items": info.get("items", []),
+        })
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heapreplace(heap, entry)
+    return [(score, match) for score, _, match in sorted(heap, reverse=True)]
+
+
+def _rank_semantic(snapshot, lq: LocateQuery, limit: int, sims: semantic_index.Similarities,
+                   keyword: list[tuple[int, dict]] | None = None) -> list[tuple[int, dict]]:
+    """
+    Top-k en mode semantic (score = 100 × similarité) ou hybrid (keyword :
+    classement de _rank_bins, auquel s'ajoute WEIGHT × 100 × similarité).
+    Candidats : les boîtes de keyword et le top-k sémantique (argpartition).
+    """
+    index = _locate_index(snapshot)
+    size = max(4 * limit, RERANK_MIN)
+    candidates: dict[str, tuple[int, dict]] = {}
+    for score, match in keyword or ():
+        candidates[match["bin"].id] = (score, match)
+    for bin_id, _ in sims.top_k(size):
+        position = index.positions.get(bin_id)
+        if bin_id in candidates or position is None:
+            continue
+        drawer, layer, bin_rec, cat_name, text = index.rows[position]
+        info: dict = {}
+        score = _score_text(text, lq, info)
+        candidates[bin_id] = (score if keyword is not None else 0, {
+            "bin": bin_rec,
+            "layer": layer,
+            "drawer": drawer,
+            "category": cat_name,
+            "matched_item": info.get("matched_item"),
+            "items": info.get("items", []),
+        })
+
+    weight = semantic_index.WEIGHT if keyword is not None else 1.0
+    ranked = [
+        (score + round(weight * 100 * sims.get(bin_id, 0.0)), -index.positions[bin_id], match)
+        for bin_id, (score, match) in candidates.items()
+    ]
+    ranked.sort(key=lambda entry: entry[:2], reverse=True)
+    return [(score, match) for score, _, match in ranked[:limit]]
+
+
+async def _semantic_similarities(db: AsyncSession, snapshot, query: str,
+                                 mode: str) -> semantic_index.Similarities | None:
+    """
+    Similarités de la requête (mode semantic ou hybrid). Index indisponible :
+    503 en mode semantic, None (repli sur les mots-clés) en mode hybrid.
+    """
+    try:
+        return await semantic_index.index.similarities(db, snapshot, query)
+    except semantic_index.SemanticUnavailable as e:
+        if mode == "semantic":
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+        logger.warning("⚠️ Recherche hybride sans index sémantique : %s", e)
+        return None
 
-    best_score = 0
-    best_match = None
-
-    for drawer in drawers:
-        for layer in sorted(drawer.layers, key=lambda l: l.z_index):
-            for bin_obj in layer.bins:
-                if bin_obj.is_hole:
-                    continue
-                cat_name = bin_obj.category.name if bin_obj.category else None
-                info: dict = {}
-                score = _score_bin(bin_obj, query, drawer.name, cat_name, info)
-                if score > best_score:
-                    best_score = score
-                    best_match = {
-                        "bin": bin_obj,
-                        "layer": layer,
-                        "drawer": drawer,
-                        "category": cat_name,
-                        "matched_item": info.get("matched_item"),
-                        "items": info.get("items", []),
-                    }
-
-    if best_match is None or best_score == 0:
-        return {
-            "found": False,
-            "query": query,
-            "spoken": f"Je n'ai rien trouvé pour « {query} » dans l'inventaire.",
-            "result": None,
-        }
 
-    b = best_match["bin"]
-    d = best_match["drawer"]
-    l = best_match["layer"]
+def _locate_result(match: dict) -> tuple[dict, str]:
+    """Résultat JSON + phrase Siri pour une boîte trouvée"""
+    b = match["bin"]
+    d = match["drawer"]
+    l = match["layer"]
 
     title = b.content.get("title", "Boîte inconnue") if b.content else "Boîte inconnue"
     description = b.content.get("description", "") if b.content else ""
     layer_num = l.z_index + 1  # 1-based pour l'humain
-    matched_item = best_match.get("matched_item")
-    all_items = best_match.get("items", [])
+    matched_item = match.get("matched_item")
+    all_items = match.get("items", [])
 
     location_str = f"« {d.name} », Couche {layer_num}, Position X: {b.x_grid + 1} Y: {b.y_grid + 1} !"
 
@@ -846,64 +1236,168 @@ async def locate_box(
     if description:
         spoken += f" {description[:120]}"
 
-    logger.info(f"✅ Meilleur résultat (score {best_score}): {title} → {location_str}")
-
     return {
+        "box_id": b.id,
+        "title": title,
+        "description": description,
+        "category": match["category"],
+        "drawer": d.name,
+        "drawer_id": d.id,
+        "layer": layer_num,
+        "layer_id": l.id,
+        "x": b.x_grid + 1,
+        "y": b.y_grid + 1,
+        "width": b.width_units,
+        "depth": b.depth_units,
+        "color": b.color,
+        "location": location_str,
+        "matched_item": matched_item,
+        "items": all_items,
+    }, spoken
+
+
+@api_router.get(
+    "/locate",
+    tags=["Siri"],
+    summary="Localiser une boîte par son nom ou contenu"
+)
+async def locate_box(
+    query: str,
+    limit: Optional[int] = Query(None, ge=1, le=50, description="Nombre de résultats classés (top-k)"),
+    mode: str = Query("keyword", pattern="^(keyword|semantic|hybrid)$",
+                      description="keyword, semantic (embeddings) ou hybrid"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Recherche la boîte la plus probable correspondant à la requête.
+    Parcourt tous les tiroirs, couches et boîtes.
+    Retourne la localisation humaine + une phrase spoken pour Siri.
+    Avec `limit`, ajoute `results` : les `limit` meilleures boîtes (« l'autre »).
+    mode=semantic|hybrid : classement par similarité d'embeddings (semantic_index.py).
+    """
+    logger.info("🔍 /locate?query=%s", query)
+
+    if not query or len(query.strip()) < 2:
+        raise HTTPException(status_code=400, detail="La requête est trop courte (min 2 caractères).")
+
+    # Inventaire en mémoire (tiroirs, couches, boîtes, catégories)
+    snapshot = await inventory_snapshot.store.get(db)
+    response_cache.tag("inventory")
+    lq = LocateQuery(query)
+    sims = await _semantic_similarities(db, snapshot, query, mode) if mode != "keyword" else None
+    if mode == "semantic":
+        ranked = _rank_semantic(snapshot, lq, limit or 1, sims)
+    elif sims is not None:
+        size = max(4 * (limit or 1), RERANK_MIN)
+        ranked = _rank_semantic(snapshot, lq, limit or 1, sims, _rank_bins(snapshot, lq, size))
+    else:
+        ranked = _rank_bins(snapshot, lq, limit or 1)
+    response = _locate_response(query, ranked, limit)
+    if mode != "keyword":
+        response["mode"] = mode if sims is not None else "keyword"
+    if response["found"]:
+        result = response["result"]
+        logger.info("✅ Meilleur résultat (score %s): %s → %s", response["score"], result["title"], result["location"])
+    return response
+
+
+def _locate_response(query: str, ranked: list[tuple[int, dict]], limit: Optional[int]) -> dict:
+    """Réponse /locate (found, spoken, result et, avec limit, results)"""
+    if not ranked:
+        response = {
+            "found": False,
+            "query": query,
+            "spoken": f"Je n'ai rien trouvé pour « {query} » dans l'inventaire.",
+            "result": None,
+        }
+        if limit is not None:
+            response["results"] = []
+        return response
+
+    best_score, best_match = ranked[0]
+    result, spoken = _locate_result(best_match)
+
+    response = {
         "found": True,
         "query": query,
         "score": best_score,
         "spoken": spoken,
-        "result": {
-            "box_id": b.id,
-            "title": title,
-            "description": description,
-            "category": best_match["category"],
-            "drawer": d.name,
-            "drawer_id": d.id,
-            "layer": layer_num,
-            "layer_id": l.id,
-            "x": b.x_grid + 1,
-            "y": b.y_grid + 1,
-            "width": b.width_units,
-            "depth": b.depth_units,
-            "color": b.color,
-            "location": location_str,
-            "matched_item": matched_item,
-            "items": all_items,
-        },
+        "result": result,
     }
+    if limit is not None:
+        response["results"] = [
+            {**_locate_result(match)[0], "score": score} for score, match in ranked
+        ]
+    return response
 
 
-# ============= BOM — GENERATOR & IMPORT =============
+class LocateBatchRequest(BaseModel):
+    """Corps de la requête POST /locate/batch"""
+    queries: list[str] = Field(..., min_length=1, max_length=200)
+    limit: Optional[int] = Field(None, ge=1, le=50)
 
-def normalize_string(s: str) -> str:
-    if not s:
-        return ""
-    # Enlever accents et passer en minuscule
-    s = str(s)
-    s = unicodedata.normalize('NFD', s).encode('ascii', 'ignore').decode('utf-8')
-    return s.lower()
 
-def _bom_score_bin(bin_obj: Bin, tokens: list[str]) -> tuple[int, str]:
+@api_router.post(
+    "/locate/batch",
+    tags=["Siri"],
+    summary="Localiser toute une liste de pièces en une requête"
+)
+async def locate_batch(
+    body: LocateBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Équivalent de N appels GET /locate (liste de courses Home Assistant /
+    Raccourcis Siri) : un seul instantané, textes des boîtes normalisés une
+    seule fois pour toutes les requêtes, requêtes identiques calculées une fois.
+    Chaque entrée de `results` a la forme de la réponse GET /locate ; les
+    requêtes trop courtes y portent un champ `error` au lieu d'échouer en 400.
+    `spoken` enchaîne les phrases de chaque requête.
+    """
+    logger.info("🔍 POST /locate/batch — %s requête(s)", len(body.queries))
+    snapshot = await inventory_snapshot.store.get(db)
+
+    rankings: dict[str, list] = {}
+    results = []
+    for query in body.queries:
+        if not query or len(query.strip()) < 2:
+            results.append({
+                "found": False,
+                "query": query,
+                "error": "La requête est trop courte (min 2 caractères).",
+                "spoken": f"Je n'ai pas compris « {query} ».",
+                "result": None,
+            })
+            continue
+        lq = LocateQuery(query)
+        # Même texte normalisé → même classement (la réponse garde la requête d'origine)
+        ranked = rankings.get(lq.q)
+        if ranked is None:
+            ranked = rankings[lq.q] = _rank_bins(snapshot, lq, body.limit or 1)
+        results.append(_locate_response(query, ranked, body.limit))
+
+    found = sum(1 for r in results if r["found"])
+    logger.info("✅ Batch locate : %s/%s trouvée(s), %s classement(s) calculé(s)", found, len(results), len(rankings))
+    return {
+        "count": len(results),
+        "found": found,
+        "spoken": " ".join(r["spoken"] for r in results),
+        "results": results,
+    }
+
+
+# ============= BOM — GENERATOR & IMPORT =============
+
+def _bom_score_bin(bin_rec: BinRecord, tokens: list[str]) -> tuple[int, str]:
     """
     Calcule un score de pertinence entre une boîte et une liste de tokens normaux.
     """
     score: int = 0
     reasons: list[str] = []
 
-    title: str = ""
-    description: str = ""
-    items: list = []
-
-    if bin_obj.content and isinstance(bin_obj.content, dict):
-        t_val = bin_obj.content.get("title", "")
-        d_val = bin_obj.content.get("description", "")
-        items = bin_obj.content.get("items") or []
-        
-        title = normalize_string(str(t_val) if t_val else "")
-        description = normalize_string(str(d_val) if d_val else "")
-
-    items_str = " ".join(normalize_string(i) for i in items)
+    title: str = bin_rec.title_norm
+    description: str = bin_rec.desc_norm
+    items_str = " ".join(bin_rec.items_norm)
     
     # Textes sans espaces pour le matching "colle" (ex: 10 k => 10k)
     title_ns = title.replace(" ", "")
@@ -965,83 +1459,95 @@ def _bom_score_bin(bin_obj: Bin, tokens: list[str]) -> tuple[int, str]:
 )
 async def bom_search(
     q: str = "",
+    category_id: Optional[List[str]] = Query(None, description="Catégorie(s), « none » = sans catégorie"),
+    drawer_id: Optional[List[str]] = Query(None, description="Tiroir(s)"),
+    layer: Optional[List[int]] = Query(None, description="Numéro(s) de couche, à partir de 1"),
+    color: Optional[List[str]] = Query(None, description="Couleur(s) hexadécimale(s)"),
+    is_hole: bool = False,
+    facets: bool = False,
+    mode: str = Query("keyword", pattern="^(keyword|semantic|hybrid)$",
+                      description="keyword, semantic (embeddings) ou hybrid"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Recherche plein-texte dans tous les bins de l'inventaire.
     Retourne les résultats triés par score de pertinence.
+    Filtres (répétables : OU dans un filtre, ET entre filtres) appliqués avant
+    le calcul des scores via les bitsets de facet_index.py. Avec facets=true,
+    retourne {total, results, facets} avec les comptes par catégorie et tiroir.
+    mode=semantic|hybrid : score par similarité d'embeddings (seule ou ajoutée).
     """
-    logger.info(f"🔍 GET /bom/search?q={q}")
-
-    if not q or len(q.strip()) < 1:
-        # Retourner tous les composants si pas de recherche
-        result = await db.execute(
-            select(Drawer).options(
-                selectinload(Drawer.layers).selectinload(Layer.bins).selectinload(Bin.category)
-            )
-        )
-        drawers = result.scalars().all()
-        tokens = []
-    else:
-        result = await db.execute(
-            select(Drawer).options(
-                selectinload(Drawer.layers).selectinload(Layer.bins).selectinload(Bin.category)
-            )
-        )
-        drawers = result.scalars().all()
-        tokens = [t.lower() for t in q.strip().split()]
+    logger.info("🔍 GET /bom/search?q=%s", q)
+
+    # Retourner tous les composants si pas de recherche
+    tokens = [t.lower() for t in q.strip().split()] if q and q.strip() else []
+    snapshot = await inventory_snapshot.store.get(db)
+    response_cache.tag("inventory")
+
+    index = facet_index.index_for(snapshot)
+    mask = index.select(
+        category_ids=[None if c == "none" else c for c in category_id] if category_id is not None else None,
+        drawer_ids=drawer_id,
+        layers=layer,
+        colors=color,
+        is_hole=is_hole,
+    )
+    hits = bytearray(len(index.rows) // 8 + 1) if facets else None
+    sims = await _semantic_similarities(db, snapshot, q, mode) if tokens and mode != "keyword" else None
 
     results = []
-    for drawer in drawers:
-        for layer in sorted(drawer.layers, key=lambda l: l.z_index):
-            for bin_obj in layer.bins:
-                if bin_obj.is_hole:
-                    continue
-
-                title = ""
-                description = ""
-                bin_items: list = []
-
-                if bin_obj.content and isinstance(bin_obj.content, dict):
-                    title = bin_obj.content.get("title", "")
-                    description = bin_obj.content.get("description", "")
-                    bin_items = bin_obj.content.get("items") or []
-
-                if tokens:
-                    score, reason = _bom_score_bin(bin_obj, tokens)
-                    if score == 0:
-                        continue
-                else:
-                    score = 1
-                    reason = ""
-
-                cat_name = bin_obj.category.name if bin_obj.category else None
-
-                # Extraction purement séquentielle (sécurité types)
-                ref_item: str = title
-                parsed_items: list[str] = [str(i) for i in bin_items] if bin_items else []
-                if len(parsed_items) > 0:
-                     ref_item = parsed_items[0]
-                results.append({
-                    "bin_id": bin_obj.id,
-                    "title": title,
-                    "description": description,
-                    "ref": ref_item,
-                    "items": parsed_items,
-                    "category": cat_name,
-                    "drawer": drawer.name,
-                    "drawer_id": drawer.id,
-                    "layer": layer.z_index + 1,
-                    "x": bin_obj.x_grid + 1,
-                    "y": bin_obj.y_grid + 1,
-                    "color": bin_obj.color,
-                    "items": [str(i) for i in bin_items],
-                    "score": score,
-                    "reason": reason,
-                })
+    for ordinal in facet_index.ordinals(mask):
+        drawer, layer_rec, bin_rec = index.rows[ordinal]
+        title = bin_rec.content.get("title", "")
+        description = bin_rec.content.get("description", "")
+
+        if sims is not None and mode == "semantic":
+            sim = sims.get(bin_rec.id)
+            if sim is None:
+                continue
+            score, reason = round(100 * sim), f"sémantique {sim:.2f}"
+        elif tokens:
+            keyword_score, reason = _bom_score_bin(bin_rec, tokens)
+            score = keyword_score
+            sim = sims.get(bin_rec.id) if sims is not None else None
+            if sim is not None:
+                score += round(semantic_index.WEIGHT * 100 * sim)
+                reason = f"{reason}, sémantique {sim:.2f}" if keyword_score else f"sémantique {sim:.2f}"
+            if score == 0:
+                continue
+        else:
+            score = 1
+            reason = ""
+
+        parsed_items: list[str] = list(bin_rec.items)
+        ref_item: str = parsed_items[0] if parsed_items else title
+        results.append({
+            "bin_id": bin_rec.id,
+            "title": title,
+            "description": description,
+            "ref": ref_item,
+            "items": parsed_items,
+            "category": snapshot.category_name(bin_rec.category_id),
+            "drawer": drawer.name,
+            "drawer_id": drawer.id,
+            "layer": layer_rec.z_index + 1,
+            "x": bin_rec.x_grid + 1,
+            "y": bin_rec.y_grid + 1,
+            "color": bin_rec.color,
+            "score": score,
+            "reason": reason,
+        })
+        if hits is not None:
+            hits[ordinal >> 3] |= 1 << (ordinal & 7)
 
     results.sort(key=lambda r: r["score"], reverse=True)
-    logger.info(f"✅ BOM search '{q}' → {len(results)} résultat(s)")
+    logger.info("✅ BOM search '%s' → %s résultat(s)", q, len(results))
+    if facets:
+        return {
+            "total": len(results),
+            "results": results[:50],
+            "facets": index.counts(int.from_bytes(hits, "little")),
+        }
     return results[:50]  # Max 50 résultats
 
 
@@ -1065,43 +1571,19 @@ async def bom_match(
     Score de confiance normalisé sur 1.0.
     Seuil minimum : 0.60 pour ne pas retourner un faux positif.
     """
-    logger.info(f"🔍 POST /bom/match — {len(body.lines)} ligne(s)")
-
-    # Charger tout l'inventaire une seule fois
-    result = await db.execute(
-        select(Drawer).options(
-            selectinload(Drawer.layers).selectinload(Layer.bins).selectinload(Bin.category)
-        )
-    )
-    drawers = result.scalars().all()
+    logger.info("🔍 POST /bom/match — %s ligne(s)", len(body.lines))
 
-    # Pré-indexer les bins pour éviter de les parcourir N fois
-    all_bins = []
-    for drawer in drawers:
-        for layer in sorted(drawer.layers, key=lambda l: l.z_index):
-            for bin_obj in layer.bins:
-                if bin_obj.is_hole:
-                    continue
-                title = ""
-                bin_items: list = []
-                description = ""
-                if bin_obj.content and isinstance(bin_obj.content, dict):
-                    title = bin_obj.content.get("title", "")
-                    description = bin_obj.content.get("description", "")
-                    bin_items = bin_obj.content.get("items") or []
-                cat_name = bin_obj.category.name if bin_obj.category else None
-                all_bins.append({
-                    "bin_obj": bin_obj,
-                    "title": title,
-                    "description": description,
-                    "items": [str(i) for i in bin_items],
-                    "category": cat_name,
-                    "drawer": drawer.name,
-                    "layer": layer.z_index + 1,
-                    "x": bin_obj.x_grid + 1,
-                    "y": bin_obj.y_grid + 1,
-                    "color": bin_obj.color,
-                })
+    # Inventaire en mémoire, parcouru une fois par ligne
+    snapshot = await inventory_snapshot.store.get(db)
+    all_bins = [
+        {
+            "bin_obj": bin_rec,
+            "title": bin_rec.content.get("title", ""),
+            "drawer": drawer.name,
+            "layer": layer.z_index + 1,
+        }
+        for drawer, layer, bin_rec in snapshot.iter_bins()
+    ]
 
     # Score max théorique pour normalisation (100 * nb tokens)
     CONFIDENCE_THRESHOLD = 0.60
@@ -1156,429 +1638,10 @@ async def bom_match(
                 "confidence": round(confidence, 2),
             })
 
-    logger.info(f"✅ BOM match terminé — {len(match_results)} résultat(s)")
+    logger.info("✅ BOM match terminé — %s résultat(s)", len(match_results))
     return {"results": match_results}
 
 
-# ============= BOM PDF EXTRACT =============
-
-class BOMExtractResult(BaseModel):
-    lines: list[str]
-    raw_text: str
-    page_count: int
-
-@api_router.post("/bom/extract-pdf", response_model=BOMExtractResult)
-async def bom_extract_pdf(file: UploadFile = File(...)):
-    """
-    Extrait le texte d'un fichier PDF uploadé (multipart/form-data).
-    Retourne les lignes tokenisées prêtes à être envoyées à /bom/match.
-    Utilise pypdf — aucune dépendance lourde, pas de serveur externe.
-    """
-    if file.content_type not in ("application/pdf", "application/octet-stream"):
-        # Accept octet-stream too in case browser sends it that way
-        if not (file.filename or "").lower().endswith(".pdf"):
-            raise HTTPException(status_code=400, detail="Le fichier doit être un PDF.")
-
-    try:
-        import pypdf
-        import io
-
-        raw_bytes = await file.read()
-        if not raw_bytes:
-            raise HTTPException(status_code=400, detail="Le fichier PDF est vide.")
-
-        reader = pypdf.PdfReader(io.BytesIO(raw_bytes))
-        page_count = len(reader.pages)
-
-        full_text_parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                full_text_parts.append(text.strip())
-
-        raw_text = "\n".join(full_text_parts)
-
-        # Tokenise: split by newlines, remove blank lines & very short tokens
-        lines = [
-            ln.strip()
-            for ln in raw_text.splitlines()
-            if ln.strip() and len(ln.strip()) >= 3
-        ]
-
-        return BOMExtractResult(lines=lines, raw_text=raw_text, page_count=page_count)
-
-    except pypdf.errors.PdfReadError as e:
-        raise HTTPException(status_code=422, detail=f"PDF illisible : {e}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur extraction PDF : {e}")
-
-
-# ============= AI BOM PARSE (Ollama) =============
-
-class AIParseRequest(BaseModel):
-    text: str
-    max_chars: int = 12000   # guard: llama3.2:3b context ~128k tokens
-
-class AIComponentEntry(BaseModel):
-    designation: str
-    qty: int = 1
-    reference: str = ""
-    package: str = ""
-
-class AIParseResult(BaseModel):
-    components: list[AIComponentEntry]
-    raw_response: str
-    model: str
-
-_OLLAMA_URL = "http://localhost:11434/api/generate"
-_OLLAMA_MODEL = "llama3.2:3b"
-
-_BOM_SYSTEM_PROMPT = """Tu es un parseur de nomenclature électronique (BOM). 
-RÈGLES STRICTES :
-- Réponds UNIQUEMENT avec un tableau JSON valide, sans texte avant ou après.
-- Chaque élément du tableau doit avoir exactement ces 4 champs : "designation", "qty", "reference", "package".
-- "designation" : nom du composant sans la quantité (ex: "Résistance 10kΩ 0603").
-- "qty" : quantité entière (1 si non précisée).
-- "reference" : référence schématique si présente (R1, C2, U3…), sinon "".  
-- "package" : boîtier si présent (0402, SOT-23, DIP-8…), sinon "".
-- IGNORE les lignes qui ne sont pas des composants : en-têtes de colonnes, titres, pieds de page, numéros de page, noms de sociétés, URLs, dates.
-- ÉLIMINE les doublons (garde 1 ligne unique par composant, additionne les quantités).
-- NE JAMAIS inclure de commentaires ou de texte libre dans la réponse.
-FORMAT OBLIGATOIRE :
-[{"designation":"...","qty":1,"reference":"","package":""},...]"""
-
-@api_router.post("/bom/ai-parse", response_model=AIParseResult)
-async def bom_ai_parse(req: AIParseRequest):
-    """
-    Envoie le texte extrait d'un PDF à Ollama (llama3.2:3b) pour un filtrage
-    sémantique : suppression des lignes non-composants, dédoublonnage, 
-    structuration en JSON propre.
-    """
-    import httpx
-    import json as _json
-
-    text_to_parse = req.text[:req.max_chars]
-
-    payload = {
-        "model": _OLLAMA_MODEL,
-        "prompt": f"{_BOM_SYSTEM_PROMPT}\n\nTexte à analyser :\n{text_to_parse}",
-        "stream": False,
-        "options": {
-            "temperature": 0.05,   # quasi-déterministe
-            "num_predict": 2048,
-            "stop": ["\n\n\n"],    # évite les divagations
-        }
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            resp = await client.post(_OLLAMA_URL, json=payload)
-            resp.raise_for_status()
-    except httpx.ConnectError:
-        raise HTTPException(
-            status_code=503,
-            detail="Ollama introuvable sur localhost:11434. Vérifiez que le service tourne (ollama serve)."
-        )
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="Ollama n'a pas répondu dans les 300s.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur Ollama : {e}")
-
-    data = resp.json()
-    raw_response: str = data.get("response", "").strip()
-
-    # ─── Parsing du JSON retourné par Ollama ──────────────────────────────────
-    # Le LLM peut mettre des ```json ... ``` autour — on les enlève
-    cleaned = raw_response
-    for fence in ("```json", "```JSON", "```"):
-        cleaned = cleaned.replace(fence, "")
-    cleaned = cleaned.strip().strip("`").strip()
-
-    # Détecte si la réponse est un tableau [...] ou un objet unique {...}
-    # Certains modèles retournent un seul objet quand il n'y a qu'un composant.
-    arr_start = cleaned.find("[")
-    obj_start = cleaned.find("{")
-
-    raw_list = None
-
-    # Cas 1 : tableau JSON classique [...]
-    if arr_start != -1 and (obj_start == -1 or arr_start < obj_start):
-        end = cleaned.rfind("]")
-        if end != -1 and end > arr_start:
-            try:
-                raw_list = _json.loads(cleaned[arr_start:end + 1])
-            except _json.JSONDecodeError:
-                pass
-
-    # Cas 2 : objet unique {...} — on l'emballe dans une liste
-    if raw_list is None and obj_start != -1:
-        end = cleaned.rfind("}")
-        if end != -1 and end > obj_start:
-            try:
-                obj = _json.loads(cleaned[obj_start:end + 1])
-                raw_list = [obj] if isinstance(obj, dict) else None
-            except _json.JSONDecodeError:
-                pass
-
-    if raw_list is None:
-        raise HTTPException(
-            status_code=422,
-            detail=f"Le modèle n'a pas retourné un JSON valide. Réponse brute : {raw_response[:400]}"
-        )
-
-    # ─── Normalisation & dédoublonnage ────────────────────────────────────────
-    seen: dict[str, AIComponentEntry] = {}
-    for item in raw_list:
-        if not isinstance(item, dict):
-            continue
-        designation = str(item.get("designation", "")).strip()
-        if not designation or len(designation) < 2:
-            continue
-        qty = max(1, int(item.get("qty", 1)))
-        ref = str(item.get("reference", "")).strip()
-        pkg = str(item.get("package", "")).strip()
-        key = designation.lower()
-        if key in seen:
-            seen[key].qty += qty    # additionne les quantités si doublon
-        else:
-            seen[key] = AIComponentEntry(designation=designation, qty=qty, reference=ref, package=pkg)
-
-    components = list(seen.values())
-    logger.info(f"✅ AI BOM parse : {len(raw_list)} lignes → {len(components)} composants uniques")
-
-    return AIParseResult(components=components, raw_response=raw_response, model=_OLLAMA_MODEL)
-
-
-
-
-class ProjectCreate(BaseModel):
-    name: str
-    description: str | None = None
-
-class ProjectUpdate(BaseModel):
-    name: str | None = None
-    description: str | None = None
-
-class ProjectBinAdd(BaseModel):
-    bin_id: str
-    qty: int = 1
-    note: str | None = None
-    url: str | None = None
-
-
-# ============= PROJECTS — CRUD =============
-
-@api_router.get("/projects")
-async def list_projects(db: AsyncSession = Depends(get_db)):
-    """Liste tous les projets (sans les bins pour légèreté)."""
-    result = await db.execute(select(Project).order_by(Project.created_at.desc()))
-    projects = result.scalars().all()
-    return [
-        {
-            "id": p.id,
-            "name": p.name,
-            "description": p.description,
-            "created_at": p.created_at,
-            "bin_count": len(p.project_bins),
-        }
-        for p in projects
-    ]
-
-
-@api_router.post("/projects", status_code=201)
-async def create_project(data: ProjectCreate, db: AsyncSession = Depends(get_db)):
-    """Crée un nouveau projet."""
-    project = Project(name=data.name, description=data.description)
-    db.add(project)
-    await db.commit()
-    await db.refresh(project)
-    return {"id": project.id, "name": project.name, "description": project.description,
-            "created_at": project.created_at, "bin_count": 0}
-
-
-@api_router.patch("/projects/{project_id}")
-async def update_project(project_id: str, data: ProjectUpdate, db: AsyncSession = Depends(get_db)):
-    """Modifie le nom ou la description d'un projet."""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
-    if not project:
-        raise HTTPException(status_code=404, detail="Projet introuvable.")
-    if data.name is not None:
-        project.name = data.name
-    if data.description is not None:
-        project.description = data.description
-    await db.commit()
-    await db.refresh(project)
-    return {"id": project.id, "name": project.name, "description": project.description,
-            "created_at": project.created_at}
-
-
-@api_router.delete("/projects/{project_id}")
-async def delete_project(project_id: str, db: AsyncSession = Depends(get_db)):
-    """Supprime un projet et ses associations (cascade)."""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
-    if not project:
-        raise HTTPException(status_code=404, detail="Projet introuvable.")
-    await db.delete(project)
-    await db.commit()
-    return {"message": "Projet supprimé."}
-
-
-# ============= PROJECTS — Bin management =============
-
-@api_router.get("/projects/{project_id}/bins")
-async def get_project_bins(project_id: str, db: AsyncSession = Depends(get_db)):
-    """
-    Retourne les composants du projet avec leur localisation actuelle résolue
-    depuis l'inventaire (tiroir, couche, position XY).
-    """
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
-    if not project:
-        raise HTTPException(status_code=404, detail="Projet introuvable.")
-
-    # Récupérer tous les bins de l'inventaire en une seule requête
-    all_bins_result = await db.execute(
-        select(Bin).options(selectinload(Bin.layer).selectinload(Layer.drawer))
-    )
-    bins_by_id = {b.id: b for b in all_bins_result.scalars().all()}
-
-    enriched = []
-    for pb in project.project_bins:
-        bin_obj = bins_by_id.get(pb.bin_id)
-        entry = {
-            "pb_id": pb.id,
-            "bin_id": pb.bin_id,
-            "qty": pb.qty,
-            "note": pb.note,
-            "url": pb.url,
-            "found": bin_obj is not None,
-        }
-        if bin_obj and bin_obj.content:
-            layer = bin_obj.layer
-            drawer = layer.drawer if layer else None
-            entry.update({
-                "title": bin_obj.content.get("title", "—"),
-                "description": bin_obj.content.get("description", ""),
-                "color": bin_obj.color,
-                "x": bin_obj.x_grid,
-                "y": bin_obj.y_grid,
-                "layer": layer.z_index if layer else None,
-                "drawer": drawer.name if drawer else "—",
-                "drawer_id": drawer.id if drawer else None,
-            })
-        else:
-            entry.update({
-                "title": f"[Bin supprimé: {pb.bin_id[:8]}...]",
-                "description": "",
-                "color": None,
-                "x": None,
-                "y": None,
-                "layer": None,
-                "drawer": "—",
-                "drawer_id": None,
-            })
-        enriched.append(entry)
-
-    return enriched
-
-
-@api_router.post("/projects/{project_id}/bins", status_code=201)
-async def add_project_bin(project_id: str, data: ProjectBinAdd, db: AsyncSession = Depends(get_db)):
-    """Ajoute un composant au projet (liaison soft par bin_id string)."""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
-    if not project:
-        raise HTTPException(status_code=404, detail="Projet introuvable.")
-
-    # Empêcher les doublons
-    existing = next((pb for pb in project.project_bins if pb.bin_id == data.bin_id), None)
-    if existing:
-        existing.qty += data.qty
-        if data.url:
-            existing.url = data.url
-        await db.commit()
-        return {"pb_id": existing.id, "bin_id": existing.bin_id, "qty": existing.qty,
-                "note": existing.note, "url": existing.url}
-
-    pb = ProjectBin(project_id=project_id, bin_id=data.bin_id, qty=data.qty,
-                    note=data.note, url=data.url)
-    db.add(pb)
-    await db.commit()
-    await db.refresh(pb)
-    return {"pb_id": pb.id, "bin_id": pb.bin_id, "qty": pb.qty, "note": pb.note, "url": pb.url}
-
-
-@api_router.delete("/projects/{project_id}/bins/{pb_id}")
-async def remove_project_bin(project_id: str, pb_id: str, db: AsyncSession = Depends(get_db)):
-    """Retire un composant du projet."""
-    result = await db.execute(
-        select(ProjectBin).where(ProjectBin.id == pb_id, ProjectBin.project_id == project_id)
-    )
-    pb = result.scalar_one_or_none()
-    if not pb:
-        raise HTTPException(status_code=404, detail="Association introuvable.")
-    await db.delete(pb)
-    await db.commit()
-    return {"message": "Composant retiré du projet."}
-
-
-# ============= PROJECTS — CSV export =============
-
-@api_router.get("/projects/{project_id}/bom.csv")
-async def export_project_csv(project_id: str, db: AsyncSession = Depends(get_db)):
-    """
-    Exporte la BOM du projet au format CSV (StreamingResponse).
-    Le fichier est généré à la volée, sans écriture sur disque.
-    """
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
-    if not project:
-        raise HTTPException(status_code=404, detail="Projet introuvable.")
-
-    all_bins_result = await db.execute(
-        select(Bin).options(selectinload(Bin.layer).selectinload(Layer.drawer))
-    )
-    bins_by_id = {b.id: b for b in all_bins_result.scalars().all()}
-
-    import csv, io as _io
-    output = _io.StringIO()
-    writer = csv.writer(output, delimiter=";")
-
-    # Entête
-    writer.writerow(["#", "Bin ID", "Référence", "Désignation", "Tiroir", "Couche", "X", "Y", "Qté", "Note"])
-
-    for i, pb in enumerate(project.project_bins, 1):
-        bin_obj = bins_by_id.get(pb.bin_id)
-        if bin_obj and bin_obj.content:
-            layer = bin_obj.layer
-            drawer = layer.drawer if layer else None
-            writer.writerow([
-                i,
-                pb.bin_id,
-                bin_obj.content.get("title", ""),
-                bin_obj.content.get("description", ""),
-                drawer.name if drawer else "—",
-                layer.z_index if layer else "—",
-                bin_obj.x_grid,
-                bin_obj.y_grid,
-                pb.qty,
-                pb.note or "",
-            ])
-        else:
-            writer.writerow([i, pb.bin_id, "[Supprimé]", "", "—", "—", "—", "—", pb.qty, pb.note or ""])
-
-    csv_content = output.getvalue()
-    output.close()
-
-    return StreamingResponse(
-        iter([csv_content]),
-        media_type="text/csv; charset=utf-8",
-        headers={"Content-Disposition": f"attachment; filename=BOM_{project_id[:8]}.csv"},
-    )
-
-
 # Monter le routeur API sous le préfixe /api
 app.include_router(api_router, prefix="/api")
 
@@ -1606,6 +1669,11 @@ async def serve_spa(full_path: str):
         status_code=status.HTTP_404_NOT_FOUND,
         detail="Frontend not built. Run 'cd front && npm run build'"
     )
+
+
+# Fin de l'import du cœur de l'application
+startup.stop_import_timer()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1613,5 +1681,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=False,  # Désactivé en production
+        workers=writer.WORKERS,  # SCANGRID_WORKERS : un worker par cœur du Pi
         log_level="info"
     )
@@ -0,0 +1,324 @@
+"""
+Métriques au format texte Prometheus, sans dépendance externe.
+
+Expose des compteurs, jauges et histogrammes minimalistes, un middleware ASGI
+qui mesure chaque requête HTTP par route, et des hooks d'événements SQLAlchemy
+pour compter / chronométrer les requêtes SQL.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Buckets (secondes) adaptés à un Raspberry Pi : de la milliseconde à la minute
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+EXTERNAL_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, val in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_float(val)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # clé -> [compteurs par bucket (non cumulés), somme, nombre]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = f'le="{_format_float(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_float(total)}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+class Registry:
+    """Ensemble des métriques exposées par /api/metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_START_TIME = time.time()
+
+# ---- HTTP ----
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "scangrid_http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "scangrid_http_request_duration_seconds", "Latence des requêtes HTTP", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "scangrid_http_requests_in_flight", "Requêtes HTTP en cours de traitement"))
+
+# ---- SQL ----
+DB_STATEMENTS = REGISTRY.register(Counter(
+    "scangrid_db_statements_total", "Instructions SQL exécutées", ("operation",)))
+DB_LATENCY = REGISTRY.register(Histogram(
+    "scangrid_db_statement_duration_seconds", "Durée des instructions SQL", ("operation",),
+    buckets=SQL_BUCKETS))
+DB_ERRORS = REGISTRY.register(Counter(
+    "scangrid_db_errors_total", "Erreurs SQL", ("operation",)))
+
+# ---- Appels externes (Ollama, pypdf) ----
+EXTERNAL_LATENCY = REGISTRY.register(Histogram(
+    "scangrid_external_call_duration_seconds", "Durée des appels Ollama / pypdf",
+    ("service", "operation", "outcome"), buckets=EXTERNAL_BUCKETS))
+
+# ---- Regroupement des PATCH de boîtes (coalescer.py) ----
+BIN_UPDATES = REGISTRY.register(Counter(
+    "scangrid_bin_updates_total", "PATCH de boîtes reçus"))
+BIN_UPDATE_COMMITS = REGISTRY.register(Counter(
+    "scangrid_bin_update_commits_total", "Commits effectués pour les PATCH de boîtes"))
+
+# ---- Cache des réponses GET (response_cache.py) ----
+RESPONSE_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "scangrid_response_cache_requests_total", "GET des routes en cache, par résultat (hit / miss)",
+    ("route", "result")))
+RESPONSE_CACHE_INVALIDATIONS = REGISTRY.register(Counter(
+    "scangrid_response_cache_invalidations_total", "Entrées du cache de réponses invalidées", ("reason",)))
+RESPONSE_CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "scangrid_response_cache_entries", "Entrées dans le cache de réponses"))
+RESPONSE_CACHE_BYTES = REGISTRY.register(Gauge(
+    "scangrid_response_cache_bytes", "Taille des corps de réponse en cache"))
+
+UPTIME = REGISTRY.register(Gauge(
+    "scangrid_uptime_seconds", "Temps écoulé depuis le démarrage du processus"))
+
+
+def render_latest() -> str:
+    """Texte Prometheus de toutes les métriques enregistrées"""
+    UPTIME.set(time.time() - _START_TIME)
+    return REGISTRY.render()
+
+
+@contextmanager
+def track_external(service: str, operation: str):
+    """
+    Chronomètre un appel externe (ex: track_external("ollama", "generate")).
+    Utilisable autour d'un ``await`` dans une coroutine.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_LATENCY.observe(
+            time.perf_counter() - start, service=service, operation=operation, outcome=outcome
+        )
+
+
+# ============= SQLALCHEMY =============
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_scangrid_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_scangrid_query_start")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    op = _operation(statement)
+    DB_STATEMENTS.inc(operation=op)
+    DB_LATENCY.observe(elapsed, operation=op)
+
+
+def _handle_error(context):
+    stack = context.connection.info.get("_scangrid_query_start") if context.connection else None
+    if stack:
+        stack.pop()
+    DB_ERRORS.inc(operation=_operation(context.statement or ""))
+
+
+def instrument_engine(engine) -> None:
+    """Branche les hooks de mesure SQL sur un moteur (sync ou async). Idempotent."""
+    sync_engine: Engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# ============= MIDDLEWARE HTTP =============
+
+def route_label(scope) -> str:
+    """
+    Gabarit de la route résolue (/api/drawers/{drawer_id}) pour une requête.
+    Les versions récentes de FastAPI gardent le chemin relatif au routeur inclus
+    sur la route : on préfère alors le chemin effectif (avec préfixe /api).
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(effective, "path", None) or getattr(route, "path", None) or "unmatched"
+    if path == "/{full_path:path}":
+        return "spa"
+    return path
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI pur (pas de BaseHTTPMiddleware) : mesure la latence par
+    gabarit de route (/api/drawers/{drawer_id}) pour éviter l'explosion des labels.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route_path = route_label(scope)
+            method = scope.get("method", "GET")
+            HTTP_REQUESTS.inc(method=method, route=route_path, status=str(status_holder["status"]))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route_path)
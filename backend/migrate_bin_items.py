@@ -0,0 +1,22 @@
+import asyncio
+import sys
+
+from database import engine, Base, write_coordinator
+import bin_items
+
+async def migrate(force: bool = False):
+    async with write_coordinator.write_lock(), engine.begin() as conn:
+        print("Creating bin_items table...")
+        await conn.run_sync(Base.metadata.create_all)
+
+        print("Extracting items from bins.content...")
+        total = await bin_items.backfill(conn, force=force)
+        if total or force:
+            print(f"{total} item row(s) written.")
+        else:
+            print("bin_items already populated (use --force to rebuild).")
+
+    print("Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate(force="--force" in sys.argv))
@@ -0,0 +1,33 @@
+import asyncio
+
+from sqlalchemy import String, cast, select
+
+from database import async_session_maker, write_transaction
+from models import Bin
+import photo_store
+
+BATCH = 50
+
+async def migrate():
+    print(f"Extracting inline photos to {photo_store.PHOTOS_DIR}...")
+    bins_done = photos_done = 0
+    async with async_session_maker() as session, write_transaction(session):
+        # Seules les boîtes dont le JSON contient encore une data URL
+        result = await session.stream_scalars(
+            select(Bin)
+            .where(cast(Bin.content, String).like('%"data:%'))
+            .execution_options(yield_per=BATCH)
+        )
+        async for bin_obj in result:
+            content, extracted = photo_store.externalize(bin_obj.content)
+            if extracted:
+                bin_obj.content = content
+                bins_done += 1
+                photos_done += extracted
+        await session.commit()
+
+    print(f"{photos_done} photo(s) extracted from {bins_done} bin(s).")
+    print("Migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+
+from sqlalchemy import text
+
+from database import engine, Base, write_coordinator
+import short_ids
+
+# (type, table) : ordre sans importance, les UUID sont uniques entre tables
+TABLES = [
+    ("category", "categories"),
+    ("drawer", "drawers"),
+    ("layer", "layers"),
+    ("bin", "bins"),
+    ("project", "projects"),
+    ("project_bin", "project_bins"),
+]
+# Colonnes qui référencent un id : (table, colonne, type référencé)
+REFERENCES = [
+    ("layers", "drawer_id", "drawer"),
+    ("bins", "layer_id", "layer"),
+    ("bins", "category_id", "category"),
+    ("project_bins", "project_id", "project"),
+    ("project_bins", "bin_id", "bin"),
+    ("bin_items", "bin_id", "bin"),
+    ("bin_embeddings", "bin_id", "bin"),
+]
+
+REMAP = (
+    "UPDATE {table} SET {column} = "
+    "(SELECT new_id FROM id_map WHERE old_id = {table}.{column}) "
+    "WHERE {column} IN (SELECT old_id FROM id_map WHERE kind = :kind)"
+)
+
+async def migrate(vacuum: bool = True):
+    async with write_coordinator.write_lock():
+        async with engine.connect() as conn:
+            # Clés étrangères modifiées table par table : contrôle suspendu le temps de la migration
+            await conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            await conn.commit()
+            try:
+                async with conn.begin():
+                    print("Creating id_aliases table...")
+                    await conn.run_sync(Base.metadata.create_all)
+                    await conn.execute(text(
+                        "CREATE TEMP TABLE id_map (old_id TEXT PRIMARY KEY, new_id TEXT NOT NULL, kind TEXT NOT NULL)"
+                    ))
+
+                    used = set()
+                    for kind, table in TABLES:
+                        ids = [row[0] for row in await conn.execute(text(f"SELECT id FROM {table}"))]
+                        used.update(ids)
+                        rows = []
+                        for old_id in ids:
+                            if not short_ids.is_legacy(old_id):
+                                continue
+                            new_id = short_ids.short_id()
+                            while new_id in used:
+                                new_id = short_ids.short_id()
+                            used.add(new_id)
+                            rows.append({"old_id": old_id, "new_id": new_id, "kind": kind})
+                        if rows:
+                            await conn.execute(text("INSERT INTO id_map VALUES (:old_id, :new_id, :kind)"), rows)
+                        print(f"{table}: {len(rows)} id(s) to convert")
+
+                    print("Rewriting references...")
+                    for table, column, kind in REFERENCES:
+                        await conn.execute(text(REMAP.format(table=table, column=column)), {"kind": kind})
+                    for kind, table in TABLES:
+                        await conn.execute(text(REMAP.format(table=table, column="id")), {"kind": kind})
+
+                    result = await conn.execute(text(
+                        "INSERT OR IGNORE INTO id_aliases (old_id, new_id, kind) SELECT old_id, new_id, kind FROM id_map"
+                    ))
+                    print(f"{result.rowcount} alias(es) recorded.")
+                    await conn.execute(text("DROP TABLE id_map"))
+
+                if vacuum:
+                    # Les index ne rétrécissent qu'une fois la base réécrite
+                    print("Vacuuming...")
+                    autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await autocommit.exec_driver_sql("VACUUM")
+            finally:
+                # Connexion rendue au pool : les cascades (deletes.py) reposent sur les clés étrangères
+                await conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+                await conn.commit()
+        write_coordinator.bump_generation()
+
+    print("Migration complete! Set SCANGRID_SHORT_IDS=1 and restart the service.")
+
+if __name__ == "__main__":
+    asyncio.run(migrate(vacuum="--no-vacuum" not in sys.argv))
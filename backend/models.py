@@ -1,19 +1,29 @@
 """
 Modèles SQLAlchemy pour les tiroirs Gridfinity
+
+Aucune relation ne se charge implicitement (lazy="raise") : chaque endpoint
+déclare ce qu'il lit (selectinload(...) pour les réponses imbriquées, select
+de colonnes pour les vérifications d'existence, COUNT pour les compteurs). Un
+accès à une relation non chargée lève une erreur au lieu d'émettre une requête.
+
+Les suppressions reposent sur les ON DELETE CASCADE du schéma
+(PRAGMA foreign_keys=ON) et sur un UPDATE ensembliste pour bins.category_id :
+passive_deletes=True, l'ORM ne charge pas les enfants pour les supprimer un
+par un (deletes.py).
 """
-from sqlalchemy import String, Integer, Float, ForeignKey, JSON
+from sqlalchemy import String, Integer, Float, ForeignKey, JSON, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List, Optional, Dict, Any, Union
-import uuid
 import datetime
 
 from database import Base
+from short_ids import new_id
 
 
 class Drawer(Base):
     __tablename__ = "drawers"
     
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=new_id)
     name: Mapped[str] = mapped_column(String, nullable=False)
     width_units: Mapped[int] = mapped_column(Integer, nullable=False, default=10)
     depth_units: Mapped[int] = mapped_column(Integer, nullable=False, default=10)
@@ -23,7 +33,8 @@ class Drawer(Base):
         "Layer",
         back_populates="drawer",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        passive_deletes=True,
+        lazy="raise"
     )
     
     def __repr__(self):
@@ -33,17 +44,18 @@ class Drawer(Base):
 class Layer(Base):
     __tablename__ = "layers"
     
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=new_id)
     drawer_id: Mapped[str] = mapped_column(String, ForeignKey("drawers.id", ondelete="CASCADE"), nullable=False)
     z_index: Mapped[int] = mapped_column(Integer, nullable=False)
     
     # Relations
-    drawer: Mapped["Drawer"] = relationship("Drawer", back_populates="layers")
+    drawer: Mapped["Drawer"] = relationship("Drawer", back_populates="layers", lazy="raise")
     bins: Mapped[List["Bin"]] = relationship(
         "Bin",
         back_populates="layer",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        passive_deletes=True,
+        lazy="raise"
     )
     
     def __repr__(self):
@@ -53,12 +65,14 @@ class Layer(Base):
 class Category(Base):
     __tablename__ = "categories"
     
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=new_id)
     name: Mapped[str] = mapped_column(String, nullable=False, unique=True)
     icon: Mapped[Optional[str]] = mapped_column(String, nullable=True, default="ri-folder-line")
     
     # Relations
-    bins: Mapped[List["Bin"]] = relationship("Bin", back_populates="category")
+    bins: Mapped[List["Bin"]] = relationship(
+        "Bin", back_populates="category", passive_deletes=True, lazy="raise"
+    )
 
     def __repr__(self):
         return f"<Category(id={self.id}, name={self.name})>"
@@ -67,7 +81,7 @@ class Category(Base):
 class Bin(Base):
     __tablename__ = "bins"
     
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=new_id)
     layer_id: Mapped[str] = mapped_column(String, ForeignKey("layers.id", ondelete="CASCADE"), nullable=False)
     category_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True) # New FK
     x_grid: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -81,19 +95,55 @@ class Bin(Base):
     is_hole: Mapped[Optional[bool]] = mapped_column(Integer, nullable=True, default=False)
     
     # Relations
-    layer: Mapped["Layer"] = relationship("Layer", back_populates="bins")
-    category: Mapped[Optional["Category"]] = relationship("Category", back_populates="bins", lazy="selectin")
+    layer: Mapped["Layer"] = relationship("Layer", back_populates="bins", lazy="raise")
+    category: Mapped[Optional["Category"]] = relationship("Category", back_populates="bins", lazy="raise")
     
     def __repr__(self):
         return f"<Bin(id={self.id}, pos=({self.x_grid},{self.y_grid}), category={self.category_id}, title={self.content.get('title') if self.content else 'N/A'})>"
 
 
+class BinItem(Base):
+    """
+    Articles d'une boîte, une ligne par entrée de content["items"].
+    Copie indexée tenue à jour à chaque flush (bin_items.py) : l'API continue
+    de lire et d'écrire content["items"].
+    """
+    __tablename__ = "bin_items"
+
+    bin_id: Mapped[str] = mapped_column(String, ForeignKey("bins.id", ondelete="CASCADE"), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True)
+    text: Mapped[str] = mapped_column(String, nullable=False)
+    text_norm: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    qty: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<BinItem(bin={self.bin_id}, position={self.position}, text={self.text})>"
+
+
+class BinEmbedding(Base):
+    """
+    Embedding du texte d'une boîte (titre, description, articles) pour la
+    recherche sémantique (semantic_index.py). Recalculé seulement quand
+    text_hash ou le modèle changent.
+    """
+    __tablename__ = "bin_embeddings"
+
+    bin_id: Mapped[str] = mapped_column(String, ForeignKey("bins.id", ondelete="CASCADE"), primary_key=True)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+    text_hash: Mapped[str] = mapped_column(String, nullable=False)
+    dim: Mapped[int] = mapped_column(Integer, nullable=False)
+    vector: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # float32
+
+    def __repr__(self):
+        return f"<BinEmbedding(bin={self.bin_id}, model={self.model}, dim={self.dim})>"
+
+
 # ============= PROJECTS =============
 
 class Project(Base):
     __tablename__ = "projects"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=new_id)
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     created_at: Mapped[str] = mapped_column(String, nullable=False, default=lambda: datetime.datetime.utcnow().isoformat())
@@ -103,7 +153,8 @@ class Project(Base):
         "ProjectBin",
         back_populates="project",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        passive_deletes=True,
+        lazy="raise"
     )
 
     def __repr__(self):
@@ -114,11 +165,12 @@ class ProjectBin(Base):
     """
     Association entre un projet et un bin de l'inventaire.
     bin_id est une référence "soft" (string) — pas de FK dure —
-    pour éviter la cascade si un bin est supprimé.
+    pour éviter la cascade si un bin est supprimé : le sort de l'association
+    dépend de SCANGRID_PROJECT_BIN_ON_DELETE (deletes.py).
     """
     __tablename__ = "project_bins"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=new_id)
     project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     bin_id: Mapped[str] = mapped_column(String, nullable=False)   # soft ref
     qty: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
@@ -126,8 +178,22 @@ class ProjectBin(Base):
     url: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # lien datasheet / PDF
 
     # Relation
-    project: Mapped["Project"] = relationship("Project", back_populates="project_bins")
+    project: Mapped["Project"] = relationship("Project", back_populates="project_bins", lazy="raise")
 
     def __repr__(self):
         return f"<ProjectBin(id={self.id}, project={self.project_id}, bin={self.bin_id}, qty={self.qty})>"
 
+
+class IdAlias(Base):
+    """
+    Ancien UUID → id court, rempli par migrate_short_ids.py : les anciens
+    liens restent valides (short_ids.IdAliasMiddleware).
+    """
+    __tablename__ = "id_aliases"
+
+    old_id: Mapped[str] = mapped_column(String, primary_key=True)
+    new_id: Mapped[str] = mapped_column(String, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+
+    def __repr__(self):
+        return f"<IdAlias({self.kind} {self.old_id} → {self.new_id})>"
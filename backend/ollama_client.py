@@ -0,0 +1,176 @@
+"""
+Client HTTP Ollama partagé par les endpoints IA (features/ai.py) et par la
+recherche sémantique (embeddings, semantic_index.py).
+
+Un seul httpx.AsyncClient, créé à la première requête IA (httpx n'est importé
+qu'à ce moment : importer ce module pour lire sa configuration ne coûte rien
+au démarrage) et fermé par le lifespan : connexions keep-alive réutilisées
+d'un appel à l'autre (plus de poignée de main TCP par requête).
+Chaque génération passe keep_alive à Ollama pour que le modèle reste chargé
+en mémoire ; le préchauffage optionnel charge le modèle au démarrage, en
+tâche de fond, au lieu de faire payer plusieurs secondes au premier appel.
+
+reachable() interroge /api/version avec un délai court et garde le résultat
+SCANGRID_OLLAMA_PROBE_TTL secondes : un Ollama arrêté est signalé (503) sans
+attendre un délai de connexion à chaque requête.
+
+Configuration (variables d'environnement) :
+  - SCANGRID_OLLAMA_URL         : URL de base (défaut http://localhost:11434)
+  - SCANGRID_OLLAMA_MODEL       : modèle (défaut llama3.2:3b)
+  - SCANGRID_OLLAMA_TIMEOUT     : délai max d'une génération en s (défaut 300)
+  - SCANGRID_OLLAMA_KEEP_ALIVE  : durée de résidence du modèle (défaut 30m, -1 = toujours)
+  - SCANGRID_OLLAMA_WARMUP      : 1 = charge le modèle au démarrage (défaut 0)
+  - SCANGRID_OLLAMA_PROBE_TTL   : durée de cache de la sonde en s (défaut 30)
+"""
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = os.getenv("SCANGRID_OLLAMA_URL", "http://localhost:11434").rstrip("/")
+MODEL = os.getenv("SCANGRID_OLLAMA_MODEL", "llama3.2:3b")
+TIMEOUT = float(os.getenv("SCANGRID_OLLAMA_TIMEOUT", "300"))
+KEEP_ALIVE = os.getenv("SCANGRID_OLLAMA_KEEP_ALIVE", "30m")
+WARMUP = os.getenv("SCANGRID_OLLAMA_WARMUP", "0").lower() in ("1", "true", "yes", "on")
+PROBE_TTL = float(os.getenv("SCANGRID_OLLAMA_PROBE_TTL", "30"))
+PROBE_TIMEOUT = 2.0
+
+
+class OllamaClient:
+    def __init__(self, base_url: str = BASE_URL, model: str = MODEL, timeout: float = TIMEOUT,
+                 keep_alive: str = KEEP_ALIVE, probe_ttl: float = PROBE_TTL,
+                 transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.probe_ttl = probe_ttl
+        self._transport = transport
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._probe: Optional[bool] = None
+        self._probe_at = 0.0
+        self.warmup_seconds: Optional[float] = None
+        self.requests = 0
+
+    def start(self) -> "httpx.AsyncClient":
+        """Crée le client httpx partagé ; sans effet s'il existe déjà"""
+        if self._http is None or self._http.is_closed:
+            import httpx
+
+
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=300),
+                transport=self._transport,
+            )
+        return self._http
+
+    @property
+    def http(self) -> "httpx.AsyncClient":
+        # Créé à la demande, au premier appel
+        return self.start()
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _keep_alive(self) -> Any:
+        # Ollama attend un entier pour une durée en secondes (-1 = indéfiniment)
+        value = self.keep_alive
+        return int(value) if value.lstrip("-").isdigit() else value
+
+    async def generate(self, prompt: str, operation: str = "generate", **options) -> Dict[str, Any]:
+        """
+        POST /api/generate (réponse complète, sans streaming). Les erreurs httpx
+        remontent telles quelles ; une erreur de connexion invalide la sonde.
+        """
+        return await self._post("/api/generate", operation, {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self._keep_alive(),
+            "options": options,
+        })
+
+    async def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        """POST /api/embed : un vecteur par texte, dans le même ordre"""
+        data = await self._post("/api/embed", "embed", {
+            "model": model,
+            "input": texts,
+            "keep_alive": self._keep_alive(),
+        })
+        return data["embeddings"]
+
+    async def _post(self, path: str, operation: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import httpx
+
+        self.requests += 1
+        try:
+            with metrics.track_external("ollama", operation):
+                response = await self.http.post(path, json=payload)
+                response.raise_for_status()
+        except httpx.ConnectError:
+            self._set_probe(False)
+            raise
+        self._set_probe(True)
+        return response.json()
+
+    async def warm_up(self) -> bool:
+        """Charge le modèle en mémoire (generate sans prompt) ; False si Ollama est injoignable"""
+        import httpx
+
+        t0 = time.perf_counter()
+        try:
+            with metrics.track_external("ollama", "warmup"):
+                response = await self.http.post("/api/generate", json={
+                    "model": self.model, "keep_alive": self._keep_alive(),
+                })
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("⚠️ Préchauffage Ollama impossible (%s) : %s", self.model, e)
+            self._set_probe(False)
+            return False
+        self.warmup_seconds = time.perf_counter() - t0
+        self._set_probe(True)
+        logger.info("🔥 Modèle %s chargé en %.1f s", self.model, self.warmup_seconds)
+        return True
+
+    def _set_probe(self, ok: bool) -> None:
+        self._probe = ok
+        self._probe_at = time.monotonic()
+
+    async def reachable(self) -> bool:
+        """Ollama répond-il ? Résultat gardé probe_ttl secondes"""
+        if self._probe is not None and time.monotonic() - self._probe_at < self.probe_ttl:
+            return self._probe
+        import httpx
+
+        try:
+            response = await self.http.get("/api/version", timeout=PROBE_TIMEOUT)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self._set_probe(ok)
+        return ok
+
+    async def report(self) -> dict:
+        return {
+            "url": self.base_url,
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "reachable": await self.reachable(),
+            "warmup_s": round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None,
+            "requests": self.requests,
+        }
+
+
+client = OllamaClient()
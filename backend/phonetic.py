@@ -0,0 +1,100 @@
+"""
+Clés phonétiques françaises pour /locate (dictée Siri tolérante).
+
+La dictée produit des fautes « à l'oreille » : rézistance, transitor,
+condensateurs → condo. phonetic_key() réduit un mot (déjà normalisé : minuscules,
+sans accents) à son squelette de consonnes après les règles de prononciation
+usuelles du français (ph → f, qu → k, c/g doux, z → s, pluriel muet, lettres
+doublées), à la manière d'un Soundex / Metaphone :
+
+    resistance, rezistance, résistances → rstns
+    transistor, transitor              → trnstr
+
+PhoneticIndex regroupe le vocabulaire de l'inventaire par clé (et par préfixe
+de clé pour les abréviations : condo → condensateur). Un mot de requête obtient
+ses voisins phonétiques par une seule recherche dans un dict.
+
+Les références (10k, 0603, m3...) n'ont pas de clé : elles ne se comparent
+qu'à l'identique.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional, Set
+
+# Clé minimale pour une correspondance exacte / par préfixe (évite v, r, ...)
+MIN_KEY = 2
+MIN_PREFIX_KEY = 3
+
+_NON_ALPHA = re.compile(r"[^a-z0-9]")
+_VOWELS = frozenset("aeiouy")
+
+# Règles appliquées dans l'ordre (graphies → sons)
+_RULES = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"th"), "t"),
+    (re.compile(r"sch|ch|sh"), "s"),
+    (re.compile(r"gn"), "n"),
+    (re.compile(r"qu|q|ck"), "k"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"g(?=[eiy])"), "j"),
+    (re.compile(r"gu(?=[eiy])"), "g"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"m(?=[bp])"), "n"),
+    (re.compile(r"h"), ""),
+    # Pluriel et finales muettes
+    (re.compile(r"(?<=.)(?:es|s|ks|t|ts|d|ds)$"), ""),
+]
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(word: str) -> Optional[str]:
+    """Squelette phonétique d'un mot normalisé, None pour les références / mots trop courts"""
+    word = _NON_ALPHA.sub("", word)
+    if not word or any(ch.isdigit() for ch in word):
+        return None
+    for pattern, repl in _RULES:
+        word = pattern.sub(repl, word)
+    if not word:
+        return None
+    # Voyelle initiale gardée comme marqueur, les autres voyelles disparaissent
+    head = "a" if word[0] in _VOWELS else word[0]
+    key = [head]
+    for ch in word[1:]:
+        if ch in _VOWELS or ch == key[-1]:
+            continue
+        key.append(ch)
+    key = "".join(key)
+    return key if len(key) >= MIN_KEY else None
+
+
+class PhoneticIndex:
+    """Vocabulaire de l'inventaire groupé par clé phonétique et par préfixe de clé"""
+
+    __slots__ = ("by_key", "by_prefix")
+
+    def __init__(self, vocabulary: Iterable[str]):
+        by_key: Dict[str, Set[str]] = {}
+        by_prefix: Dict[str, Set[str]] = {}
+        for token in set(vocabulary):
+            key = phonetic_key(token)
+            if key is None:
+                continue
+            by_key.setdefault(key, set()).add(token)
+            for end in range(MIN_PREFIX_KEY, len(key)):
+                by_prefix.setdefault(key[:end], set()).add(token)
+        self.by_key = {k: frozenset(v) for k, v in by_key.items()}
+        self.by_prefix = {k: frozenset(v) for k, v in by_prefix.items()}
+
+    def neighbours(self, word: str) -> FrozenSet[str]:
+        """Mots du vocabulaire qui se prononcent comme word (ou qu'il abrège)"""
+        key = phonetic_key(word)
+        if key is None:
+            return frozenset()
+        same = self.by_key.get(key, frozenset())
+        if len(key) < MIN_PREFIX_KEY:
+            return same
+        longer = self.by_prefix.get(key)
+        return same | longer if longer else same
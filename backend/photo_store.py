@@ -0,0 +1,268 @@
+"""
+Stockage des photos de boîtes sur disque, adressé par contenu.
+
+Les photos importées depuis l'éditeur étaient des data URLs base64 rangées
+dans content["photos"] : chaque lecture d'inventaire traînait des Mo d'image
+à travers SQLite, l'ORM et le JSON. Désormais :
+
+  - une photo est un fichier <PHOTOS_DIR>/<2 premiers car.>/<sha256>.<ext>,
+    écrit une seule fois (même image = même id) ;
+  - content["photos"] ne contient que des URLs (/api/photos/<id>) ;
+  - toute data URL encore envoyée par un ancien client est extraite vers le
+    store avant l'écriture en base : par les endpoints d'écriture, dans un
+    thread (externalize_async), sinon en dernier recours par le crochet
+    before_flush (synchrone, dans la boucle) ;
+  - migrate_photos.py extrait celles déjà en base ;
+  - les miniatures sont générées à la demande dans un pool de processus
+    (Pillow, optionnel : sans Pillow l'original est servi).
+
+Configuration (variables d'environnement) :
+  - SCANGRID_PHOTOS_DIR         : répertoire du store (défaut <SCANGRID_DB_DIR>/photos)
+  - SCANGRID_PHOTO_MAX_BYTES    : taille max d'une photo (10 Mo)
+  - SCANGRID_THUMB_SIZE         : côté max des miniatures en px (320)
+  - SCANGRID_THUMB_WORKERS      : processus de génération des miniatures (1)
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from database import DB_DIR
+from models import Bin
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PHOTOS_DIR = os.getenv("SCANGRID_PHOTOS_DIR", os.path.join(DB_DIR, "photos"))
+MAX_BYTES = int(os.getenv("SCANGRID_PHOTO_MAX_BYTES", str(10 * 1024 * 1024)))
+THUMB_SIZE = int(os.getenv("SCANGRID_THUMB_SIZE", "320"))
+THUMB_WORKERS = max(1, int(os.getenv("SCANGRID_THUMB_WORKERS", "1")))
+
+URL_PREFIX = "/api/photos/"
+# En-tête des réponses : le contenu d'un id ne change jamais
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Original servi à la place d'une miniature absente : l'URL /thumb doit pouvoir
+# recevoir la vraie miniature plus tard (Pillow installé, nouvelle tentative)
+FALLBACK = "public, max-age=300"
+
+_ID = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL = re.compile(r"^data:(image/[a-z0-9.+-]+)?(;[^,]*)?,", re.IGNORECASE)
+
+# Signature → (extension, type MIME)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"GIF87a", "gif", "image/gif"),
+    (b"GIF89a", "gif", "image/gif"),
+)
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+
+class PhotoError(ValueError):
+    """Fichier refusé (pas une image reconnue, trop gros)"""
+
+
+def sniff(data: bytes) -> Optional[str]:
+    """Extension d'après les premiers octets (jpg, png, gif, webp)"""
+    for signature, ext, _ in _SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def is_valid_id(photo_id: str) -> bool:
+    return bool(_ID.match(photo_id))
+
+
+def _dir_for(photo_id: str) -> str:
+    return os.path.join(PHOTOS_DIR, photo_id[:2])
+
+
+def path_for(photo_id: str, thumb: bool = False) -> Optional[str]:
+    """Chemin du fichier (original ou miniature) s'il existe"""
+    if not is_valid_id(photo_id):
+        return None
+    directory = _dir_for(photo_id)
+    if thumb:
+        path = os.path.join(directory, f"{photo_id}.thumb.jpg")
+        return path if os.path.exists(path) else None
+    for ext in MEDIA_TYPES:
+        path = os.path.join(directory, f"{photo_id}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def url_for(photo_id: str) -> str:
+    return f"{URL_PREFIX}{photo_id}"
+
+
+def save(data: bytes) -> str:
+    """Écrit la photo (une seule fois par contenu) et retourne son id"""
+    if len(data) > MAX_BYTES:
+        raise PhotoError(f"Photo trop volumineuse ({len(data)} octets, max {MAX_BYTES})")
+    ext = sniff(data)
+    if ext is None:
+        raise PhotoError("Format d'image non reconnu (JPEG, PNG, GIF ou WebP attendu)")
+    photo_id = hashlib.sha256(data).hexdigest()
+    directory = _dir_for(photo_id)
+    final = os.path.join(directory, f"{photo_id}.{ext}")
+    if os.path.exists(final):
+        return photo_id
+    os.makedirs(directory, exist_ok=True)
+    # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, final)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return photo_id
+
+
+def decode_data_url(value: str) -> Optional[bytes]:
+    """Octets d'une data URL base64 d'image, None si ce n'en est pas une"""
+    match = _DATA_URL.match(value)
+    if not match or ";base64" not in (match.group(2) or "").lower():
+        return None
+    try:
+        return base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def externalize(content: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Remplace les data URLs de content["photos"] par des URLs du store.
+    Retourne (nouveau content, nombre de photos extraites) ; content inchangé
+    (même objet) quand il n'y a rien à extraire.
+    """
+    if not has_inline(content):
+        return content, 0
+    extracted = 0
+    urls = []
+    for photo in content["photos"]:
+        data = decode_data_url(photo) if isinstance(photo, str) and photo.startswith("data:") else None
+        if data is None:
+            urls.append(photo)
+            continue
+        try:
+            urls.append(url_for(save(data)))
+            extracted += 1
+        except PhotoError as e:
+            # Image illisible : conservée telle quelle plutôt que perdue
+            logger.warning("⚠️ Photo inline non extraite : %s", e)
+            urls.append(photo)
+    return {**content, "photos": urls}, extracted
+
+
+def has_inline(content: Optional[Dict[str, Any]]) -> bool:
+    photos = (content or {}).get("photos")
+    return bool(photos) and any(isinstance(p, str) and p.startswith("data:") for p in photos)
+
+
+async def externalize_async(content: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    externalize() hors de la boucle d'événements (décodage base64 et écriture
+    disque dans un thread) ; content rendu tel quel sans data URL.
+    """
+    if not has_inline(content):
+        return content
+    content, extracted = await asyncio.to_thread(externalize, content)
+    if extracted:
+        logger.info("🖼️ %s photo(s) inline extraite(s)", extracted)
+    return content
+
+
+@event.listens_for(Session, "before_flush")
+def _externalize_bin_photos(session: Session, flush_context, instances) -> None:
+    # Filet de sécurité : les endpoints ont déjà extrait les photos via
+    # externalize_async, il ne reste ici que les écritures directes (scripts)
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Bin):
+            continue
+        if obj not in session.new and not inspect(obj).attrs.content.history.has_changes():
+            continue
+        content, extracted = externalize(obj.content)
+        if extracted:
+            obj.content = content
+            logger.info("🖼️ %s photo(s) inline extraite(s) de la boîte %s", extracted, obj.id)
+
+
+# ============= MINIATURES =============
+
+def make_thumbnail(source: str, target: str, size: int) -> None:
+    """Exécuté dans un processus du pool : JPEG de côté max `size`"""
+    with Image.open(source) as img:
+        img.thumbnail((size, size))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        tmp = f"{target}.{os.getpid()}.tmp"
+        img.save(tmp, "JPEG", quality=80, optimize=True)
+    os.replace(tmp, target)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: Dict[str, asyncio.Future] = {}
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=THUMB_WORKERS)
+    return _pool
+
+
+async def thumbnail_path(photo_id: str) -> Optional[str]:
+    """
+    Miniature de la photo (générée au premier appel ; appels simultanés
+    regroupés). Sans Pillow ou si la génération échoue : l'original.
+    """
+    source = path_for(photo_id)
+    if source is None:
+        return None
+    existing = path_for(photo_id, thumb=True)
+    if existing is not None or not PIL_AVAILABLE:
+        return existing or source
+
+    future = _pending.get(photo_id)
+    if future is None:
+        target = os.path.join(_dir_for(photo_id), f"{photo_id}.thumb.jpg")
+        loop = asyncio.get_running_loop()
+        future = _pending[photo_id] = loop.run_in_executor(_executor(), make_thumbnail, source, target, THUMB_SIZE)
+        future.add_done_callback(lambda _: _pending.pop(photo_id, None))
+    try:
+        await asyncio.shield(future)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("⚠️ Miniature impossible pour %s : %s", photo_id, e)
+        return source
+    return path_for(photo_id, thumb=True) or source
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
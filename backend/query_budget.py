@@ -0,0 +1,142 @@
+"""
+Mode debug SQL : budget de requêtes par requête HTTP et détection N+1.
+
+Activé par SCANGRID_SQL_DEBUG=1. Chaque requête HTTP compte ses instructions
+SQL (événements SQLAlchemy), signale les formes de requête répétées (N+1),
+journalise les dépassements de budget et ajoute les en-têtes :
+  - X-SQL-Query-Count   : nombre d'instructions SQL exécutées
+  - X-SQL-Query-Time-Ms : temps SQL cumulé (ms)
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SCANGRID_SQL_DEBUG", "0").lower() in ("1", "true", "yes", "on")
+# Budget par requête HTTP (au-delà : warning dans les logs)
+MAX_QUERIES = int(os.getenv("SCANGRID_SQL_BUDGET_QUERIES", "10"))
+MAX_TIME_MS = float(os.getenv("SCANGRID_SQL_BUDGET_MS", "100"))
+# Nombre de répétitions d'une même forme de requête à partir duquel on signale un N+1
+NPLUS1_THRESHOLD = int(os.getenv("SCANGRID_SQL_NPLUS1_THRESHOLD", "3"))
+
+HEADER_COUNT = "X-SQL-Query-Count"
+HEADER_TIME = "X-SQL-Query-Time-Ms"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Forme normalisée d'une requête : littéraux et listes IN (...) effacés"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Compteurs SQL d'une requête HTTP"""
+
+    __slots__ = ("count", "elapsed", "shapes", "_starts")
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.shapes: Counter = Counter()
+        self._starts: list[float] = []
+
+    @property
+    def elapsed_ms(self) -> float:
+        return self.elapsed * 1000.0
+
+    def repeated_shapes(self, threshold: int = NPLUS1_THRESHOLD) -> list[tuple[str, int]]:
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("scangrid_query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Statistiques SQL de la requête HTTP en cours (None hors mode debug)"""
+    return _current.get()
+
+
+# ============= SQLALCHEMY =============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats._starts.append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not stats._starts:
+        return
+    stats.elapsed += time.perf_counter() - stats._starts.pop()
+    stats.count += 1
+    stats.shapes[statement_shape(statement)] += 1
+
+
+def instrument_engine(engine) -> None:
+    """Branche le comptage par requête HTTP sur un moteur (sync ou async). Idempotent."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ============= MIDDLEWARE HTTP =============
+
+class QueryBudgetMiddleware:
+    """
+    Middleware ASGI : ouvre un compteur SQL par requête HTTP, ajoute les
+    en-têtes X-SQL-* à la réponse et journalise N+1 / dépassements de budget.
+    Sans effet si SCANGRID_SQL_DEBUG n'est pas activé.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((HEADER_COUNT.lower().encode(), str(stats.count).encode()))
+                headers.append((HEADER_TIME.lower().encode(), f"{stats.elapsed_ms:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats: QueryStats) -> None:
+        target = "%s %s" % (scope.get("method", "?"), scope.get("path", "?"))
+        for shape, n in stats.repeated_shapes():
+            logger.warning("🐢 N+1 suspect sur %s : %d× %s", target, n, shape[:200])
+        if stats.count > MAX_QUERIES or stats.elapsed_ms > MAX_TIME_MS:
+            logger.warning(
+                "⏱️ Budget SQL dépassé sur %s : %d requête(s) (max %d), %.1f ms (max %.0f)",
+                target, stats.count, MAX_QUERIES, stats.elapsed_ms, MAX_TIME_MS,
+            )
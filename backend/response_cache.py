@@ -0,0 +1,301 @@
+"""
+Cache mémoire des réponses GET, invalidé par étiquettes.
+
+Beaucoup de GET sont répétés à l'identique : /api/categories, /api/drawers/{id},
+/api/locate?query=... (Siri) et /api/bom/search pendant la frappe. Le
+middleware ResponseCacheMiddleware garde les octets de la réponse (statut,
+en-têtes, corps JSON) par chemin + query string : un hit ne touche ni la base,
+ni l'instantané, ni la sérialisation pydantic.
+
+Étiquettes : pendant la requête, l'endpoint déclare de quoi dépend sa réponse
+avec tag("drawer:<id>", "layer:<id>", ...). Les endpoints de mutation appellent
+invalidate(...) avec les étiquettes touchées après leur commit. Étiquettes
+utilisées :
+  - drawer:<id>, layer:<id> : contenu d'un tiroir (GET /drawers/{id}) ;
+  - categories               : liste des catégories ;
+  - inventory                : toute réponse calculée sur l'ensemble de
+                               l'inventaire (/locate, /bom/search, ...) ;
+  - project:<id>, projects   : projets.
+
+Une réponse calculée pendant une invalidation n'est pas conservée (elle a pu
+lire l'état d'avant). Les écritures des autres workers vident tout le cache
+(crochet de génération de writer.py).
+
+Configuration (variables d'environnement) :
+  - SCANGRID_CACHE_ROUTES    : endpoints mis en cache, avec TTL optionnel en s,
+                               ex. "list_categories=300,get_drawer,locate_box"
+                               (défaut "" : cache désactivé, chaque route
+                               est activée explicitement)
+  - SCANGRID_CACHE_TTL       : TTL par défaut en secondes (60)
+  - SCANGRID_CACHE_MAX_BYTES : taille totale max des corps en cache (16 Mio)
+  - SCANGRID_CACHE_MAX_ENTRIES : nombre max d'entrées (1024)
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Optional, Set, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+def parse_routes(spec: Optional[str], default_ttl: float) -> Dict[str, float]:
+    """"get_drawer=30,locate_box" -> {"get_drawer": 30.0, "locate_box": default_ttl}"""
+    routes: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        ttl = default_ttl
+        if sep:
+            try:
+                ttl = float(value)
+            except ValueError:
+                continue
+        if ttl > 0:
+            routes[name] = ttl
+    return routes
+
+
+TTL = float(os.getenv("SCANGRID_CACHE_TTL", "60"))
+ROUTES = parse_routes(os.getenv("SCANGRID_CACHE_ROUTES", ""), TTL)
+MAX_BYTES = int(os.getenv("SCANGRID_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+MAX_ENTRIES = int(os.getenv("SCANGRID_CACHE_MAX_ENTRIES", "1024"))
+
+# Étiquettes déclarées par l'endpoint en cours (None hors requête cachable)
+_current_tags: ContextVar[Optional[Set[str]]] = ContextVar("scangrid_cache_tags", default=None)
+
+
+def tag(*tags: str) -> None:
+    """Déclare les dépendances de la réponse en cours (sans effet hors cache)"""
+    current = _current_tags.get()
+    if current is not None:
+        current.update(tags)
+
+
+class _Entry:
+    __slots__ = ("route", "start", "body", "tags", "expires", "route_scope")
+
+    def __init__(self, route: str, start: dict, body: bytes, tags: frozenset,
+                 expires: float, route_scope: dict):
+        self.route = route
+        self.start = start
+        self.body = body
+        self.tags = tags
+        self.expires = expires
+        self.route_scope = route_scope
+
+
+class ResponseCache:
+    """LRU borné (taille des corps + nombre d'entrées) avec TTL et index par étiquette"""
+
+    def __init__(self, routes: Dict[str, float], max_bytes: int = MAX_BYTES,
+                 max_entries: int = MAX_ENTRIES):
+        self.routes = dict(routes)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[bytes, bytes], _Entry]" = OrderedDict()
+        self._by_tag: Dict[str, Set[Tuple[bytes, bytes]]] = {}
+        self._bytes = 0
+        # Incrémenté à chaque invalidation : une réponse commencée avant n'est pas stockée
+        self.epoch = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.routes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[bytes, bytes]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Tuple[bytes, bytes], entry: _Entry) -> bool:
+        size = len(entry.body)
+        # Une réponse énorme évincerait tout le reste du cache
+        if size > self.max_bytes // 4:
+            return False
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self._bytes += size
+        for t in entry.tags:
+            self._by_tag.setdefault(t, set()).add(key)
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            self._drop(next(iter(self._entries)))
+        self._update_gauges()
+        return True
+
+    def invalidate(self, *tags: str) -> int:
+        """Supprime les entrées portant au moins une des étiquettes"""
+        self.epoch += 1
+        dropped = 0
+        for t in tags:
+            for key in self._by_tag.pop(t, ()):
+                if key in self._entries:
+                    self._drop(key)
+                    dropped += 1
+        if dropped:
+            metrics.RESPONSE_CACHE_INVALIDATIONS.inc(dropped, reason="tag")
+            self._update_gauges()
+        return dropped
+
+    def clear(self, reason: str = "clear") -> None:
+        self.epoch += 1
+        if self._entries:
+            metrics.RESPONSE_CACHE_INVALIDATIONS.inc(len(self._entries), reason=reason)
+        self._entries.clear()
+        self._by_tag.clear()
+        self._bytes = 0
+        self._update_gauges()
+
+    def report(self) -> dict:
+        routes = {}
+        for name, ttl in self.routes.items():
+            hits = metrics.RESPONSE_CACHE_REQUESTS.value(route=name, result="hit")
+            misses = metrics.RESPONSE_CACHE_REQUESTS.value(route=name, result="miss")
+            routes[name] = {
+                "ttl_s": ttl,
+                "hits": int(hits),
+                "misses": int(misses),
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            }
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "routes": routes,
+        }
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        for t in entry.tags:
+            keys = self._by_tag.get(t)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[t]
+
+    def _update_gauges(self) -> None:
+        metrics.RESPONSE_CACHE_ENTRIES.set(len(self._entries))
+        metrics.RESPONSE_CACHE_BYTES.set(self._bytes)
+
+
+cache = ResponseCache(ROUTES)
+
+
+def invalidate(*tags: str) -> int:
+    return cache.invalidate(*tags)
+
+
+def clear() -> None:
+    cache.clear()
+
+
+def on_remote_write(generation: int) -> None:
+    """Un autre worker a écrit : les étiquettes touchées sont inconnues ici"""
+    cache.clear(reason="generation")
+
+
+def _endpoint_name(scope) -> Optional[str]:
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None)
+
+
+def _route_scope(scope) -> dict:
+    """Ce qu'il faut remettre dans le scope sur un hit pour les labels de métriques"""
+    saved = {"route": scope.get("route"), "endpoint": scope.get("endpoint")}
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    if effective is not None:
+        saved["effective_route_context"] = effective
+    return saved
+
+
+def _wants_fresh(scope) -> bool:
+    for name, value in scope.get("headers") or ():
+        if name == b"cache-control" and b"no-cache" in value.lower():
+            return True
+    return False
+
+
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI pur : sert les GET en cache et conserve les réponses 200
+    des endpoints listés dans SCANGRID_CACHE_ROUTES. Placé au plus près du
+    routeur (sous CORS, dont les en-têtes dépendent de l'Origin de la requête).
+    """
+
+    def __init__(self, app, response_cache: ResponseCache = cache):
+        self.app = app
+        self.cache = response_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "GET" or not self.cache.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope.get("raw_path") or scope["path"].encode(), scope.get("query_string", b""))
+        if not _wants_fresh(scope):
+            entry = self.cache.get(key)
+            if entry is not None:
+                await self._replay(scope, send, entry)
+                return
+
+        epoch = self.cache.epoch
+        tags: Set[str] = set()
+        token = _current_tags.set(tags)
+        state = {"route": None, "start": None, "chunks": [], "cachable": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                route = _endpoint_name(scope)
+                if route in self.cache.routes:
+                    metrics.RESPONSE_CACHE_REQUESTS.inc(route=route, result="miss")
+                    state["route"] = route
+                    # Copie : les middlewares externes (CORS, en-têtes SQL) modifient le message
+                    state["start"] = {**message, "headers": list(message.get("headers") or ())}
+                    state["cachable"] = message["status"] == 200 and not any(
+                        name == b"set-cookie" for name, _ in message.get("headers") or ())
+            elif message["type"] == "http.response.body" and state["cachable"]:
+                state["chunks"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_tags.reset(token)
+
+        if not state["cachable"] or self.cache.epoch != epoch:
+            return
+        route = state["route"]
+        self.cache.put(key, _Entry(
+            route=route,
+            start=state["start"],
+            body=b"".join(state["chunks"]),
+            tags=frozenset(tags),
+            expires=time.monotonic() + self.cache.routes[route],
+            route_scope=_route_scope(scope),
+        ))
+
+    async def _replay(self, scope, send, entry: _Entry) -> None:
+        metrics.RESPONSE_CACHE_REQUESTS.inc(route=entry.route, result="hit")
+        saved = entry.route_scope
+        scope["route"] = saved["route"]
+        scope["endpoint"] = saved["endpoint"]
+        if "effective_route_context" in saved:
+            scope.setdefault("fastapi", {})["effective_route_context"] = saved["effective_route_context"]
+        await send({**entry.start, "headers": list(entry.start["headers"])})
+        await send({"type": "http.response.body", "body": entry.body})
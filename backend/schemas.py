@@ -1,9 +1,11 @@
 """
 Schémas Pydantic pour validation des requêtes et réponses
 """
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional, Dict, Any
 
+import short_ids
+
 
 # ============= SCHEMAS POUR CONTENT =============
 
@@ -56,7 +58,9 @@ class BinBase(BaseModel):
 
 class BinCreate(BinBase):
     """Schéma pour créer une boîte (sans ID)"""
-    pass
+
+    # Anciens UUID (migrate_short_ids.py) → ids courts
+    _resolve_ids = field_validator("category_id")(short_ids.resolve)
 
 
 class BinUpdate(BaseModel):
@@ -75,6 +79,9 @@ class BinUpdate(BaseModel):
     
     model_config = ConfigDict(extra="forbid")
 
+    # Anciens UUID (migrate_short_ids.py) → ids courts
+    _resolve_ids = field_validator("category_id", "layer_id")(short_ids.resolve)
+
 
 class BinResponse(BinBase):
     """Schéma de réponse pour une boîte"""
@@ -0,0 +1,272 @@
+"""
+Index sémantique optionnel de l'inventaire (embeddings Ollama + NumPy).
+
+Les scores par mots-clés et difflib de /locate et /bom/search ne relient pas
+« pile bouton » à une boîte intitulée « CR2032 ». Avec SCANGRID_SEMANTIC=1,
+chaque boîte reçoit un embedding de son titre, sa description et ses
+articles, calculé par l'API /api/embed d'Ollama (ollama_client.py) :
+
+  - les vecteurs sont stockés dans la table bin_embeddings avec le hash du
+    texte et le modèle : seules les boîtes dont le texte a changé sont
+    recalculées (au démarrage, puis à la première requête après une écriture) ;
+  - en mémoire, une matrice NumPy float32 normalisée (une ligne par boîte)
+    par instantané d'inventaire : une requête = un embedding + un produit
+    matrice-vecteur + argpartition pour le top-k ;
+  - les embeddings des requêtes récentes sont gardés en cache (LRU).
+
+mode=semantic classe par similarité cosinus seule ; mode=hybrid ajoute
+SCANGRID_SEMANTIC_WEIGHT × 100 × similarité au score par mots-clés.
+
+Configuration (variables d'environnement) :
+  - SCANGRID_SEMANTIC            : 1 = index actif (défaut 0)
+  - SCANGRID_EMBED_MODEL         : modèle d'embedding (défaut nomic-embed-text)
+  - SCANGRID_SEMANTIC_MIN_SCORE  : similarité minimale d'un résultat (défaut 0.45)
+  - SCANGRID_SEMANTIC_WEIGHT     : poids de la similarité en mode hybrid (défaut 1.0)
+  - SCANGRID_SEMANTIC_BATCH      : textes par appel /api/embed (défaut 64)
+
+NumPy est optionnel : sans lui (ou sans SCANGRID_SEMANTIC=1) le mode
+semantic répond 503 et hybrid retombe sur les mots-clés. NumPy, httpx et
+ollama_client ne sont importés qu'au premier calcul : l'index désactivé ne
+coûte rien au démarrage.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# NumPy (~70 ms d'import) n'est chargé qu'au premier calcul
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+from database import write_coordinator
+from inventory_snapshot import BinRecord, InventorySnapshot
+from models import BinEmbedding
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SCANGRID_SEMANTIC", "0").lower() in ("1", "true", "yes", "on")
+MODEL = os.getenv("SCANGRID_EMBED_MODEL", "nomic-embed-text")
+MIN_SCORE = float(os.getenv("SCANGRID_SEMANTIC_MIN_SCORE", "0.45"))
+WEIGHT = float(os.getenv("SCANGRID_SEMANTIC_WEIGHT", "1.0"))
+BATCH = int(os.getenv("SCANGRID_SEMANTIC_BATCH", "64"))
+QUERY_CACHE_SIZE = 256
+
+
+class SemanticUnavailable(RuntimeError):
+    """Index désactivé, NumPy absent ou Ollama injoignable"""
+
+
+def bin_text(bin_rec: BinRecord) -> str:
+    """Texte embarqué pour une boîte : titre, description, articles"""
+    content = bin_rec.content
+    parts = [str(content.get("title") or ""), str(content.get("description") or ""), *bin_rec.items]
+    return ". ".join(p.strip() for p in parts if p and p.strip())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class _Matrix:
+    """Vecteurs normalisés des boîtes d'un instantané"""
+
+    __slots__ = ("snapshot", "bin_ids", "vectors")
+
+    def __init__(self, snapshot: InventorySnapshot, bin_ids: List[str], vectors):
+        self.snapshot = snapshot
+        self.bin_ids = bin_ids
+        self.vectors = vectors
+
+
+class Similarities:
+    """Similarités cosinus d'une requête avec chaque boîte d'un instantané"""
+
+    __slots__ = ("bin_ids", "scores", "_above")
+
+    def __init__(self, bin_ids: List[str], scores: "np.ndarray"):
+        self.bin_ids = bin_ids
+        self.scores = scores
+        self._above: Optional[Dict[str, float]] = None
+
+    def get(self, bin_id: str, default: Optional[float] = None) -> Optional[float]:
+        """Similarité d'une boîte si elle atteint MIN_SCORE"""
+        if self._above is None:
+            import numpy as np
+
+            keep = np.flatnonzero(self.scores >= MIN_SCORE)
+            self._above = {self.bin_ids[i]: float(self.scores[i]) for i in keep}
+        return self._above.get(bin_id, default)
+
+    def top_k(self, k: int) -> List[Tuple[str, float]]:
+        """k boîtes les plus proches (similarité décroissante, ≥ MIN_SCORE)"""
+        import numpy as np
+
+        scores = self.scores
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.bin_ids[i], float(scores[i])) for i in top if scores[i] >= MIN_SCORE]
+
+
+class SemanticIndex:
+    def __init__(self, model: str = MODEL, batch: int = BATCH):
+        self.model = model
+        self.batch = batch
+        # bin_id → (hash du texte, vecteur normalisé) : évite de relire la table
+        self._vectors: Dict[str, Tuple[str, "np.ndarray"]] = {}
+        self._loaded = False
+        self._matrix: Optional[_Matrix] = None
+        self._queries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self.embedded = 0
+        self.last_sync_ms: Optional[float] = None
+
+    def clear(self) -> None:
+        self._vectors.clear()
+        self._loaded = False
+        self._matrix = None
+        self._queries.clear()
+
+    @staticmethod
+    def _check() -> None:
+        if not ENABLED:
+            raise SemanticUnavailable("Recherche sémantique désactivée (SCANGRID_SEMANTIC=1)")
+        if not NUMPY_AVAILABLE:
+            raise SemanticUnavailable("Recherche sémantique indisponible : installer numpy (pip install numpy)")
+
+    async def _embed(self, texts: List[str]) -> "np.ndarray":
+        import httpx
+        import numpy as np
+        import ollama_client
+
+        client = ollama_client.client
+        if not await client.reachable():
+            raise SemanticUnavailable(f"Ollama introuvable sur {client.base_url}")
+        rows = []
+        try:
+            for start in range(0, len(texts), self.batch):
+                rows.extend(await client.embed(texts[start:start + self.batch], self.model))
+        except (httpx.HTTPError, KeyError) as e:
+            # Modèle absent (ollama pull), Ollama arrêté entre-temps…
+            raise SemanticUnavailable(f"Embeddings Ollama indisponibles ({self.model}) : {e}") from e
+        vectors = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    async def _load(self, db: AsyncSession) -> None:
+        import numpy as np
+
+        result = await db.execute(
+            select(BinEmbedding.bin_id, BinEmbedding.text_hash, BinEmbedding.vector)
+            .where(BinEmbedding.model == self.model)
+        )
+        for bin_id, digest, blob in result:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            self._vectors[bin_id] = (digest, vector / norm if norm else vector)
+        self._loaded = True
+
+    async def sync(self, db: AsyncSession, snapshot: InventorySnapshot) -> _Matrix:
+        """Matrice de l'instantané ; embarque et enregistre les boîtes nouvelles ou modifiées"""
+        self._check()
+        import numpy as np
+
+        matrix = self._matrix
+        if matrix is not None and matrix.snapshot is snapshot:
+            return matrix
+        async with self._lock:
+            if self._matrix is not None and self._matrix.snapshot is snapshot:
+                return self._matrix
+            t0 = time.perf_counter()
+            if not self._loaded:
+                await self._load(db)
+
+            texts: Dict[str, Tuple[str, str]] = {}
+            for bin_rec in snapshot.bins.values():
+                text = bin_text(bin_rec)
+                if text and not bin_rec.is_hole:
+                    texts[bin_rec.id] = (text, text_hash(text))
+            stale = [bin_id for bin_id, (_, digest) in texts.items()
+                     if self._vectors.get(bin_id, (None,))[0] != digest]
+
+            if stale:
+                vectors = await self._embed([texts[bin_id][0] for bin_id in stale])
+                rows = [
+                    {"bin_id": bin_id, "model": self.model, "text_hash": texts[bin_id][1],
+                     "dim": int(vector.shape[0]), "vector": vector.tobytes()}
+                    for bin_id, vector in zip(stale, vectors)
+                ]
+                stmt = sqlite_insert(BinEmbedding)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[BinEmbedding.bin_id],
+                    set_={c: stmt.excluded[c] for c in ("model", "text_hash", "dim", "vector")},
+                )
+                # Table dérivée : verrou d'écriture, sans signaler d'écriture d'inventaire
+                async with write_coordinator.write_lock():
+                    await db.execute(stmt, rows)
+                    await db.commit()
+                for row, vector in zip(rows, vectors):
+                    self._vectors[row["bin_id"]] = (row["text_hash"], vector)
+                self.embedded += len(stale)
+                logger.info("🧭 %s boîte(s) embarquée(s) (%s)", len(stale), self.model)
+
+            bin_ids = [bin_id for bin_id in texts if bin_id in self._vectors]
+            if bin_ids:
+                vectors = np.stack([self._vectors[bin_id][1] for bin_id in bin_ids])
+            else:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+            self._matrix = _Matrix(snapshot, bin_ids, vectors)
+            self.last_sync_ms = (time.perf_counter() - t0) * 1000
+            return self._matrix
+
+    async def _query_vector(self, query: str) -> "np.ndarray":
+        key = query.strip().lower()
+        vector = self._queries.get(key)
+        if vector is None:
+            vector = (await self._embed([key]))[0]
+            self._queries[key] = vector
+            if len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        else:
+            self._queries.move_to_end(key)
+        return vector
+
+    async def similarities(self, db: AsyncSession, snapshot: InventorySnapshot,
+                           query: str) -> Similarities:
+        """Similarités de la requête : un produit matrice-vecteur sur l'instantané"""
+        matrix = await self.sync(db, snapshot)
+        if not matrix.bin_ids:
+            import numpy as np
+
+            return Similarities([], np.zeros(0, dtype=np.float32))
+        return Similarities(matrix.bin_ids, matrix.vectors @ await self._query_vector(query))
+
+    def report(self) -> dict:
+        matrix = self._matrix
+        return {
+            "enabled": ENABLED,
+            "numpy": NUMPY_AVAILABLE,
+            "model": self.model,
+            "indexed": len(matrix.bin_ids) if matrix else 0,
+            "dim": int(matrix.vectors.shape[1]) if matrix is not None and matrix.vectors.size else None,
+            "embedded": self.embedded,
+            "cached_queries": len(self._queries),
+            "last_sync_ms": round(self.last_sync_ms, 1) if self.last_sync_ms is not None else None,
+            "min_score": MIN_SCORE,
+            "weight": WEIGHT,
+        }
+
+
+index = SemanticIndex()
@@ -0,0 +1,102 @@
+"""
+Identifiants courts (opt-in) et compatibilité des anciens UUID.
+
+Les clés primaires sont des UUID texte de 36 caractères, répétés dans chaque
+clé étrangère (layers.drawer_id, bins.layer_id, project_bins.bin_id...), dans
+chaque index et dans chaque réponse JSON. Avec SCANGRID_SHORT_IDS=1, les
+nouvelles lignes reçoivent un id base62 de 10 caractères (≈ 59 bits
+aléatoires : pas de compteur partagé entre workers, collisions négligeables) ;
+migrate_short_ids.py convertit les lignes existantes et garde la table
+id_aliases (ancien UUID → id court).
+
+IdAliasMiddleware réécrit les anciens UUID présents dans le chemin et la query
+string (raccourcis Siri, QR codes imprimés, favoris) vers le nouvel id avant
+le routage : tous les endpoints restent accessibles par l'ancien id. Les ids
+des corps de requête (layer_id, category_id, bin_id) passent par resolve()
+dans les schémas d'entrée (schemas.py, features/projects.py).
+"""
+import logging
+import os
+import re
+import secrets
+import string
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SCANGRID_SHORT_IDS", "0") == "1"
+
+ALPHABET = string.digits + string.ascii_letters
+LENGTH = 10
+_SPACE = len(ALPHABET) ** LENGTH
+
+_UUID = re.compile(rb"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+# Ancien UUID → id court (chargé au démarrage depuis id_aliases)
+aliases: Dict[str, str] = {}
+
+
+def short_id() -> str:
+    value = secrets.randbelow(_SPACE)
+    chars = []
+    for _ in range(LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(chars)
+
+
+def new_id() -> str:
+    """Id d'une nouvelle ligne (défaut des clés primaires de models.py)"""
+    return short_id() if ENABLED else str(uuid.uuid4())
+
+
+def is_legacy(value: str) -> bool:
+    return len(value) == 36 and _UUID.fullmatch(value.encode()) is not None
+
+
+async def load_aliases(conn: AsyncConnection) -> int:
+    # Import local : models.py importe new_id depuis ce module
+    from models import IdAlias
+
+    result = await conn.execute(select(IdAlias.old_id, IdAlias.new_id))
+    aliases.clear()
+    aliases.update((old, new) for old, new in result)
+    if aliases:
+        logger.info("🔑 %s ancien(s) UUID redirigé(s) vers les ids courts", len(aliases))
+    return len(aliases)
+
+
+def resolve(value: Optional[str]) -> Optional[str]:
+    """Id courant d'un id reçu dans un corps de requête (ancien UUID → id court)"""
+    return aliases.get(value, value) if value else value
+
+
+def _rewrite(data: bytes) -> bytes:
+    def replace(match: re.Match) -> bytes:
+        new = aliases.get(match.group(0).decode())
+        return new.encode() if new is not None else match.group(0)
+
+    return _UUID.sub(replace, data)
+
+
+class IdAliasMiddleware:
+    """Middleware ASGI : anciens UUID du chemin / de la query string → ids courts"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and aliases:
+            raw_path = scope.get("raw_path") or scope["path"].encode()
+            query = scope.get("query_string", b"")
+            if _UUID.search(raw_path) or _UUID.search(query):
+                # Réécrit en place : les middlewares extérieurs (métriques) lisent
+                # scope["route"] / scope["endpoint"] posés par le routeur sur ce dict
+                scope["raw_path"] = _rewrite(raw_path)
+                scope["path"] = _rewrite(scope["path"].encode()).decode()
+                scope["query_string"] = _rewrite(query)
+        await self.app(scope, receive, send)
@@ -0,0 +1,151 @@
+"""
+Rapport de démarrage : temps d'import par module, init_db, chargement des
+fonctionnalités et délai jusqu'à la première requête servie.
+
+Le chronométrage des imports est un crochet sys.meta_path installé en tête de
+main.py (équivalent léger de `python -X importtime`) puis retiré une fois
+l'application construite.
+"""
+import importlib.abc
+import logging
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_MODULE_T0 = time.perf_counter()
+_MODULE_WALL_T0 = time.time()
+
+
+def _process_start_wall() -> float:
+    """Heure de lancement du processus (Linux : /proc), sinon import de ce module"""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        start_ticks = int(fields[19])  # champ 22 "starttime" (après pid et comm)
+        with open("/proc/stat", "rb") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith(b"btime"))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return _MODULE_WALL_T0
+
+
+PROCESS_START = _process_start_wall()
+
+_import_times: Dict[str, float] = {}
+_phases: Dict[str, float] = {}
+_features: Dict[str, float] = {}
+_first_request_at: Optional[float] = None
+_import_timer: Optional["_ImportTimer"] = None
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            # Temps cumulé (inclut les sous-imports), agrégé par paquet racine
+            if "." not in self._name:
+                _import_times[self._name] = _import_times.get(self._name, 0.0) + time.perf_counter() - start
+
+    def __getattr__(self, item):
+        return getattr(self._loader, item)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if "." in fullname:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, fullname)
+                return spec
+        return None
+
+
+def start_import_timer() -> None:
+    global _import_timer
+    if _import_timer is None:
+        _import_timer = _ImportTimer()
+        sys.meta_path.insert(0, _import_timer)
+
+
+def stop_import_timer() -> None:
+    global _import_timer
+    if _import_timer is not None:
+        try:
+            sys.meta_path.remove(_import_timer)
+        except ValueError:
+            pass
+        _import_timer = None
+        record_phase("app_import", time.perf_counter() - _MODULE_T0)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    _phases[name] = seconds
+
+
+def record_feature(name: str, seconds: float) -> None:
+    _features[name] = seconds
+
+
+def mark_first_request() -> bool:
+    """Note l'heure de la première requête servie. True si c'était la première."""
+    global _first_request_at
+    if _first_request_at is not None:
+        return False
+    _first_request_at = time.time()
+    logger.info("⏱️ Démarrage : %s", _summary_line())
+    return True
+
+
+def _summary_line() -> str:
+    parts = [f"{name} {secs * 1000:.0f} ms" for name, secs in _phases.items()]
+    if _first_request_at is not None:
+        parts.append(f"1re requête à +{(_first_request_at - PROCESS_START) * 1000:.0f} ms")
+    return ", ".join(parts)
+
+
+def report(top: int = 15) -> dict:
+    imports = sorted(_import_times.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "process_start": PROCESS_START,
+        "phases_ms": {k: round(v * 1000, 1) for k, v in _phases.items()},
+        "imports_ms": {k: round(v * 1000, 1) for k, v in imports},
+        "features_ms": {k: round(v * 1000, 1) for k, v in _features.items()},
+        "time_to_first_request_ms": (
+            round((_first_request_at - PROCESS_START) * 1000, 1) if _first_request_at else None
+        ),
+    }
+
+
+class FirstRequestMiddleware:
+    """Middleware ASGI : mesure le délai processus → première réponse HTTP"""
+
+    def __init__(self, app):
+        self.app = app
+        self._done = False
+
+    async def __call__(self, scope, receive, send):
+        if self._done or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._done = True
+            mark_first_request()
@@ -0,0 +1,225 @@
+"""
+Statistiques de remplissage de l'inventaire, calculées en NumPy.
+
+La géométrie des boîtes (x_grid, y_grid, width_units, depth_units,
+height_units, z_offset, indices de tiroir / couche / catégorie) est rangée en
+colonnes NumPy, reconstruites une seule fois par instantané d'inventaire
+(inventory_snapshot.py). L'occupation de chaque couche est obtenue par un
+tableau de différences 2D (4 np.add.at + 2 cumsum) : aucun parcours Python
+par boîte ou par case de la grille.
+
+Métriques :
+  - remplissage surface (cases occupées / cases du tiroir) par couche et tiroir ;
+  - remplissage volume (w × d × h / largeur × profondeur × nb couches) par tiroir ;
+  - répartition par catégorie ; boîtes non placées (x_grid == -1) ;
+  - fragmentation de l'espace libre : arêtes libre/occupé (ou bord) rapportées
+    au périmètre total des cases libres (0 = un seul bloc compact, 1 = cases isolées) ;
+  - cases en chevauchement (plusieurs boîtes sur la même case).
+"""
+import time
+from typing import Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from inventory_snapshot import InventorySnapshot
+
+
+class GeometryColumns:
+    """Colonnes NumPy d'un instantané (une ligne par boîte, hors trous)"""
+
+    __slots__ = (
+        "snapshot", "drawer_ids", "drawer_names", "drawer_width", "drawer_depth",
+        "layer_ids", "layer_drawer", "layer_z", "category_ids",
+        "x", "y", "w", "d", "h", "z_offset", "layer", "drawer", "category", "holes",
+    )
+
+    def __init__(self, snap: InventorySnapshot):
+        self.snapshot = snap
+        drawers = list(snap.drawers.values())
+        layers = list(snap.layers.values())
+        categories = list(snap.categories.values())
+        drawer_index = {d.id: i for i, d in enumerate(drawers)}
+        layer_index = {l.id: i for i, l in enumerate(layers)}
+        category_index = {c.id: i for i, c in enumerate(categories)}
+
+        self.drawer_ids = [d.id for d in drawers]
+        self.drawer_names = [d.name for d in drawers]
+        self.drawer_width = np.fromiter((d.width_units for d in drawers), np.int32, len(drawers))
+        self.drawer_depth = np.fromiter((d.depth_units for d in drawers), np.int32, len(drawers))
+        self.layer_ids = [l.id for l in layers]
+        self.layer_drawer = np.fromiter((drawer_index[l.drawer_id] for l in layers), np.int32, len(layers))
+        self.layer_z = np.fromiter((l.z_index for l in layers), np.int32, len(layers))
+        # Dernière case = « sans catégorie »
+        self.category_ids = [c.id for c in categories] + [None]
+
+        bins = [b for b in snap.bins.values() if not b.is_hole and b.layer_id in layer_index]
+        self.holes = len(snap.bins) - len(bins)
+        n = len(bins)
+        self.x = np.fromiter((b.x_grid for b in bins), np.int32, n)
+        self.y = np.fromiter((b.y_grid for b in bins), np.int32, n)
+        self.w = np.fromiter((b.width_units for b in bins), np.int32, n)
+        self.d = np.fromiter((b.depth_units for b in bins), np.int32, n)
+        self.h = np.fromiter((b.height_units for b in bins), np.float64, n)
+        self.z_offset = np.fromiter((b.z_offset for b in bins), np.float64, n)
+        self.layer = np.fromiter((layer_index[b.layer_id] for b in bins), np.int32, n)
+        self.drawer = self.layer_drawer[self.layer] if n else np.zeros(0, np.int32)
+        self.category = np.fromiter(
+            (category_index.get(b.category_id, len(categories)) for b in bins), np.int32, n)
+
+
+_cache: Optional[GeometryColumns] = None
+
+
+def columns_for(snap: InventorySnapshot) -> GeometryColumns:
+    """Colonnes de l'instantané courant (reconstruites quand l'instantané change)"""
+    global _cache
+    cached = _cache
+    if cached is None or cached.snapshot is not snap:
+        cached = _cache = GeometryColumns(snap)
+    return cached
+
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.zeros(len(num), np.float64), where=den > 0)
+
+
+def compute_stats(cols: GeometryColumns) -> dict:
+    start = time.perf_counter()
+    n_drawers, n_layers, n_categories = len(cols.drawer_ids), len(cols.layer_ids), len(cols.category_ids)
+
+    placed = (cols.x >= 0) & (cols.y >= 0)
+    unplaced = ~placed
+    area = (cols.w * cols.d).astype(np.float64)
+    volume = area * cols.h
+
+    # ---- Occupation des couches : tableau de différences 2D par couche ----
+    layer_width = cols.drawer_width[cols.layer_drawer]
+    layer_depth = cols.drawer_depth[cols.layer_drawer]
+    max_w = int(layer_width.max()) if n_layers else 0
+    max_d = int(layer_depth.max()) if n_layers else 0
+    diff = np.zeros((n_layers, max_d + 1, max_w + 1), np.int32)
+    lp = cols.layer[placed]
+    bw, bd = layer_width[lp], layer_depth[lp]
+    x0 = np.clip(cols.x[placed], 0, bw)
+    y0 = np.clip(cols.y[placed], 0, bd)
+    x1 = np.clip(cols.x[placed] + cols.w[placed], 0, bw)
+    y1 = np.clip(cols.y[placed] + cols.d[placed], 0, bd)
+    np.add.at(diff, (lp, y0, x0), 1)
+    np.add.at(diff, (lp, y0, x1), -1)
+    np.add.at(diff, (lp, y1, x0), -1)
+    np.add.at(diff, (lp, y1, x1), 1)
+    coverage = diff.cumsum(axis=1).cumsum(axis=2)[:, :max_d, :max_w]
+
+    in_bounds = (
+        (np.arange(max_d)[None, :, None] < layer_depth[:, None, None])
+        & (np.arange(max_w)[None, None, :] < layer_width[:, None, None])
+    )
+    occupied = (coverage > 0) & in_bounds
+    free = in_bounds & ~occupied
+    capacity = (layer_width * layer_depth).astype(np.int64)
+    occupied_cells = occupied.sum(axis=(1, 2))
+    overlap_cells = ((coverage > 1) & in_bounds).sum(axis=(1, 2))
+    free_cells = free.sum(axis=(1, 2))
+
+    # Fragmentation : arêtes des cases libres qui touchent une case occupée ou le bord
+    padded = np.pad(free, ((0, 0), (1, 1), (1, 1)), constant_values=False)
+    core = padded[:, 1:-1, 1:-1]
+    boundary = (
+        (core & ~padded[:, :-2, 1:-1]).sum(axis=(1, 2))
+        + (core & ~padded[:, 2:, 1:-1]).sum(axis=(1, 2))
+        + (core & ~padded[:, 1:-1, :-2]).sum(axis=(1, 2))
+        + (core & ~padded[:, 1:-1, 2:]).sum(axis=(1, 2))
+    )
+    fragmentation = _ratio(boundary.astype(np.float64), 4.0 * free_cells)
+
+    layer_bins = np.bincount(cols.layer, minlength=n_layers)
+    layer_unplaced = np.bincount(cols.layer[unplaced], minlength=n_layers)
+    layer_fill = _ratio(occupied_cells.astype(np.float64), capacity)
+
+    # ---- Agrégats par tiroir ----
+    drawer_layers = np.bincount(cols.layer_drawer, minlength=n_drawers)
+    drawer_bins = np.bincount(cols.drawer, minlength=n_drawers)
+    drawer_unplaced = np.bincount(cols.drawer[unplaced], minlength=n_drawers)
+    drawer_occupied = np.bincount(cols.layer_drawer, weights=occupied_cells, minlength=n_drawers)
+    drawer_capacity = np.bincount(cols.layer_drawer, weights=capacity, minlength=n_drawers)
+    drawer_volume = np.bincount(cols.drawer[placed], weights=volume[placed], minlength=n_drawers)
+    drawer_volume_capacity = (cols.drawer_width * cols.drawer_depth * drawer_layers).astype(np.float64)
+    top = cols.layer_z[cols.layer] + cols.z_offset + cols.h
+    drawer_height = np.zeros(n_drawers, np.float64)
+    if placed.any():
+        np.maximum.at(drawer_height, cols.drawer[placed], top[placed])
+
+    # ---- Agrégats par catégorie ----
+    category_bins = np.bincount(cols.category, minlength=n_categories)
+    category_area = np.bincount(cols.category[placed], weights=area[placed], minlength=n_categories)
+    category_volume = np.bincount(cols.category[placed], weights=volume[placed], minlength=n_categories)
+    total_area = float(area[placed].sum())
+
+    snap = cols.snapshot
+    category_names = [snap.category_name(c) for c in cols.category_ids]
+    return {
+        "generation": snap.generation,
+        "totals": {
+            "drawers": n_drawers,
+            "layers": n_layers,
+            "bins": int(len(cols.x)),
+            "placed": int(placed.sum()),
+            "unplaced": int(unplaced.sum()),
+            "holes": cols.holes,
+            "occupied_cells": int(occupied_cells.sum()),
+            "capacity_cells": int(capacity.sum()),
+            "area_fill": round(float(occupied_cells.sum() / capacity.sum()) if capacity.sum() else 0.0, 4),
+            "volume_units": round(float(volume[placed].sum()), 2),
+        },
+        "drawers": [
+            {
+                "drawer_id": cols.drawer_ids[i],
+                "name": cols.drawer_names[i],
+                "width_units": int(cols.drawer_width[i]),
+                "depth_units": int(cols.drawer_depth[i]),
+                "layers": int(drawer_layers[i]),
+                "bins": int(drawer_bins[i]),
+                "unplaced": int(drawer_unplaced[i]),
+                "occupied_cells": int(drawer_occupied[i]),
+                "capacity_cells": int(drawer_capacity[i]),
+                "area_fill": round(float(drawer_occupied[i] / drawer_capacity[i]) if drawer_capacity[i] else 0.0, 4),
+                "volume_fill": round(float(drawer_volume[i] / drawer_volume_capacity[i]) if drawer_volume_capacity[i] else 0.0, 4),
+                "height_used_units": round(float(drawer_height[i]), 2),
+            }
+            for i in range(n_drawers)
+        ],
+        "layers": [
+            {
+                "layer_id": cols.layer_ids[i],
+                "drawer_id": cols.drawer_ids[cols.layer_drawer[i]],
+                "z_index": int(cols.layer_z[i]),
+                "bins": int(layer_bins[i]),
+                "unplaced": int(layer_unplaced[i]),
+                "occupied_cells": int(occupied_cells[i]),
+                "free_cells": int(free_cells[i]),
+                "overlap_cells": int(overlap_cells[i]),
+                "capacity_cells": int(capacity[i]),
+                "area_fill": round(float(layer_fill[i]), 4),
+                "fragmentation": round(float(fragmentation[i]), 4),
+            }
+            for i in range(n_layers)
+        ],
+        "categories": [
+            {
+                "category_id": cols.category_ids[i],
+                "name": category_names[i],
+                "bins": int(category_bins[i]),
+                "area_units": round(float(category_area[i]), 2),
+                "volume_units": round(float(category_volume[i]), 2),
+                "area_share": round(float(category_area[i] / total_area) if total_area else 0.0, 4),
+            }
+            for i in range(n_categories)
+            if category_bins[i] or cols.category_ids[i] is not None
+        ],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
@@ -0,0 +1,72 @@
+"""
+Tests de la sauvegarde à chaud (copie par pas, gzip, rotation, téléchargement)
+"""
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+import backup
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "source.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE bins (id INTEGER PRIMARY KEY, content TEXT)")
+    conn.executemany("INSERT INTO bins (content) VALUES (?)", [("x" * 500,) for _ in range(2000)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM bins").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def test_backup_to_dir_copies_in_steps_and_rotates(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_PAGES", 16)
+    target = str(tmp_path / "backups")
+
+    reports = [await backup.backup_to_dir(target, keep=2, source=source) for _ in range(3)]
+
+    assert reports[0]["pages"] > 16
+    assert reports[0]["steps"] > 1
+    assert len(reports[2]["removed"]) == 1
+    assert sorted(os.listdir(target)) == sorted(os.path.basename(r["path"]) for r in reports[1:])
+    assert count_rows(reports[2]["path"]) == 2000
+
+
+async def test_gzip_backup_is_a_valid_database(source, tmp_path):
+    report = await backup.backup_to_dir(str(tmp_path / "gz"), compress=True, source=source)
+    assert report["path"].endswith(".db.gz")
+    restored = tmp_path / "restored.db"
+    restored.write_bytes(gzip.decompress(open(report["path"], "rb").read()))
+    assert count_rows(str(restored)) == 2000
+
+
+async def test_download_endpoint_streams_snapshot(client, source, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "DB_PATH", source)
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "tmp"))
+
+    response = await client.get("/api/backup", params={"gzip": "true"})
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Backup-Pages"]) > 0
+    restored = tmp_path / "downloaded.db"
+    restored.write_bytes(gzip.decompress(response.content))
+    assert count_rows(str(restored)) == 2000
+    # Le fichier temporaire ne survit pas à la diffusion
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+async def test_missing_database_is_reported(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "DB_PATH", str(tmp_path / "absente.db"))
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "backups"))
+    assert (await client.post("/api/backup")).status_code == 404
+    assert not os.path.exists(tmp_path / "absente.db")
@@ -0,0 +1,68 @@
+"""
+Tests de la table bin_items (synchronisation, backfill, recherche indexée)
+"""
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import bin_items
+from conftest import create_drawer
+from database import Base
+from models import Bin, BinItem, Drawer, Layer
+
+
+def test_parse_qty():
+    assert bin_items.parse_qty("10x vis M3") == 10
+    assert bin_items.parse_qty("vis M3 x25") == 25
+    assert bin_items.parse_qty("entretoise 100 pcs") == 100
+    assert bin_items.parse_qty("10k 0603") is None
+
+
+async def search(client, q):
+    response = await client.get("/api/items/search", params={"q": q})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_items_follow_bin_writes(client):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+
+    hits = await search(client, "10K")
+    assert [(h["bin_id"], h["text"], h["x"]) for h in hits] == [(bin_id, "10k 0603", 1)]
+
+    await client.patch(f"/api/bins/{bin_id}", json={"content": {"title": "Vis", "items": ["20x Vis M3", "Écrou M3"]}})
+    assert await search(client, "10k") == []
+    hits = await search(client, "ecrou")
+    assert [(h["text"], h["position"]) for h in hits] == [("Écrou M3", 1)]
+    assert (await search(client, "20x"))[0]["qty"] == 20
+    # L'API renvoie toujours content.items
+    assert (await client.get(f"/api/bins/{bin_id}")).json()["content"]["items"] == ["20x Vis M3", "Écrou M3"]
+
+    await client.delete(f"/api/bins/{bin_id}")
+    assert await search(client, "vis") == []
+
+    other = await create_drawer(client, name="Autre")
+    assert len(await search(client, "10k")) == 1
+    await client.delete(f"/api/drawers/{other['drawer_id']}")
+    assert await search(client, "10k") == []
+
+
+async def test_backfill_from_existing_content():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Drawer), [{"id": "d", "name": "T", "width_units": 4, "depth_units": 4}])
+        await conn.execute(insert(Layer), [{"id": "l", "drawer_id": "d", "z_index": 0}])
+        await conn.execute(insert(Bin), [
+            {"id": f"b{i}", "layer_id": "l", "x_grid": i, "y_grid": 0, "width_units": 1, "depth_units": 1,
+             "content": {"title": "t", "items": ["a", "b"] if i else []}}
+            for i in range(3)
+        ])
+
+        assert await bin_items.backfill(conn) == 4
+        assert await bin_items.backfill(conn) == 0
+        assert await bin_items.backfill(conn, force=True) == 4
+        rows = (await conn.execute(select(BinItem.bin_id, BinItem.position).order_by(BinItem.bin_id, BinItem.position))).all()
+    await engine.dispose()
+    assert rows == [("b1", 0), ("b1", 1), ("b2", 0), ("b2", 1)]
@@ -0,0 +1,111 @@
+"""
+Tests de l'analyse de BOM par règles et de son articulation avec le LLM
+"""
+import json
+
+import httpx
+import pytest
+
+import bom_rules
+import ollama_client
+from bom_rules import ParsedLine, parse_line
+from ollama_client import OllamaClient
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("R1 10k 0603", ParsedLine("Résistance 10kΩ 0603", 1, "R1", "0603")),
+    ("C3 100nF 0402 x4", ParsedLine("Condensateur 100nF 0402", 4, "C3", "0402")),
+    ("U1 NE555 DIP8", ParsedLine("NE555 DIP-8", 1, "U1", "DIP-8")),
+    ("R5-R8 4k7 1% 0805", ParsedLine("Résistance 4.7kΩ 1% 0805", 4, "R5-R8", "0805")),
+    ("R1, R2, R3 2R2 1206", ParsedLine("Résistance 2.2Ω 1206", 3, "R1,R2,R3", "1206")),
+    ("2x Condensateur 10uF 16V", ParsedLine("Condensateur 10µF 16V", 2, "", "")),
+    ("C2 100NF x7r 0603 qty 10", ParsedLine("Condensateur 100nF X7R 0603", 10, "C2", "0603")),
+    ("Résistance 10k 0603 4 pcs", ParsedLine("Résistance 10kΩ 0603", 4, "", "0603")),
+    ("D1 1N4148 SOD123", ParsedLine("Diode 1N4148 SOD-123", 1, "D1", "SOD-123")),
+    ("Y1 16MHz", ParsedLine("Quartz 16MHz", 1, "Y1", "")),
+    ("L1 10uH", ParsedLine("Inductance 10µH", 1, "L1", "")),
+    ("R1 100", ParsedLine("Résistance 100Ω", 1, "R1", "")),
+])
+def test_regular_lines_are_parsed(line, expected):
+    assert parse_line(line) == expected
+
+
+@pytest.mark.parametrize("line", [
+    "LED1, LED2 rouge",          # mot libre
+    "10k 0603",                  # résistance probable, rien ne le confirme
+    "C1 10k",                    # valeur incompatible avec le repère
+    "R1 C2 10k",                 # repères de types différents
+    "Arduino Nano clone",
+    "R1 10k 0603 x2 x3",         # deux quantités
+])
+def test_ambiguous_lines_are_left_to_the_llm(line):
+    assert parse_line(line) is None
+
+
+def test_classify_reports_paths():
+    lines = ["Designator Value Package Qty", "R1 10k 0603", "LED1 rouge", "Page 1/2"]
+    assert [path for _, path, _ in bom_rules.classify(lines)] == [
+        bom_rules.IGNORED, bom_rules.RULES, bom_rules.LLM, bom_rules.IGNORED,
+    ]
+
+
+def fake_ollama(response, prompts, up=True):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not up:
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == "/api/version":
+            return httpx.Response(200, json={"version": "0.5.0"})
+        prompts.append(json.loads(request.content)["prompt"])
+        return httpx.Response(200, json={"response": response})
+
+    return OllamaClient(base_url="http://ollama", model="tiny", transport=httpx.MockTransport(handler))
+
+
+async def test_only_ambiguous_lines_reach_the_llm(client, monkeypatch):
+    prompts = []
+    shared = fake_ollama('[{"designation": "LED rouge 0805", "qty": 2, "reference": "LED1,LED2"},'
+                         ' {"designation": "Résistance 10kΩ 0603", "qty": 1}]', prompts)
+    monkeypatch.setattr(ollama_client, "client", shared)
+    text = "Designator Value Package Qty\nR1 10k 0603\nLED1, LED2 rouge 0805\nC3 100nF 0402 x4"
+
+    data = (await client.post("/api/bom/ai-parse", json={"text": text})).json()
+
+    assert len(prompts) == 1
+    assert prompts[0].endswith("Texte à analyser :\nLED1, LED2 rouge 0805")
+    assert [line["path"] for line in data["lines"]] == ["ignored", "rules", "llm", "rules"]
+    assert data["stats"]["rules"] == 2 and data["stats"]["llm"] == 1
+    components = {c["designation"]: c["qty"] for c in data["components"]}
+    # Même désignation par les deux chemins : quantités additionnées
+    assert components == {"Résistance 10kΩ 0603": 2, "LED rouge 0805": 2, "Condensateur 100nF 0402": 4}
+    assert data["model"] == "tiny"
+    await shared.aclose()
+
+
+async def test_regular_bom_skips_the_llm(client, monkeypatch):
+    prompts = []
+    shared = fake_ollama("[]", prompts, up=False)
+    monkeypatch.setattr(ollama_client, "client", shared)
+
+    data = (await client.post("/api/bom/ai-parse", json={"text": "R1 10k 0603\nU1 NE555 DIP-8"})).json()
+
+    assert prompts == []
+    assert data["model"] == "tiny" and data["raw_response"] == ""
+    assert data["stats"]["llm"] == 0 and {line["path"] for line in data["lines"]} == {bom_rules.RULES}
+    assert [c["designation"] for c in data["components"]] == ["Résistance 10kΩ 0603", "NE555 DIP-8"]
+    await shared.aclose()
+
+
+async def test_partial_result_when_ollama_is_down(client, monkeypatch):
+    shared = fake_ollama("[]", [], up=False)
+    monkeypatch.setattr(ollama_client, "client", shared)
+
+    response = await client.post("/api/bom/ai-parse", json={"text": "R1 10k 0603\nLED1 rouge"})
+    assert response.status_code == 200
+    assert [line["path"] for line in response.json()["lines"]] == ["rules", "unresolved"]
+
+    # Rien d'exploitable sans le LLM : l'erreur est remontée
+    response = await client.post("/api/bom/ai-parse", json={"text": "LED1 rouge"})
+    assert response.status_code == 503
+    response = await client.post("/api/bom/ai-parse", json={"text": "R1 10k 0603", "rules": False})
+    assert response.status_code == 503
+    await shared.aclose()
@@ -0,0 +1,81 @@
+"""
+Tests du regroupement des PATCH de boîtes (SCANGRID_COALESCE_MS)
+"""
+import asyncio
+
+import pytest
+
+import coalescer
+import metrics
+from conftest import create_drawer
+from database import get_db
+from main import app
+
+
+@pytest.fixture
+def coalesce_window(monkeypatch):
+    monkeypatch.setattr(coalescer.bin_updates, "window", 0.05)
+
+
+async def test_patch_without_coalescing_commits_each_update(client):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    commits = metrics.BIN_UPDATE_COMMITS.value()
+
+    response = await client.patch(f"/api/bins/{bin_id}", json={"x_grid": 3, "y_grid": 2})
+    assert response.status_code == 200
+    assert (response.json()["x_grid"], response.json()["y_grid"]) == (3, 2)
+    assert metrics.BIN_UPDATE_COMMITS.value() == commits + 1
+
+
+async def test_burst_is_merged_into_one_commit(client, coalesce_window):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    commits = metrics.BIN_UPDATE_COMMITS.value()
+
+    responses = await asyncio.gather(*(
+        client.patch(f"/api/bins/{bin_id}", json={"x_grid": x}) for x in range(1, 6)
+    ), client.patch(f"/api/bins/{bin_id}", json={"color": "#ff0000"}))
+
+    assert all(r.status_code == 200 for r in responses)
+    # Toutes les requêtes voient l'état final : dernier x_grid + couleur
+    assert {(r.json()["x_grid"], r.json()["color"]) for r in responses} == {(5, "#ff0000")}
+    assert metrics.BIN_UPDATE_COMMITS.value() == commits + 1
+
+    stored = (await client.get(f"/api/bins/{bin_id}")).json()
+    assert (stored["x_grid"], stored["color"]) == (5, "#ff0000")
+
+
+async def test_invalid_update_fails_alone(client, coalesce_window):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+
+    ok, bad, missing = await asyncio.gather(
+        client.patch(f"/api/bins/{bin_id}", json={"y_grid": 4}),
+        client.patch(f"/api/bins/{bin_id}", json={"layer_id": "inconnue"}),
+        client.patch("/api/bins/inconnue", json={"y_grid": 1}),
+    )
+    assert ok.status_code == 200 and ok.json()["y_grid"] == 4
+    assert bad.status_code == 404
+    assert missing.status_code == 404
+
+
+async def test_cancelled_follower_does_not_fail_the_leader(client, coalesce_window):
+    drawer = await create_drawer(client, bins=[
+        {"x_grid": x, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": f"Boîte {x}"}} for x in range(2)
+    ])
+    first, second = (b["bin_id"] for b in drawer["layers"][0]["bins"])
+
+    async for db in app.dependency_overrides[get_db]():
+        leader = asyncio.create_task(coalescer.bin_updates.submit(db, first, {"y_grid": 3}))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.bin_updates.submit(db, second, {"y_grid": 4}))
+        await asyncio.sleep(0)
+        follower.cancel()
+
+        assert (await leader).y_grid == 3
+        assert follower.cancelled()
+
+    # Le lot a tout de même été validé, mise à jour du suiveur comprise
+    assert (await client.get(f"/api/bins/{second}")).json()["y_grid"] == 4
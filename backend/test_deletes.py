@@ -0,0 +1,159 @@
+"""
+Tests des suppressions ensemblistes (cascade SQL, références souples project_bins)
+"""
+import sqlite3
+
+from sqlalchemy import func, select, text
+
+import deletes
+import response_cache
+from conftest import create_drawer, sql_count
+from database import configure_sqlite, get_db
+from main import app
+from models import Bin, BinItem, Layer, ProjectBin
+
+
+def bins(n):
+    return [
+        {"x_grid": i % 10, "y_grid": i // 10, "width_units": 1, "depth_units": 1,
+         "content": {"title": f"Boîte {i}", "items": [f"article {i}"]}}
+        for i in range(n)
+    ]
+
+
+async def count_rows(model):
+    async for db in app.dependency_overrides[get_db]():
+        return await db.scalar(select(func.count()).select_from(model))
+
+
+def test_connections_enable_foreign_keys():
+    conn = sqlite3.connect(":memory:")
+    configure_sqlite(conn, None)
+    assert conn.execute("PRAGMA foreign_keys").fetchone() == (1,)
+    conn.close()
+
+
+async def test_drawer_delete_cost_does_not_depend_on_bin_count(client):
+    small = await create_drawer(client, "Petit", bins(1))
+    large = await create_drawer(client, "Grand", bins(100))
+
+    small_response = await client.delete(f"/api/drawers/{small['drawer_id']}")
+    large_response = await client.delete(f"/api/drawers/{large['drawer_id']}")
+
+    assert small_response.status_code == large_response.status_code == 200
+    assert sql_count(large_response) == sql_count(small_response)
+    for model in (Layer, Bin, BinItem):
+        assert await count_rows(model) == 0
+    assert (await client.delete(f"/api/drawers/{large['drawer_id']}")).status_code == 404
+
+
+async def test_category_delete_sets_bins_to_null(client):
+    category = (await client.post("/api/categories", json={"name": "Vis"})).json()
+    drawer = await create_drawer(client, bins=bins(20))
+    for b in drawer["layers"][0]["bins"]:
+        await client.patch(f"/api/bins/{b['bin_id']}", json={"category_id": category["id"]})
+
+    response = await client.delete(f"/api/categories/{category['id']}")
+
+    assert response.status_code == 200
+    # UPDATE des boîtes + DELETE de la catégorie
+    assert sql_count(response) == 2
+    drawer = (await client.get(f"/api/drawers/{drawer['drawer_id']}")).json()
+    assert all(b["category_id"] is None for b in drawer["layers"][0]["bins"])
+    assert (await client.delete(f"/api/categories/{category['id']}")).status_code == 404
+
+
+async def test_category_delete_without_foreign_key(client):
+    # Schéma de migrate_categories.py : category_id ajoutée par ALTER TABLE, sans clé étrangère
+    async for db in app.dependency_overrides[get_db]():
+        ddl = await db.scalar(text("SELECT sql FROM sqlite_master WHERE name = 'bins'"))
+        ddl = ddl.replace(", \n\tFOREIGN KEY(category_id) REFERENCES categories (id) ON DELETE SET NULL", "")
+        assert "categories" not in ddl
+        await db.execute(text("DROP TABLE bins"))
+        await db.execute(text(ddl))
+        await db.commit()
+    category = (await client.post("/api/categories", json={"name": "Vis"})).json()
+    drawer = await create_drawer(client, bins=bins(3))
+    for b in drawer["layers"][0]["bins"]:
+        await client.patch(f"/api/bins/{b['bin_id']}", json={"category_id": category["id"]})
+
+    assert (await client.delete(f"/api/categories/{category['id']}")).status_code == 200
+
+    drawer = (await client.get(f"/api/drawers/{drawer['drawer_id']}")).json()
+    assert [b["category_id"] for b in drawer["layers"][0]["bins"]] == [None] * 3
+
+
+async def test_unknown_category_is_rejected(client):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+
+    response = await client.patch(f"/api/bins/{bin_id}", json={"category_id": "absente"})
+
+    assert response.status_code == 404
+
+
+async def test_project_bins_are_kept_as_tombstones_by_default(client):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    project = (await client.post("/api/projects", json={"name": "Alim"})).json()
+    await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": bin_id, "qty": 3})
+
+    assert (await client.delete(f"/api/drawers/{drawer['drawer_id']}")).status_code == 200
+
+    entries = (await client.get(f"/api/projects/{project['id']}/bins")).json()
+    assert [(e["bin_id"], e["qty"], e["found"]) for e in entries] == [(bin_id, 3, False)]
+
+    async for db in app.dependency_overrides[get_db]():
+        assert await deletes.purge_orphan_project_bins(db) == 1
+        await db.commit()
+    assert (await client.get(f"/api/projects/{project['id']}/bins")).json() == []
+
+
+async def test_project_bins_follow_deleted_bins_with_delete_policy(client, monkeypatch):
+    monkeypatch.setattr(deletes, "PROJECT_BIN_POLICY", "delete")
+    drawer = await create_drawer(client, bins=bins(2))
+    first, second = (b["bin_id"] for b in drawer["layers"][0]["bins"])
+    project = (await client.post("/api/projects", json={"name": "Alim"})).json()
+    for bin_id in (first, second, "ailleurs"):
+        await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": bin_id})
+
+    assert (await client.delete(f"/api/bins/{first}")).status_code == 200
+    assert [e["bin_id"] for e in (await client.get(f"/api/projects/{project['id']}/bins")).json()] == [
+        second, "ailleurs",
+    ]
+
+    assert (await client.delete(f"/api/drawers/{drawer['drawer_id']}")).status_code == 200
+    assert [e["bin_id"] for e in (await client.get(f"/api/projects/{project['id']}/bins")).json()] == [
+        "ailleurs",
+    ]
+
+
+async def test_dropped_project_bins_invalidate_cached_projects(client, monkeypatch):
+    monkeypatch.setattr(deletes, "PROJECT_BIN_POLICY", "delete")
+    monkeypatch.setattr(response_cache.cache, "routes", {"list_projects": 60.0})
+    drawer = await create_drawer(client, bins=bins(2))
+    first, second = (b["bin_id"] for b in drawer["layers"][0]["bins"])
+    project = (await client.post("/api/projects", json={"name": "Alim"})).json()
+    for bin_id in (first, second):
+        await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": bin_id})
+
+    async def bin_count():
+        return (await client.get("/api/projects")).json()[0]["bin_count"]
+
+    assert await bin_count() == 2
+    await client.delete(f"/api/bins/{first}")
+    assert await bin_count() == 1
+    await client.delete(f"/api/drawers/{drawer['drawer_id']}")
+    assert await bin_count() == 0
+
+
+async def test_project_delete_cascades_to_associations(client):
+    project = (await client.post("/api/projects", json={"name": "Alim"})).json()
+    for i in range(3):
+        await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": f"b{i}"})
+
+    response = await client.delete(f"/api/projects/{project['id']}")
+
+    assert response.status_code == 200
+    assert await count_rows(ProjectBin) == 0
+    assert (await client.delete(f"/api/projects/{project['id']}")).status_code == 404
@@ -0,0 +1,57 @@
+"""
+Tests des filtres / facettes de /api/bom/search (bitsets de facet_index.py)
+"""
+import facet_index
+from conftest import create_drawer
+
+
+def test_ordinals_roundtrip():
+    positions = [0, 1, 7, 8, 63, 64, 200, 1025]
+    mask = sum(1 << p for p in positions)
+    assert list(facet_index.ordinals(mask)) == positions
+    assert list(facet_index.ordinals(0)) == []
+
+
+def _bin(x, title, color=None, is_hole=False):
+    return {"x_grid": x, "y_grid": 0, "width_units": 1, "depth_units": 1, "color": color,
+            "is_hole": is_hole, "content": {"title": title}}
+
+
+async def _inventory(client):
+    category = (await client.post("/api/categories", json={"name": "Passifs"})).json()
+    drawer_a = await create_drawer(client, "A", bins=[
+        _bin(0, "Résistance 10k", "#FF0000"), _bin(1, "Résistance 1k", "#00ff00"), _bin(2, "Trou", is_hole=True),
+    ])
+    drawer_b = await create_drawer(client, "B", bins=[_bin(0, "Résistance 4k7", "#ff0000")])
+    first_bin = drawer_a["layers"][0]["bins"][0]["bin_id"]
+    await client.patch(f"/api/bins/{first_bin}", json={"category_id": category["id"]})
+    return category, drawer_a, drawer_b
+
+
+async def test_filters_combine_before_scoring(client):
+    category, drawer_a, drawer_b = await _inventory(client)
+
+    def titles(response):
+        return sorted(r["title"] for r in response.json())
+
+    assert titles(await client.get("/api/bom/search", params={"q": "resistance"})) == [
+        "Résistance 10k", "Résistance 1k", "Résistance 4k7"]
+    # OU dans une facette, ET entre facettes
+    params = {"q": "resistance", "color": ["#ff0000", "#00FF00"], "drawer_id": drawer_a["drawer_id"]}
+    assert titles(await client.get("/api/bom/search", params=params)) == ["Résistance 10k", "Résistance 1k"]
+    params = {"category_id": "none", "color": "#FF0000"}
+    assert titles(await client.get("/api/bom/search", params=params)) == ["Résistance 4k7"]
+    assert titles(await client.get("/api/bom/search", params={"is_hole": "true"})) == ["Trou"]
+    assert (await client.get("/api/bom/search", params={"layer": 2})).json() == []
+
+
+async def test_facet_counts(client):
+    category, drawer_a, drawer_b = await _inventory(client)
+    data = (await client.get("/api/bom/search", params={"q": "resistance", "facets": "true"})).json()
+
+    assert data["total"] == 3 and len(data["results"]) == 3
+    assert data["facets"]["drawer"] == [
+        {"drawer_id": drawer_a["drawer_id"], "name": "A", "count": 2},
+        {"drawer_id": drawer_b["drawer_id"], "name": "B", "count": 1},
+    ]
+    assert {(f["name"], f["count"]) for f in data["facets"]["category"]} == {("Passifs", 1), (None, 2)}
@@ -0,0 +1,50 @@
+"""
+Tests du chargement à la demande des fonctionnalités (IA, PDF, projets)
+"""
+import importlib.util
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+import features
+
+
+async def test_projects_router_is_mounted_on_first_request(client):
+    response = await client.post("/api/projects", json={"name": "Horloge"})
+    assert response.status_code == 201
+    assert features.FEATURES["projects"].loaded
+
+    response = await client.get("/api/projects")
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json()] == ["Horloge"]
+
+
+async def test_disabled_feature_is_not_mounted(monkeypatch):
+    pdf = features.FEATURES["pdf"]
+    monkeypatch.setattr(features, "ENABLED", features.ENABLED - {"pdf"})
+    monkeypatch.setattr(pdf, "loaded", False)
+    # Application neuve : aucune route montée par un test précédent
+    fresh = FastAPI()
+    fresh.add_middleware(features.LazyFeatureMiddleware, fastapi_app=fresh)
+
+    async with AsyncClient(transport=ASGITransport(app=fresh), base_url="http://test") as c:
+        response = await c.post("/api/bom/extract-pdf")
+
+    assert response.status_code in (404, 405)
+    assert not pdf.loaded
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pypdf") is None, reason="pypdf non installé")
+async def test_empty_pdf_is_a_client_error(client):
+    response = await client.post("/api/bom/extract-pdf", files={"file": ("bom.pdf", b"", "application/pdf")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Le fichier PDF est vide."
+
+
+async def test_startup_report(client):
+    response = await client.get("/api/health/startup")
+    assert response.status_code == 200
+    data = response.json()
+    assert "app_import" in data["phases_ms"]
+    assert set(data["features"]) == {"ai", "pdf", "projects"}
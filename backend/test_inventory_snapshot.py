@@ -0,0 +1,85 @@
+"""
+Tests de l'instantané mémoire de l'inventaire (patchs copie sur écriture, cohérence)
+"""
+import inventory_snapshot
+from conftest import create_drawer
+
+
+async def _snapshot_report(client, verify=True):
+    response = await client.get("/api/health/snapshot", params={"verify": verify})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_mutations_patch_snapshot_without_rebuild(client):
+    drawer = await create_drawer(client, "Passifs")
+    first = await _snapshot_report(client)
+    builds = first["builds"]
+
+    layer = (await client.post(f"/api/drawers/{drawer['drawer_id']}/layers", json={"z_index": 1})).json()
+    category = (await client.post("/api/categories", json={"name": "Condensateurs"})).json()
+    new_bin = (await client.post(f"/api/layers/{layer['layer_id']}/bins", json={
+        "x_grid": 2, "y_grid": 1, "width_units": 1, "depth_units": 1,
+        "content": {"title": "Condensateurs 100nF", "items": ["100nF 0805"]},
+    })).json()
+    await client.patch(f"/api/bins/{new_bin['bin_id']}", json={"category_id": category["id"]})
+
+    located = (await client.get("/api/locate", params={"query": "100nF"})).json()
+    assert located["result"]["box_id"] == new_bin["bin_id"]
+    assert located["result"]["category"] == "Condensateurs"
+    assert located["result"]["layer"] == 2
+
+    first_bin = drawer["layers"][0]["bins"][0]["bin_id"]
+    await client.patch(f"/api/bins/{first_bin}", json={"layer_id": layer["layer_id"]})
+    await client.delete(f"/api/categories/{category['id']}")
+    await client.delete(f"/api/bins/{new_bin['bin_id']}")
+
+    report = await _snapshot_report(client)
+    assert report["builds"] == builds
+    assert report["consistency"]["consistent"], report["consistency"]
+    assert report["counts"] == {"drawers": 1, "layers": 2, "categories": 0, "bins": 1}
+
+    await client.delete(f"/api/drawers/{drawer['drawer_id']}")
+    report = await _snapshot_report(client)
+    assert report["consistency"]["consistent"], report["consistency"]
+    assert report["counts"]["bins"] == 0
+
+
+async def test_foreign_write_triggers_rebuild(client):
+    await create_drawer(client)
+    builds = (await _snapshot_report(client, verify=False))["builds"]
+    # Écriture d'un autre worker : génération incrémentée sans patch local
+    inventory_snapshot.store.coordinator.bump_generation()
+    report = await _snapshot_report(client)
+    assert report["builds"] == builds + 1
+    assert report["consistency"]["consistent"]
+
+
+async def test_bom_search_and_project_bins_use_snapshot(client):
+    drawer = await create_drawer(client, "Actifs", bins=[
+        {"x_grid": 0, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": "Transistors", "description": "NPN", "items": ["BC547", "2N2222"]}},
+    ])
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+
+    results = (await client.get("/api/bom/search", params={"q": "bc547"})).json()
+    assert results[0]["bin_id"] == bin_id
+    assert results[0]["ref"] == "BC547"
+    assert results[0]["drawer"] == "Actifs"
+
+    project = (await client.post("/api/projects", json={"name": "Ampli"})).json()
+    await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": bin_id, "qty": 2})
+    await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": "disparue"})
+    entries = (await client.get(f"/api/projects/{project['id']}/bins")).json()
+    by_id = {e["bin_id"]: e for e in entries}
+    assert by_id[bin_id]["found"] and by_id[bin_id]["drawer"] == "Actifs"
+    assert by_id[bin_id]["layer"] == 0
+    assert not by_id["disparue"]["found"]
+
+
+async def test_memory_footprint_report(client):
+    await create_drawer(client)
+    memory = (await _snapshot_report(client, verify=False))["memory"]
+    assert memory["total_bytes"] > 0
+    assert memory["bytes_per_bin"] > 0
+    assert memory["projected_10k_bins_mb"] > 0
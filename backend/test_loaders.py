@@ -0,0 +1,74 @@
+"""
+Tests des chargements explicites : aucune relation chargée implicitement
+(lazy="raise"), requêtes minimales pour les vérifications d'existence et les compteurs
+"""
+import pytest
+
+from conftest import create_drawer, sql_count
+from database import Base
+
+
+@pytest.mark.parametrize("mapper", list(Base.registry.mappers), ids=lambda m: m.class_.__name__)
+def test_every_relationship_raises_on_lazy_load(mapper):
+    for rel in mapper.relationships:
+        assert rel.lazy == "raise", f"{mapper.class_.__name__}.{rel.key} : lazy={rel.lazy!r}"
+
+
+async def test_layer_and_bin_creation_check_ids_only(client):
+    drawer = await create_drawer(client)
+
+    response = await client.post(f"/api/drawers/{drawer['drawer_id']}/layers", json={"z_index": 1})
+    assert response.status_code == 201
+    layer = response.json()
+    assert layer["bins"] == []
+    # SELECT id du tiroir + INSERT
+    assert sql_count(response) == 2
+
+    response = await client.post(f"/api/layers/{layer['layer_id']}/bins", json={
+        "x_grid": 0, "y_grid": 0, "width_units": 1, "depth_units": 1, "content": {"title": "Vis"},
+    })
+    assert response.status_code == 201
+    bin_id = response.json()["bin_id"]
+
+    assert (await client.get(f"/api/bins/{bin_id}")).json()["content"]["title"] == "Vis"
+    assert (await client.delete(f"/api/bins/{bin_id}")).status_code == 200
+    assert (await client.post("/api/drawers/absent/layers", json={"z_index": 0})).status_code == 404
+
+
+async def test_deletes_cascade_without_loading(client):
+    category = (await client.post("/api/categories", json={"name": "Vis"})).json()
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    await client.patch(f"/api/bins/{bin_id}", json={"category_id": category["id"]})
+
+    assert (await client.delete(f"/api/categories/{category['id']}")).status_code == 200
+    assert (await client.get(f"/api/bins/{bin_id}")).json()["category_id"] is None
+
+    assert (await client.delete(f"/api/drawers/{drawer['drawer_id']}")).status_code == 200
+    assert (await client.get(f"/api/bins/{bin_id}")).status_code == 404
+
+
+async def test_project_endpoints_use_counts_and_targeted_queries(client):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    project = (await client.post("/api/projects", json={"name": "Alim"})).json()
+    other = (await client.post("/api/projects", json={"name": "Vide"})).json()
+
+    for _ in range(2):
+        response = await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": bin_id, "qty": 2})
+        assert response.status_code == 201
+    assert response.json()["qty"] == 4
+    await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": "autre"})
+
+    response = await client.get("/api/projects")
+    counts = {p["id"]: p["bin_count"] for p in response.json()}
+    assert counts == {project["id"]: 2, other["id"]: 0}
+    # Un seul SELECT avec sous-requête COUNT, quel que soit le nombre de projets
+    assert sql_count(response) == 1
+
+    bins = (await client.get(f"/api/projects/{project['id']}/bins")).json()
+    assert [b["found"] for b in bins] == [True, False]
+    assert (await client.get(f"/api/projects/{project['id']}/bom.csv")).status_code == 200
+    assert (await client.patch(f"/api/projects/{project['id']}", json={"name": "Alim 5V"})).status_code == 200
+    assert (await client.delete(f"/api/projects/{project['id']}")).status_code == 200
+    assert [p["id"] for p in (await client.get("/api/projects")).json()] == [other["id"]]
@@ -0,0 +1,83 @@
+"""
+Tests de /api/locate (résultat unique, top-k, phonétique, batch)
+"""
+import main
+from conftest import bin_spec, create_drawer
+
+
+async def _inventory(client):
+    return await create_drawer(client, "Passifs", bins=[
+        bin_spec(0, "Résistances 10k", ["10k 0603"]),
+        bin_spec(1, "Résistances 1k"),
+        bin_spec(2, "Condensateurs céramique"),
+        bin_spec(3, "Résistances 10k", ["10k 0805"]),
+    ])
+
+
+async def test_single_result_shape_without_limit(client):
+    await _inventory(client)
+    data = (await client.get("/api/locate", params={"query": "resistances 10k"})).json()
+    assert data["found"] is True
+    assert "results" not in data
+    # À score égal, la première boîte parcourue l'emporte
+    assert data["result"]["x"] == 1
+    assert data["result"]["title"] == "Résistances 10k"
+    assert data["score"] == 100 + 15
+
+
+async def test_top_k_ranking(client):
+    await _inventory(client)
+    data = (await client.get("/api/locate", params={"query": "resistances 10k", "limit": 3})).json()
+    ranked = data["results"]
+    assert [r["x"] for r in ranked] == [1, 4, 2]
+    assert [r["score"] for r in ranked] == sorted((r["score"] for r in ranked), reverse=True)
+    assert ranked[0]["box_id"] == data["result"]["box_id"]
+
+
+async def test_top_k_not_found_and_validation(client):
+    await _inventory(client)
+    data = (await client.get("/api/locate", params={"query": "zzzz", "limit": 5})).json()
+    assert data["found"] is False and data["results"] == []
+    response = await client.get("/api/locate", params={"query": "10k", "limit": 0})
+    assert response.status_code == 422
+
+
+def test_upper_bound_never_below_score():
+    from inventory_snapshot import BinRecord
+    rec = BinRecord.build("b", "l", None, 0, 0, 1, 1, 1.0, 0.0,
+                          {"title": "Resistence carbone", "description": "resistor",
+                           "items": ["resistanse 10k", "10k"]}, None, False)
+    for query in ("resistance", "10k", "resistor carbon", "carbone 10k", "xyz"):
+        lq = main.LocateQuery(query)
+        exact = main._score_bin(rec, lq, "Tiroir", None)
+        bound = main._score_bin(rec, lq, "Tiroir", None, similar=main._maybe_similar)
+        assert bound >= exact
+
+
+async def test_batch_matches_individual_locates(client):
+    await _inventory(client)
+    queries = ["resistances 10k", "condensateur", "zzzz", "Résistances 10k"]
+    data = (await client.post("/api/locate/batch", json={"queries": queries, "limit": 2})).json()
+
+    assert data["count"] == 4 and data["found"] == 3
+    for query, entry in zip(queries, data["results"]):
+        single = (await client.get("/api/locate", params={"query": query, "limit": 2})).json()
+        assert entry == single
+    assert data["spoken"].startswith(data["results"][0]["spoken"])
+
+
+async def test_batch_reports_short_queries_individually(client):
+    await _inventory(client)
+    data = (await client.post("/api/locate/batch", json={"queries": ["x", "10k"]})).json()
+    assert data["results"][0]["error"] and data["results"][0]["found"] is False
+    assert data["results"][1]["found"] is True and "results" not in data["results"][1]
+    response = await client.post("/api/locate/batch", json={"queries": []})
+    assert response.status_code == 422
+
+
+async def test_dictated_misspellings_match_phonetically(client):
+    await _inventory(client)
+    data = (await client.get("/api/locate", params={"query": "rézistance"})).json()
+    assert data["found"] is True and data["result"]["title"].startswith("Résistances")
+    data = (await client.get("/api/locate", params={"query": "condo"})).json()
+    assert data["result"]["title"] == "Condensateurs céramique"
@@ -0,0 +1,56 @@
+"""
+Tests du pipeline de logs (file non bloquante, échantillonnage, JSON)
+"""
+import io
+import json
+import logging
+
+import logging_setup
+
+
+def _record(func: str, level=logging.INFO, msg="%s", args=("x",)) -> logging.LogRecord:
+    return logging.LogRecord("main", level, __file__, 1, msg, args, None, func=func)
+
+
+def test_sampling_filter_keeps_warnings_and_unlisted_routes():
+    f = logging_setup.SamplingFilter({"update_bin": 0.0})
+    assert f.filter(_record("update_bin")) is False
+    assert f.filter(_record("update_bin", level=logging.WARNING)) is True
+    assert f.filter(_record("locate_box")) is True
+
+
+def test_parse_sampling_ignores_garbage():
+    assert logging_setup.parse_sampling("update_bin=0.1, get_bin=2,bad,x=abc") == {
+        "update_bin": 0.1, "get_bin": 1.0,
+    }
+
+
+def test_lazy_argument_is_formatted_only_when_emitted():
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return {"x_grid": 1}
+
+    record = _record("update_bin", args=(logging_setup.lazy(expensive),))
+    assert calls == []
+    assert record.getMessage() == "{'x_grid': 1}"
+    assert calls == [1]
+
+
+def test_deferred_handler_writes_from_listener_thread():
+    logger = logging.getLogger("scangrid.test.deferred")
+    logger.propagate = False
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging_setup.JsonFormatter())
+    logger.addHandler(handler)
+    try:
+        logging_setup._defer(logger, None)
+        logger.warning("boîte %s", "A1", extra={"route": "/api/bins/{bin_id}"})
+    finally:
+        logging_setup.shutdown_logging()
+        logger.removeHandler(handler)
+    line = json.loads(stream.getvalue().strip())
+    assert line["msg"] == "boîte A1"
+    assert line["route"] == "/api/bins/{bin_id}"
@@ -0,0 +1,32 @@
+"""
+Tests de l'endpoint /api/metrics
+"""
+from conftest import create_drawer
+
+
+async def test_metrics_exposes_route_latency_and_sql(client):
+    drawer = await create_drawer(client)
+    await client.get(f"/api/drawers/{drawer['drawer_id']}")
+
+    response = await client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'route="/api/drawers/{drawer_id}"' in body
+    assert "scangrid_http_request_duration_seconds_bucket" in body
+    assert "scangrid_http_requests_in_flight" in body
+    assert 'scangrid_db_statements_total{operation="SELECT"}' in body
+
+
+def test_histogram_buckets_are_cumulative():
+    import metrics
+
+    h = metrics.Histogram("t_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    h.observe(0.05, op="a")
+    h.observe(0.5, op="a")
+    h.observe(5.0, op="a")
+    text = "\n".join(h.render())
+    assert 't_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{op="a",le="1"} 2' in text
+    assert 't_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="a"} 3' in text
@@ -0,0 +1,105 @@
+"""
+Tests du client Ollama partagé (pool, keep_alive, préchauffage, sonde en cache)
+"""
+import json
+
+import httpx
+import pytest
+
+import ollama_client
+from ollama_client import OllamaClient
+
+
+class FakeOllama:
+    """Serveur Ollama simulé (httpx.MockTransport) qui enregistre les requêtes"""
+
+    def __init__(self, up=True, response="[]"):
+        self.up = up
+        self.response = response
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if not self.up:
+            raise httpx.ConnectError("refused", request=request)
+        body = json.loads(request.content) if request.content else None
+        self.requests.append((request.url.path, body))
+        if request.url.path == "/api/version":
+            return httpx.Response(200, json={"version": "0.5.0"})
+        return httpx.Response(200, json={"response": self.response, "done": True})
+
+
+def make_client(fake, **kwargs):
+    return OllamaClient(base_url="http://ollama:11434", model="tiny", keep_alive="10m",
+                        transport=httpx.MockTransport(fake), **kwargs)
+
+
+async def test_generate_reuses_one_client_and_keeps_model_loaded():
+    fake = FakeOllama(response="ok")
+    client = make_client(fake)
+    http = client.start()
+
+    for _ in range(3):
+        data = await client.generate("Bonjour", temperature=0.1)
+
+    assert data["response"] == "ok"
+    assert client.http is http
+    path, body = fake.requests[-1]
+    assert path == "/api/generate"
+    assert body["model"] == "tiny" and body["keep_alive"] == "10m" and body["stream"] is False
+    assert body["options"] == {"temperature": 0.1}
+    await client.aclose()
+
+
+async def test_keep_alive_seconds_are_sent_as_integer():
+    fake = FakeOllama()
+    client = OllamaClient(base_url="http://ollama", keep_alive="-1", transport=httpx.MockTransport(fake))
+    assert await client.warm_up()
+    assert fake.requests == [("/api/generate", {"model": client.model, "keep_alive": -1})]
+    assert client.warmup_seconds is not None
+    await client.aclose()
+
+
+async def test_reachability_probe_is_cached():
+    fake = FakeOllama()
+    client = make_client(fake, probe_ttl=60)
+
+    assert await client.reachable()
+    fake.up = False
+    assert await client.reachable()
+    assert [path for path, _ in fake.requests] == ["/api/version"]
+
+    # Une erreur de connexion met la sonde à jour sans attendre le TTL
+    with pytest.raises(httpx.ConnectError):
+        await client.generate("x")
+    assert not await client.reachable()
+    assert not await client.warm_up()
+    await client.aclose()
+
+
+async def test_ai_endpoints_use_shared_client(client, monkeypatch):
+    fake = FakeOllama(response='[{"designation": "Résistance 10k", "qty": 2}]')
+    shared = make_client(fake)
+    monkeypatch.setattr(ollama_client, "client", shared)
+
+    response = await client.post("/api/bom/ai-parse", json={"text": "R1 10k", "rules": False})
+    assert response.status_code == 200
+    assert response.json()["components"][0] == {
+        "designation": "Résistance 10k", "qty": 2, "reference": "", "package": "",
+    }
+    assert response.json()["model"] == "tiny"
+
+    response = await client.post("/api/improve-description", params={"title": "Vis M3"})
+    assert response.status_code == 200
+
+    status = (await client.get("/api/ai/status")).json()
+    assert status["reachable"] and status["requests"] == 2
+    await shared.aclose()
+
+
+async def test_ai_endpoints_answer_503_when_ollama_is_down(client, monkeypatch):
+    shared = make_client(FakeOllama(up=False))
+    monkeypatch.setattr(ollama_client, "client", shared)
+
+    assert (await client.post("/api/bom/ai-parse", json={"text": "R1", "rules": False})).status_code == 503
+    assert (await client.post("/api/improve-description", params={"title": "Vis"})).status_code == 503
+    await shared.aclose()
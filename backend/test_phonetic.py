@@ -0,0 +1,25 @@
+"""
+Tests des clés phonétiques françaises (dictée Siri → /locate)
+"""
+from phonetic import PhoneticIndex, phonetic_key
+
+
+def test_dictation_variants_share_a_key():
+    assert phonetic_key("rezistance") == phonetic_key("resistance") == phonetic_key("resistances")
+    assert phonetic_key("transitor") == phonetic_key("transistor")
+    assert phonetic_key("seramique") == phonetic_key("ceramique")
+    assert phonetic_key("fuzible") == phonetic_key("fusible")
+    assert phonetic_key("condensateurs") == phonetic_key("condensateur")
+
+
+def test_references_and_short_words_have_no_key():
+    for word in ("10k", "0603", "m3", "vis", "led"):
+        assert phonetic_key(word) is None
+
+
+def test_index_neighbours_and_abbreviations():
+    index = PhoneticIndex(["resistance", "condensateur", "condensateurs", "ceramique", "10k"])
+    assert index.neighbours("rezistance") == {"resistance"}
+    assert index.neighbours("condo") == {"condensateur", "condensateurs"}
+    assert index.neighbours("10k") == frozenset()
+    assert index.neighbours("moteur") == frozenset()
@@ -0,0 +1,105 @@
+"""
+Tests du store de photos (import, service immuable, extraction des data URLs)
+"""
+import base64
+import os
+import threading
+
+import photo_store
+from conftest import create_drawer
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def data_url(data=PNG, mime="image/png"):
+    return f"data:{mime};base64," + base64.b64encode(data).decode()
+
+
+async def test_upload_and_serve_immutable(client):
+    response = await client.post("/api/photos", files={"file": ("boite.png", PNG, "image/png")})
+    assert response.status_code == 201, response.text
+    photo = response.json()
+    assert photo["url"] == f"/api/photos/{photo['id']}"
+
+    served = await client.get(photo["url"])
+    assert served.status_code == 200
+    assert served.content == PNG
+    assert served.headers["content-type"] == "image/png"
+    assert "immutable" in served.headers["cache-control"]
+
+    again = await client.get(photo["url"], headers={"If-None-Match": served.headers["etag"]})
+    assert again.status_code == 304
+
+    # Même contenu, même id
+    second = await client.post("/api/photos", files={"file": ("copie.png", PNG, "image/png")})
+    assert second.json()["id"] == photo["id"]
+
+
+async def test_upload_rejects_non_images(client):
+    response = await client.post("/api/photos", files={"file": ("notes.txt", b"hello", "text/plain")})
+    assert response.status_code == 400
+    assert (await client.get("/api/photos/" + "0" * 64)).status_code == 404
+    assert (await client.get("/api/photos/..%2Fsecret")).status_code == 404
+
+
+async def test_thumbnail_falls_back_to_original(client, monkeypatch):
+    monkeypatch.setattr(photo_store, "PIL_AVAILABLE", False)
+    photo = (await client.post("/api/photos", files={"file": ("b.png", PNG, "image/png")})).json()
+    response = await client.get(photo["thumbnail_url"])
+    assert response.status_code == 200
+    assert response.content == PNG
+    # La vraie miniature pourra remplacer l'original sous la même URL
+    assert "immutable" not in response.headers["cache-control"]
+    assert response.headers["cache-control"] == photo_store.FALLBACK
+
+
+async def test_inline_photos_are_extracted_on_write(client):
+    drawer = await create_drawer(client, bins=[
+        {"x_grid": 0, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": "Vis", "photos": [data_url(), "https://exemple.fr/vis.jpg"]}},
+    ])
+    bin_data = drawer["layers"][0]["bins"][0]
+    photo_url, external = bin_data["content"]["photos"]
+    assert photo_url.startswith(photo_store.URL_PREFIX)
+    assert external == "https://exemple.fr/vis.jpg"
+    assert os.path.exists(photo_store.path_for(photo_url.rsplit("/", 1)[-1]))
+
+    response = await client.patch(f"/api/bins/{bin_data['bin_id']}", json={
+        "content": {"title": "Vis", "photos": [data_url(b"\xff\xd8\xff" + b"\x01" * 16, "image/jpeg")]},
+    })
+    assert response.json()["content"]["photos"][0].startswith(photo_store.URL_PREFIX)
+    fetched = (await client.get(f"/api/drawers/{drawer['drawer_id']}")).json()
+    assert fetched["layers"][0]["bins"][0]["content"]["photos"] == response.json()["content"]["photos"]
+
+
+async def test_inline_photos_are_written_off_the_event_loop(client, monkeypatch):
+    threads = []
+    save = photo_store.save
+
+    def recording_save(data):
+        threads.append(threading.current_thread())
+        return save(data)
+
+    monkeypatch.setattr(photo_store, "save", recording_save)
+    drawer = await create_drawer(client, bins=[
+        {"x_grid": 0, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": "Vis", "photos": [data_url()]}},
+    ])
+    layer_id = drawer["layers"][0]["layer_id"]
+    await client.post(f"/api/layers/{layer_id}/bins", json={
+        "x_grid": 1, "y_grid": 0, "width_units": 1, "depth_units": 1,
+        "content": {"title": "Écrous", "photos": [data_url(b"\xff\xd8\xff" + b"\x02" * 16, "image/jpeg")]},
+    })
+    await client.patch(f"/api/bins/{drawer['layers'][0]['bins'][0]['bin_id']}", json={
+        "content": {"title": "Vis", "photos": [data_url(b"GIF89a" + b"\x03" * 16, "image/gif")]},
+    })
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+def test_externalize_keeps_unreadable_entries():
+    content = {"title": "x", "photos": ["data:text/plain;base64,aGVsbG8=", "data:image/png,nobase64"]}
+    new, extracted = photo_store.externalize(content)
+    assert extracted == 0
+    assert new["photos"] == content["photos"]
+    assert photo_store.externalize({"title": "x"}) == ({"title": "x"}, 0)
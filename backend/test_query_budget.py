@@ -0,0 +1,41 @@
+"""
+Tests du mode debug SQL (budget de requêtes, détection N+1)
+"""
+from conftest import create_drawer
+from query_budget import HEADER_COUNT, QueryStats, statement_shape
+
+
+async def test_query_count_header(client):
+    drawer = await create_drawer(client)
+    response = await client.get(f"/api/drawers/{drawer['drawer_id']}")
+    assert response.status_code == 200
+    count = int(response.headers[HEADER_COUNT])
+    # Tiroir + couches + boîtes (+ catégories) : pas de fan-out par boîte
+    assert 1 <= count <= 4
+
+
+async def test_query_count_does_not_grow_with_bins(client):
+    bins = [
+        {"x_grid": i, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": f"Boîte {i}"}}
+        for i in range(8)
+    ]
+    small = await create_drawer(client, "Petit", bins[:1])
+    large = await create_drawer(client, "Grand", bins)
+    r_small = await client.get(f"/api/drawers/{small['drawer_id']}")
+    r_large = await client.get(f"/api/drawers/{large['drawer_id']}")
+    assert r_small.headers[HEADER_COUNT] == r_large.headers[HEADER_COUNT]
+
+
+def test_statement_shape_collapses_literals_and_in_lists():
+    a = statement_shape("SELECT * FROM bins WHERE bins.layer_id IN (?, ?, ?) AND x = 3")
+    b = statement_shape("SELECT * FROM bins  WHERE bins.layer_id IN (?) AND x = 12")
+    assert a == b
+    assert "IN (...)" in a
+
+
+def test_repeated_shapes_threshold():
+    stats = QueryStats()
+    stats.shapes["SELECT ? FROM bins WHERE id = ?"] = 5
+    stats.shapes["SELECT ? FROM drawers"] = 1
+    assert stats.repeated_shapes(threshold=3) == [("SELECT ? FROM bins WHERE id = ?", 5)]
@@ -0,0 +1,116 @@
+"""
+Tests du cache des réponses GET (étiquettes, TTL, LRU, invalidation inter-workers)
+"""
+import metrics
+import response_cache
+import writer
+from conftest import create_drawer
+from database import DB_DIR
+
+
+def hits(route):
+    return metrics.RESPONSE_CACHE_REQUESTS.value(route=route, result="hit")
+
+
+async def test_repeated_get_is_served_from_cache(client):
+    await client.post("/api/categories", json={"name": "Résistances"})
+    before = hits("list_categories")
+
+    first = await client.get("/api/categories")
+    second = await client.get("/api/categories")
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["content-type"] == first.headers["content-type"]
+    assert second.headers["X-SQL-Query-Count"] == "0"
+    assert hits("list_categories") == before + 1
+
+    await client.post("/api/categories", json={"name": "Condensateurs"})
+    names = [c["name"] for c in (await client.get("/api/categories")).json()]
+    assert names == ["Condensateurs", "Résistances"]
+
+
+async def test_bin_patch_invalidates_only_its_drawer(client):
+    drawer_a = await create_drawer(client, name="A")
+    drawer_b = await create_drawer(client, name="B")
+    bin_id = drawer_a["layers"][0]["bins"][0]["bin_id"]
+    for drawer in (drawer_a, drawer_b):
+        await client.get(f"/api/drawers/{drawer['drawer_id']}")
+    before = hits("get_drawer")
+
+    response = await client.patch(f"/api/bins/{bin_id}", json={"x_grid": 4})
+    assert response.status_code == 200
+
+    refreshed = (await client.get(f"/api/drawers/{drawer_a['drawer_id']}")).json()
+    assert refreshed["layers"][0]["bins"][0]["x_grid"] == 4
+    assert hits("get_drawer") == before
+    await client.get(f"/api/drawers/{drawer_b['drawer_id']}")
+    assert hits("get_drawer") == before + 1
+
+
+async def test_locate_follows_content_changes(client):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    assert (await client.get("/api/locate", params={"query": "vis"})).json()["found"] is False
+    assert (await client.get("/api/locate", params={"query": "vis"})).json()["found"] is False
+
+    await client.patch(f"/api/bins/{bin_id}", json={"content": {"title": "Vis M3"}})
+    response = await client.get("/api/locate", params={"query": "vis"})
+    assert response.json()["found"] is True
+
+
+async def test_errors_are_not_cached(client):
+    assert (await client.get("/api/drawers/inconnu")).status_code == 404
+    assert len(response_cache.cache) == 0
+
+
+async def test_other_worker_write_clears_cache(client):
+    await client.get("/api/categories")
+    assert len(response_cache.cache) == 1
+
+    other_worker = writer.WriteCoordinator(DB_DIR)
+    async with other_worker.write_lock():
+        other_worker.bump_generation()
+
+    await client.get("/api/health")
+    assert len(response_cache.cache) == 0
+
+
+def make_entry(body=b"{}", tags=(), ttl=60.0):
+    return response_cache._Entry(
+        route="get_drawer", start={"type": "http.response.start", "status": 200, "headers": []},
+        body=body, tags=frozenset(tags), expires=response_cache.time.monotonic() + ttl, route_scope={},
+    )
+
+
+def test_lru_bounds_and_ttl():
+    cache = response_cache.ResponseCache({"get_drawer": 60}, max_bytes=100, max_entries=3)
+    for i in range(3):
+        cache.put((b"/a", str(i).encode()), make_entry(b"x" * 10, tags=[f"drawer:{i}"]))
+    cache.get((b"/a", b"0"))  # 0 devient le plus récent
+    cache.put((b"/a", b"3"), make_entry(b"x" * 10))
+    assert cache.get((b"/a", b"1")) is None
+    assert cache.get((b"/a", b"0")) is not None
+
+    assert cache.invalidate("drawer:0") == 1
+    assert cache.get((b"/a", b"0")) is None
+
+    cache.put((b"/a", b"ttl"), make_entry(ttl=-1))
+    assert cache.get((b"/a", b"ttl")) is None
+
+
+def test_size_bound():
+    cache = response_cache.ResponseCache({"get_drawer": 60}, max_bytes=100, max_entries=100)
+    for i in range(6):
+        cache.put((b"/b", str(i).encode()), make_entry(b"x" * 20))
+    assert len(cache) == 5
+    assert cache.report()["bytes"] == 100
+    # Plus d'un quart du budget : jamais mis en cache
+    assert cache.put((b"/b", b"big"), make_entry(b"x" * 30)) is False
+
+
+def test_parse_routes():
+    assert response_cache.parse_routes("list_categories=300, get_drawer,bad=x,off=0", 60) == {
+        "list_categories": 300.0, "get_drawer": 60.0,
+    }
+    assert response_cache.parse_routes("", 60) == {}
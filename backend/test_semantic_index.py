@@ -0,0 +1,147 @@
+"""
+Tests de l'index sémantique (embeddings Ollama simulés, cache SQLite, modes de recherche)
+"""
+import json
+
+import httpx
+import pytest
+
+import ollama_client
+import semantic_index
+from conftest import bin_spec, create_drawer
+from ollama_client import OllamaClient
+
+pytestmark = pytest.mark.skipif(not semantic_index.NUMPY_AVAILABLE, reason="numpy non installé")
+
+# Axes de l'espace simulé : un mot-clé → un concept
+CONCEPTS = {
+    "pile": 0, "bouton": 0, "cr2032": 0, "batterie": 0,
+    "résistance": 1, "résistances": 1, "10k": 1,
+    "condensateur": 2, "condensateurs": 2,
+}
+
+
+def embed(text):
+    vector = [0.0, 0.0, 0.0, 0.2]
+    for word in text.lower().replace(".", " ").split():
+        if word in CONCEPTS:
+            vector[CONCEPTS[word]] += 1.0
+    return vector
+
+
+class FakeEmbeddings:
+    """Serveur Ollama simulé : /api/embed renvoie un vecteur par concept présent"""
+
+    def __init__(self, up=True):
+        self.up = up
+        self.texts = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if not self.up:
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == "/api/version":
+            return httpx.Response(200, json={"version": "0.5.0"})
+        body = json.loads(request.content)
+        self.texts.extend(body["input"])
+        return httpx.Response(200, json={"model": body["model"], "embeddings": [embed(t) for t in body["input"]]})
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(ollama_client, "client",
+                        OllamaClient(base_url="http://ollama", transport=httpx.MockTransport(fake)))
+    monkeypatch.setattr(semantic_index, "ENABLED", True)
+    monkeypatch.setattr(semantic_index, "index", semantic_index.SemanticIndex(model="fake-embed"))
+    return fake
+
+
+INVENTORY = [
+    bin_spec(0, "Résistances 10k", ["10k 0603"]),
+    bin_spec(1, "CR2032"),
+    bin_spec(2, "Condensateurs"),
+]
+
+
+async def test_semantic_locate_finds_synonyms(client, fake):
+    await create_drawer(client, "Divers", INVENTORY)
+    assert (await client.get("/api/locate", params={"query": "pile bouton"})).json()["found"] is False
+
+    data = (await client.get("/api/locate", params={"query": "pile bouton", "mode": "semantic", "limit": 3})).json()
+    assert data["found"] is True and data["mode"] == "semantic"
+    assert data["result"]["title"] == "CR2032"
+    # Les boîtes sans rapport restent sous SCANGRID_SEMANTIC_MIN_SCORE
+    assert [r["title"] for r in data["results"]] == ["CR2032"]
+    assert data["score"] == 100
+
+
+async def test_embeddings_are_cached_and_refreshed_on_change(client, fake):
+    drawer = await create_drawer(client, "Divers", INVENTORY)
+    params = {"query": "condensateur", "mode": "semantic"}
+    await client.get("/api/locate", params=params)
+    assert len(fake.texts) == 3 + 1  # trois boîtes + la requête
+
+    # Requête répétée : ni boîte ni requête recalculée
+    await client.get("/api/locate", params={**params, "limit": 2})
+    assert len(fake.texts) == 4
+
+    # Seule la boîte modifiée repart vers Ollama
+    bin_id = next(b["bin_id"] for b in drawer["layers"][0]["bins"] if b["x_grid"] == 2)
+    response = await client.patch(f"/api/bins/{bin_id}", json={"content": {"title": "Piles AA"}})
+    assert response.status_code == 200
+    data = (await client.get("/api/locate", params={"query": "batterie", "mode": "semantic"})).json()
+    assert fake.texts[4:] == ["Piles AA", "batterie"]
+    assert data["result"]["title"] == "CR2032"
+
+    # Nouveau processus : vecteurs relus dans bin_embeddings, rien à recalculer
+    semantic_index.index = semantic_index.SemanticIndex(model="fake-embed")
+    await client.get("/api/locate", params=params)
+    assert fake.texts[6:] == ["condensateur"]
+    assert semantic_index.index.report()["indexed"] == 3
+
+
+async def test_hybrid_adds_similarity_to_keyword_score(client, fake):
+    await create_drawer(client, "Divers", INVENTORY)
+    keyword = (await client.get("/api/locate", params={"query": "résistances 10k"})).json()
+    hybrid = (await client.get("/api/locate", params={"query": "résistances 10k", "mode": "hybrid"})).json()
+    assert hybrid["mode"] == "hybrid"
+    assert hybrid["result"]["box_id"] == keyword["result"]["box_id"]
+    assert hybrid["score"] == keyword["score"] + 100
+
+
+async def test_bom_search_modes(client, fake):
+    await create_drawer(client, "Divers", INVENTORY)
+    assert (await client.get("/api/bom/search", params={"q": "pile bouton"})).json() == []
+
+    results = (await client.get("/api/bom/search", params={"q": "pile bouton", "mode": "semantic"})).json()
+    assert [(r["title"], r["score"]) for r in results] == [("CR2032", 100)]
+    assert results[0]["reason"] == "sémantique 1.00"
+
+    results = (await client.get("/api/bom/search", params={"q": "batterie 10k", "mode": "hybrid"})).json()
+    assert [r["title"] for r in results] == ["Résistances 10k", "CR2032"]
+
+
+async def test_unavailable_index(client, fake, monkeypatch):
+    await create_drawer(client, "Divers", INVENTORY)
+    fake.up = False
+    response = await client.get("/api/locate", params={"query": "pile bouton", "mode": "semantic"})
+    assert response.status_code == 503
+
+    # hybrid retombe sur les mots-clés
+    data = (await client.get("/api/locate", params={"query": "condensateurs", "mode": "hybrid"})).json()
+    assert data["found"] is True and data["mode"] == "keyword"
+
+    monkeypatch.setattr(semantic_index, "ENABLED", False)
+    response = await client.get("/api/bom/search", params={"q": "pile", "mode": "semantic"})
+    assert response.status_code == 503
+    assert (await client.get("/api/health/semantic")).json()["enabled"] is False
+
+
+def test_similarities_top_k_and_threshold():
+    import numpy as np
+
+    sims = semantic_index.Similarities(["a", "b", "c", "d"], np.array([0.2, 0.9, 0.5, 0.7], dtype=np.float32))
+    assert [bin_id for bin_id, _ in sims.top_k(3)] == ["b", "d", "c"]
+    assert [bin_id for bin_id, _ in sims.top_k(10)] == ["b", "d", "c"]  # 0.2 < MIN_SCORE
+    assert sims.get("a") is None and sims.get("b") == pytest.approx(0.9)
+    assert semantic_index.Similarities([], np.zeros(0, dtype=np.float32)).top_k(5) == []
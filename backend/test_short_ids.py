@@ -0,0 +1,108 @@
+"""
+Tests des ids courts (génération, migration des UUID, redirection des anciens ids)
+"""
+import uuid
+
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import metrics
+import migrate_short_ids
+import short_ids
+from conftest import create_drawer
+from database import Base, configure_sqlite
+from models import Bin, BinItem, Drawer, IdAlias, Layer, Project, ProjectBin
+
+
+def test_short_id_shape():
+    ids = {short_ids.short_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(len(i) == short_ids.LENGTH and set(i) <= set(short_ids.ALPHABET) for i in ids)
+    assert short_ids.is_legacy(str(uuid.uuid4()))
+    assert not short_ids.is_legacy(short_ids.short_id())
+
+
+async def test_new_rows_use_short_ids_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(short_ids, "ENABLED", True)
+    drawer = await create_drawer(client)
+    assert len(drawer["drawer_id"]) == short_ids.LENGTH
+    assert len(drawer["layers"][0]["bins"][0]["bin_id"]) == short_ids.LENGTH
+
+
+async def test_old_uuid_is_redirected(client, monkeypatch):
+    drawer = await create_drawer(client)
+    old = str(uuid.uuid4())
+    monkeypatch.setitem(short_ids.aliases, old, drawer["drawer_id"])
+
+    labels = {"method": "GET", "route": "/api/drawers/{drawer_id}", "status": "200"}
+    before = metrics.HTTP_REQUESTS.value(**labels)
+
+    response = await client.get(f"/api/drawers/{old}")
+
+    assert response.status_code == 200
+    # Compté sous le gabarit de la route, pas « unmatched »
+    assert metrics.HTTP_REQUESTS.value(**labels) == before + 1
+    assert response.json()["drawer_id"] == drawer["drawer_id"]
+
+
+@pytest.mark.parametrize("vacuum", [False, True])
+async def test_migration_rewrites_ids_and_references(tmp_path, monkeypatch, vacuum):
+    # Une seule connexion : celle de la migration est réutilisée ensuite
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ids.db'}", poolclass=StaticPool)
+    event.listen(engine.sync_engine, "connect", configure_sqlite)
+    monkeypatch.setattr(migrate_short_ids, "engine", engine)
+    drawer_id, layer_id, bin_id, project_id = (str(uuid.uuid4()) for _ in range(4))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Drawer).values(id=drawer_id, name="A", width_units=4, depth_units=4))
+        await conn.execute(insert(Layer).values(id=layer_id, drawer_id=drawer_id, z_index=0))
+        await conn.execute(insert(Bin).values(
+            id=bin_id, layer_id=layer_id, x_grid=0, y_grid=0, width_units=1, depth_units=1,
+        ))
+        await conn.execute(insert(BinItem).values(bin_id=bin_id, position=0, text="vis", text_norm="vis"))
+        await conn.execute(insert(Project).values(id=project_id, name="P", created_at="2024-01-01"))
+        await conn.execute(insert(ProjectBin).values(id=str(uuid.uuid4()), project_id=project_id, bin_id=bin_id))
+
+    await migrate_short_ids.migrate(vacuum=vacuum)
+
+    async with engine.connect() as conn:
+        assert (await conn.exec_driver_sql("PRAGMA foreign_keys")).scalar_one() == 1
+        new_bin = (await conn.execute(select(Bin.id, Bin.layer_id))).one()
+        layer = (await conn.execute(select(Layer.id, Layer.drawer_id))).one()
+        drawer = (await conn.execute(select(Drawer.id))).scalar_one()
+        assert new_bin.layer_id == layer.id and layer.drawer_id == drawer
+        assert (await conn.execute(select(BinItem.bin_id))).scalar_one() == new_bin.id
+        assert (await conn.execute(select(ProjectBin.bin_id))).scalar_one() == new_bin.id
+        aliases = dict((await conn.execute(select(IdAlias.old_id, IdAlias.new_id))).all())
+        assert aliases[bin_id] == new_bin.id and aliases[drawer_id] == drawer
+        assert len(new_bin.id) == short_ids.LENGTH
+
+        try:
+            await short_ids.load_aliases(conn)
+            assert short_ids.aliases[layer_id] == layer.id
+        finally:
+            short_ids.aliases.clear()
+    await engine.dispose()
+
+
+async def test_old_uuids_in_request_bodies_are_resolved(client, monkeypatch):
+    drawer = await create_drawer(client)
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    layer = (await client.post(f"/api/drawers/{drawer['drawer_id']}/layers", json={"z_index": 1})).json()
+    category = (await client.post("/api/categories", json={"name": "Vis"})).json()
+    project = (await client.post("/api/projects", json={"name": "Alim"})).json()
+    old_bin, old_layer, old_category = (str(uuid.uuid4()) for _ in range(3))
+    for old, new in ((old_bin, bin_id), (old_layer, layer["layer_id"]), (old_category, category["id"])):
+        monkeypatch.setitem(short_ids.aliases, old, new)
+
+    response = await client.patch(f"/api/bins/{bin_id}", json={"layer_id": old_layer, "category_id": old_category})
+    assert response.status_code == 200 and response.json()["category_id"] == category["id"]
+    layers = (await client.get(f"/api/drawers/{drawer['drawer_id']}")).json()["layers"]
+    assert {l["layer_id"]: [b["bin_id"] for b in l["bins"]] for l in layers}[layer["layer_id"]] == [bin_id]
+
+    response = await client.post(f"/api/projects/{project['id']}/bins", json={"bin_id": old_bin})
+    assert response.status_code == 201 and response.json()["bin_id"] == bin_id
+    entries = (await client.get(f"/api/projects/{project['id']}/bins")).json()
+    assert [(e["bin_id"], e["found"]) for e in entries] == [(bin_id, True)]
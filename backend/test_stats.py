@@ -0,0 +1,56 @@
+"""
+Tests de /api/stats (remplissage, non placées, fragmentation)
+"""
+import pytest
+
+import stats
+from conftest import create_drawer
+
+pytestmark = pytest.mark.skipif(not stats.NUMPY_AVAILABLE, reason="numpy non installé")
+
+
+def _bin(x, y, w=1, d=1, h=1.0, **extra):
+    return {"x_grid": x, "y_grid": y, "width_units": w, "depth_units": d, "height_units": h,
+            "content": {"title": f"Boîte {x},{y}"}, **extra}
+
+
+async def test_fill_per_drawer_and_layer(client):
+    # Tiroir 10×10 : une boîte 2×3, une 1×1 qui la chevauche, une non placée, un trou
+    drawer = await create_drawer(client, "Stock", bins=[
+        _bin(0, 0, 2, 3), _bin(1, 2), _bin(-1, -1, 4, 4), _bin(5, 5, 2, 2, is_hole=True),
+    ])
+    data = (await client.get("/api/stats")).json()
+
+    layer = data["layers"][0]
+    assert layer["layer_id"] == drawer["layers"][0]["layer_id"]
+    assert layer["bins"] == 3 and layer["unplaced"] == 1
+    assert layer["occupied_cells"] == 6 and layer["overlap_cells"] == 1
+    assert layer["capacity_cells"] == 100
+    assert layer["area_fill"] == pytest.approx(0.06)
+
+    d = data["drawers"][0]
+    assert d["area_fill"] == pytest.approx(0.06)
+    assert d["volume_fill"] == pytest.approx(7 / 100)
+    assert data["totals"]["holes"] == 1
+    assert data["totals"]["unplaced"] == 1
+
+
+async def test_fragmentation_and_categories(client):
+    compact = await create_drawer(client, "Compact", bins=[_bin(0, 0, 10, 5)])
+    # Damier : cases libres isolées
+    checker = await create_drawer(client, "Damier", bins=[
+        _bin(x, y) for y in range(10) for x in range(10) if (x + y) % 2 == 0
+    ])
+    category = (await client.post("/api/categories", json={"name": "Visserie"})).json()
+    bin_id = compact["layers"][0]["bins"][0]["bin_id"]
+    await client.patch(f"/api/bins/{bin_id}", json={"category_id": category["id"]})
+
+    data = (await client.get("/api/stats")).json()
+    by_drawer = {l["drawer_id"]: l for l in data["layers"]}
+    assert by_drawer[checker["drawer_id"]]["fragmentation"] == pytest.approx(1.0)
+    assert by_drawer[compact["drawer_id"]]["fragmentation"] == pytest.approx(30 / 200)
+
+    categories = {c["name"]: c for c in data["categories"]}
+    assert categories["Visserie"]["bins"] == 1
+    assert categories["Visserie"]["area_units"] == 50
+    assert categories[None]["bins"] == 50
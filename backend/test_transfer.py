@@ -0,0 +1,136 @@
+"""
+Tests de l'export / import de l'inventaire complet (NDJSON, ids réécrits, dry-run)
+"""
+import json
+
+import pytest
+
+import transfer
+from conftest import create_drawer
+from database import get_db
+from main import app
+
+
+async def populate(client):
+    category = (await client.post("/api/categories", json={"name": "Résistances"})).json()
+    drawer = await create_drawer(client, bins=[
+        {"x_grid": 0, "y_grid": 0, "width_units": 1, "depth_units": 1,
+         "content": {"title": "Résistances 10k", "items": ["10x 10k 0603"]}},
+        {"x_grid": 1, "y_grid": 0, "width_units": 2, "depth_units": 1,
+         "content": {"title": "Vis M3"}},
+    ])
+    bin_id = drawer["layers"][0]["bins"][0]["bin_id"]
+    await client.patch(f"/api/bins/{bin_id}", json={"category_id": category["id"]})
+    return category, drawer
+
+
+def parse(body: bytes):
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+async def chunks(body: bytes, size: int):
+    """Flux découpé en paquets de size octets (lignes coupées n'importe où)"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def test_export_lists_parents_before_children(client):
+    await populate(client)
+    response = await client.get("/api/export")
+    assert response.status_code == 200
+    records = parse(response.content)
+    assert records[0]["type"] == "header"
+    kinds = [r["type"] for r in records[1:]]
+    assert kinds == ["category", "drawer", "layer", "bin", "bin"]
+    assert {r["content"]["title"] for r in records if r["type"] == "bin"} == {"Résistances 10k", "Vis M3"}
+
+
+async def test_import_round_trip_remaps_ids(client):
+    category, drawer = await populate(client)
+    exported = (await client.get("/api/export")).content
+
+    response = await client.post("/api/import", content=exported)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["counts"]["drawer"] == 1 and report["counts"]["bin"] == 2
+    assert report["merged_categories"] == 1
+
+    drawers = (await client.get("/api/drawers")).json()
+    assert len(drawers) == 2
+    copy = next(d for d in drawers if d["drawer_id"] != drawer["drawer_id"])
+    bins = {b["content"]["title"]: b for b in copy["layers"][0]["bins"]}
+    assert bins["Résistances 10k"]["category_id"] == category["id"]
+    assert bins["Vis M3"]["width_units"] == 2
+
+    # Articles recalculés dans bin_items
+    items = (await client.get("/api/items/search", params={"q": "10x"})).json()
+    assert {i["bin_id"] for i in items} == {
+        drawer["layers"][0]["bins"][0]["bin_id"], bins["Résistances 10k"]["bin_id"],
+    }
+
+
+async def test_dry_run_writes_nothing(client):
+    await populate(client)
+    exported = (await client.get("/api/export")).content
+
+    report = (await client.post("/api/import", params={"dry_run": "true"}, content=exported)).json()
+
+    assert report["dry_run"] is True
+    assert report["counts"]["bin"] == 2
+    assert len((await client.get("/api/drawers")).json()) == 1
+
+
+async def test_import_rejects_unknown_parent(client):
+    body = b"\n".join(json.dumps(r).encode() for r in [
+        {"type": "drawer", "id": "d1", "name": "Tiroir"},
+        {"type": "layer", "id": "l1", "drawer_id": "absent", "z_index": 0},
+    ])
+    response = await client.post("/api/import", content=body)
+    assert response.status_code == 400
+    assert "Enregistrement 2" in response.json()["detail"]["error"]
+    assert (await client.get("/api/drawers")).json() == []
+
+
+@pytest.mark.skipif(not transfer.MSGPACK_AVAILABLE, reason="msgpack non installé")
+async def test_msgpack_round_trip(client):
+    await populate(client)
+    exported = (await client.get("/api/export", params={"format": "msgpack"})).content
+    response = await client.post("/api/import", params={"format": "msgpack"}, content=exported)
+    assert response.json()["counts"]["bin"] == 2
+
+
+async def test_failed_import_reports_committed_batches_only(client):
+    body = b"\n".join(json.dumps(r).encode() for r in [
+        {"type": "drawer", "id": "d1", "name": "Tiroir"},
+        {"type": "layer", "id": "l1", "drawer_id": "d1", "z_index": 0},
+        {"type": "layer", "id": "l2", "drawer_id": "d1", "z_index": 1},
+        {"type": "layer", "id": "l3", "drawer_id": "absent", "z_index": 2},
+    ])
+    async for db in app.dependency_overrides[get_db]():
+        importer = transfer.Importer(db, batch_size=2)
+        await importer.start()
+        with pytest.raises(transfer.TransferError):
+            async for record in transfer.ndjson_records(chunks(body, 7)):
+                await importer.add(record)
+        await db.rollback()
+
+    # Tiroir + 1re couche validés par le premier lot ; la 2e couche était en attente
+    assert importer.counts["layer"] == 2
+    assert (importer.committed["drawer"], importer.committed["layer"]) == (1, 1)
+    assert importer.report()["committed"] == importer.committed
+    drawers = (await client.get("/api/drawers")).json()
+    assert [len(d["layers"]) for d in drawers] == [1]
+
+
+@pytest.mark.parametrize("size", [1, 3, 64, 10_000])
+async def test_ndjson_lines_split_across_chunks(size):
+    records = [{"type": "drawer", "id": f"d{i}", "name": "é" * i} for i in range(20)]
+    body = b"\n".join(json.dumps(r, ensure_ascii=False).encode() for r in records) + b"\n\n"
+    assert [r async for r in transfer.ndjson_records(chunks(body, size))] == records
+
+
+async def test_ndjson_rejects_overlong_line(monkeypatch):
+    monkeypatch.setattr(transfer, "MAX_RECORD_BYTES", 16)
+    with pytest.raises(transfer.TransferError):
+        async for _ in transfer.ndjson_records(chunks(b'{"id": "' + b"x" * 64, 8)):
+            pass
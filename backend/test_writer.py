@@ -0,0 +1,57 @@
+"""
+Tests du coordinateur d'écriture multi-workers (verrou + génération)
+"""
+import asyncio
+
+import pytest
+
+import writer
+from conftest import create_drawer
+from database import write_coordinator
+
+
+async def test_generation_change_fires_hooks_in_other_worker(tmp_path):
+    worker_a = writer.WriteCoordinator(str(tmp_path))
+    worker_b = writer.WriteCoordinator(str(tmp_path))
+    seen = []
+    worker_b.register_invalidation_hook(seen.append)
+
+    assert worker_b.check_invalidation() is False
+    async with worker_a.write_lock():
+        generation = worker_a.bump_generation()
+
+    assert worker_b.current_generation() == generation
+    assert worker_b.check_invalidation() is True
+    assert seen == [generation]
+    assert worker_b.check_invalidation() is False
+
+
+@pytest.mark.skipif(not writer.FCNTL_AVAILABLE, reason="verrou inter-processus indisponible")
+async def test_write_lock_is_exclusive_between_workers(tmp_path):
+    worker_a = writer.WriteCoordinator(str(tmp_path))
+    worker_b = writer.WriteCoordinator(str(tmp_path))
+    order = []
+
+    async def write(coordinator, name):
+        async with coordinator.write_lock():
+            order.append(f"{name}:start")
+            await asyncio.sleep(0.05)
+            order.append(f"{name}:end")
+
+    await asyncio.gather(write(worker_a, "a"), write(worker_b, "b"))
+    assert order in (["a:start", "a:end", "b:start", "b:end"],
+                     ["b:start", "b:end", "a:start", "a:end"])
+
+
+async def test_mutations_bump_generation_reads_do_not(client):
+    before = write_coordinator.current_generation()
+    drawer = await create_drawer(client)
+    after_write = write_coordinator.current_generation()
+    assert after_write > before
+
+    await client.get(f"/api/drawers/{drawer['drawer_id']}")
+    assert write_coordinator.current_generation() == after_write
+
+    response = await client.patch("/api/bins/inconnu", json={"x_grid": 1})
+    assert response.status_code == 404
+    assert write_coordinator.current_generation() == after_write
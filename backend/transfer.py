@@ -0,0 +1,328 @@
+"""
+Export / import de l'inventaire complet en flux (NDJSON ou MessagePack).
+
+Un fichier d'export est une suite d'enregistrements {"type": ..., colonnes...},
+parents avant enfants :
+
+    header, category, drawer, layer, bin, project, project_bin
+
+  - export_stream() lit chaque table par paquets (curseur côté serveur) dans
+    une seule transaction de lecture : instantané cohérent, mémoire constante ;
+  - Importer valide chaque enregistrement au fil du flux, attribue de nouveaux
+    ids (les références sont réécrites, les catégories existantes sont
+    fusionnées par nom) et insère par lots, un commit par lot. En dry_run tout
+    est validé, rien n'est écrit.
+
+bin_items n'est pas exporté (dérivé de content["items"], recalculé à l'import).
+Les photos restent des URLs : le répertoire SCANGRID_PHOTOS_DIR se copie à part.
+
+MessagePack nécessite le paquet msgpack (optionnel).
+"""
+import datetime
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+import bin_items
+import photo_store
+import short_ids
+from models import Bin, BinItem, Category, Drawer, Layer, Project, ProjectBin
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+FORMAT = "scangrid-export"
+VERSION = 1
+BATCH = 500
+EXPORT_CHUNK = 64 * 1024
+# Taille max d'un enregistrement (une boîte avec photos inline d'un ancien export)
+MAX_RECORD_BYTES = 32 * 1024 * 1024
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "msgpack": "application/x-msgpack"}
+
+# Ordre d'export = ordre d'insertion (parents d'abord)
+TABLES = {
+    "category": Category,
+    "drawer": Drawer,
+    "layer": Layer,
+    "bin": Bin,
+    "project": Project,
+    "project_bin": ProjectBin,
+}
+
+
+class TransferError(ValueError):
+    """Flux d'import invalide (format, enregistrement, référence inconnue)"""
+
+
+# ============= EXPORT =============
+
+def encode_ndjson(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def encode_msgpack(record: Dict[str, Any]) -> bytes:
+    return msgpack.packb(record, use_bin_type=True)
+
+
+async def export_records(engine: AsyncEngine) -> AsyncIterator[Dict[str, Any]]:
+    yield {
+        "type": "header", "format": FORMAT, "version": VERSION,
+        "exported_at": datetime.datetime.utcnow().isoformat(),
+    }
+    async with engine.connect() as conn, conn.begin():
+        for kind, model in TABLES.items():
+            result = await conn.stream(
+                select(model.__table__).execution_options(yield_per=BATCH)
+            )
+            async for row in result:
+                yield {"type": kind, **row._mapping}
+
+
+async def export_stream(engine: AsyncEngine, fmt: str = "ndjson") -> AsyncIterator[bytes]:
+    """Octets du flux d'export, regroupés par ~64 Ko"""
+    encode = encode_msgpack if fmt == "msgpack" else encode_ndjson
+    buffer = bytearray()
+    async for record in export_records(engine):
+        buffer += encode(record)
+        if len(buffer) >= EXPORT_CHUNK:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+# ============= IMPORT =============
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    # Morceaux de la ligne en cours : seul le nouveau paquet est parcouru à la
+    # recherche de \n (pas de re-balayage d'une longue ligne à chaque paquet)
+    pending: List[bytes] = []
+    pending_size = 0
+    async for chunk in chunks:
+        start = 0
+        end = chunk.find(b"\n")
+        while end != -1:
+            pending.append(chunk[start:end])
+            line = b"".join(pending)
+            pending.clear()
+            pending_size = 0
+            if line.strip():
+                yield _json_line(line)
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        if start < len(chunk):
+            pending.append(chunk[start:])
+            pending_size += len(chunk) - start
+            if pending_size > MAX_RECORD_BYTES:
+                raise TransferError("Ligne NDJSON trop longue")
+    line = b"".join(pending)
+    if line.strip():
+        yield _json_line(line)
+
+
+def _json_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise TransferError(f"JSON invalide : {e}")
+
+
+async def msgpack_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    unpacker = msgpack.Unpacker(raw=False, max_buffer_size=MAX_RECORD_BYTES)
+    try:
+        async for chunk in chunks:
+            unpacker.feed(chunk)
+            for record in unpacker:
+                yield record
+    except (ValueError, msgpack.UnpackException) as e:
+        raise TransferError(f"MessagePack invalide : {e}")
+
+
+class _Record(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(..., min_length=1)
+
+
+class _CategoryRecord(_Record):
+    name: str = Field(..., min_length=1)
+    icon: Optional[str] = "ri-folder-line"
+
+
+class _DrawerRecord(_Record):
+    name: str
+    width_units: int = 10
+    depth_units: int = 10
+
+
+class _LayerRecord(_Record):
+    drawer_id: str
+    z_index: int
+
+
+class _BinRecord(_Record):
+    layer_id: str
+    category_id: Optional[str] = None
+    x_grid: int
+    y_grid: int
+    width_units: int
+    depth_units: int
+    height_units: float = 1.0
+    z_offset: float = 0.0
+    content: Optional[Dict[str, Any]] = None
+    color: Optional[str] = "#3b82f6"
+    is_hole: Optional[bool] = False
+
+
+class _ProjectRecord(_Record):
+    name: str
+    description: Optional[str] = None
+    created_at: Optional[str] = None
+
+
+class _ProjectBinRecord(_Record):
+    project_id: str
+    bin_id: str
+    qty: int = 1
+    note: Optional[str] = None
+    url: Optional[str] = None
+
+
+RECORDS = {
+    "category": _CategoryRecord,
+    "drawer": _DrawerRecord,
+    "layer": _LayerRecord,
+    "bin": _BinRecord,
+    "project": _ProjectRecord,
+    "project_bin": _ProjectBinRecord,
+}
+
+
+class Importer:
+    """
+    Import incrémental : add() par enregistrement, finish() à la fin du flux.
+    Les anciens ids sont remplacés ; self.ids[type][ancien] = nouveau.
+    """
+
+    def __init__(self, db: AsyncSession, dry_run: bool = False, batch_size: int = BATCH):
+        self.db = db
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.ids: Dict[str, Dict[str, str]] = {kind: {} for kind in TABLES}
+        # Validés (counts) / réellement écrits (committed : lots validés par commit)
+        self.counts = {kind: 0 for kind in TABLES}
+        self.committed = {kind: 0 for kind in TABLES}
+        self.merged_categories = 0
+        self.batches = 0
+        self._pending: Dict[str, List[dict]] = {kind: [] for kind in TABLES}
+        self._pending_count = 0
+        self._category_ids: Dict[str, str] = {}
+        self._position = 0
+
+    async def start(self) -> None:
+        # Noms de catégories uniques : fusion avec les catégories existantes
+        result = await self.db.execute(select(Category.id, Category.name))
+        self._category_ids = {name: cid for cid, name in result}
+
+    def _error(self, message: str) -> TransferError:
+        return TransferError(f"Enregistrement {self._position} : {message}")
+
+    def _ref(self, kind: str, old_id: str) -> str:
+        new_id = self.ids[kind].get(old_id)
+        if new_id is None:
+            raise self._error(f"{kind} {old_id!r} inconnu (doit précéder ses enfants)")
+        return new_id
+
+    async def add(self, record: Any) -> None:
+        self._position += 1
+        if not isinstance(record, dict):
+            raise self._error("objet attendu")
+        kind = record.get("type")
+        if kind == "header":
+            if record.get("format") != FORMAT or record.get("version") != VERSION:
+                raise self._error(f"en-tête non supporté ({record.get('format')} v{record.get('version')})")
+            return
+        model = RECORDS.get(kind)
+        if model is None:
+            raise self._error(f"type inconnu {kind!r}")
+        try:
+            row = model.model_validate(record).model_dump()
+        except ValidationError as e:
+            raise self._error(f"{kind} invalide : {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+
+        old_id = row["id"]
+        if old_id in self.ids[kind]:
+            raise self._error(f"{kind} {old_id!r} en double")
+
+        if kind == "category":
+            existing = self._category_ids.get(row["name"])
+            if existing is not None:
+                self.ids[kind][old_id] = existing
+                self.merged_categories += 1
+                return
+        elif kind == "layer":
+            row["drawer_id"] = self._ref("drawer", row["drawer_id"])
+        elif kind == "bin":
+            row["layer_id"] = self._ref("layer", row["layer_id"])
+            if row["category_id"] is not None:
+                row["category_id"] = self._ref("category", row["category_id"])
+            if not self.dry_run:
+                row["content"] = await photo_store.externalize_async(row["content"])
+        elif kind == "project":
+            row["created_at"] = row["created_at"] or datetime.datetime.utcnow().isoformat()
+        elif kind == "project_bin":
+            row["project_id"] = self._ref("project", row["project_id"])
+            # Référence souple : une boîte absente de l'export garde son id
+            row["bin_id"] = self.ids["bin"].get(row["bin_id"], row["bin_id"])
+
+        row["id"] = self.ids[kind][old_id] = short_ids.new_id()
+        if kind == "category":
+            self._category_ids[row["name"]] = row["id"]
+        self.counts[kind] += 1
+        if self.dry_run:
+            return
+        self._pending[kind].append(row)
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending_count:
+            return
+        written = {}
+        for kind, model in TABLES.items():
+            rows = self._pending[kind]
+            if not rows:
+                continue
+            written[kind] = len(rows)
+            await self.db.execute(insert(model.__table__), rows)
+            if kind == "bin":
+                items = [item for row in rows for item in bin_items.item_rows(row["id"], row["content"])]
+                if items:
+                    await self.db.execute(insert(BinItem.__table__), items)
+            rows.clear()
+        self._pending_count = 0
+        await self.db.commit()
+        self.batches += 1
+        for kind, count in written.items():
+            self.committed[kind] += count
+
+    async def finish(self) -> dict:
+        await self._flush()
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "counts": self.counts,
+            "committed": self.committed,
+            "merged_categories": self.merged_categories,
+            "batches": self.batches,
+        }
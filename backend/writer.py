@@ -0,0 +1,158 @@
+"""
+Coordination des écritures entre workers uvicorn (mode multi-processus).
+
+SQLite n'accepte qu'un écrivain à la fois : avec plusieurs workers, deux PATCH
+simultanés finissent en "database is locked". Toutes les mutations passent donc
+par un verrou unique :
+  - un asyncio.Lock sérialise les écritures du processus courant ;
+  - un verrou fcntl.flock sur un fichier du répertoire de la base sérialise
+    les processus entre eux (pris dans un thread pour ne pas bloquer la boucle).
+
+Les lectures ne prennent aucun verrou (journal WAL, cf. database.py).
+
+Invalidation inter-processus : un compteur de génération (8 octets, mmap)
+est incrémenté après chaque écriture validée. Chaque worker compare la valeur
+au début des requêtes et appelle les crochets enregistrés par ses caches
+(register_invalidation_hook) quand un autre worker a écrit. Les écritures du
+worker courant n'appellent pas les crochets : l'endpoint qui écrit invalide
+lui-même ce qu'il a modifié (instantané, cache de réponses par étiquette).
+"""
+import asyncio
+import logging
+import mmap
+import os
+import struct
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows : verrou limité au processus courant
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+WORKERS = max(1, int(os.getenv("SCANGRID_WORKERS", "1")))
+
+LOCK_FILENAME = ".scangrid-write.lock"
+GENERATION_FILENAME = ".scangrid-generation"
+_GEN = struct.Struct("<Q")
+
+
+class WriteCoordinator:
+    """Verrou d'écriture unique (processus + threads) et compteur de génération"""
+
+    def __init__(self, db_dir: str):
+        self.lock_path = os.path.join(db_dir, LOCK_FILENAME)
+        self.generation_path = os.path.join(db_dir, GENERATION_FILENAME)
+        self._lock = asyncio.Lock()
+        self._lock_fd: Optional[int] = None
+        self._gen_map: Optional[mmap.mmap] = None
+        self._seen_generation = 0
+        self._hooks: List[Callable[[int], None]] = []
+
+    # ---- Fichiers partagés (ouverts à la première utilisation) ----
+
+    def _fd(self) -> int:
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._lock_fd
+
+    def _generation_map(self) -> mmap.mmap:
+        if self._gen_map is None:
+            fd = os.open(self.generation_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < _GEN.size:
+                    os.ftruncate(fd, _GEN.size)
+                self._gen_map = mmap.mmap(fd, _GEN.size)
+            finally:
+                os.close(fd)
+            self._seen_generation = _GEN.unpack_from(self._gen_map)[0]
+        return self._gen_map
+
+    # ---- Verrou d'écriture ----
+
+    async def _acquire_file_lock(self) -> None:
+        fd = self._fd()
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            pass
+        # Un autre worker écrit : attente bloquante dans un thread. En cas
+        # d'annulation on attend quand même le verrou pour le relâcher proprement.
+        task = asyncio.ensure_future(asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX))
+        cancelled = False
+        while not task.done():
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                cancelled = True
+        task.result()
+        if cancelled:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            raise asyncio.CancelledError()
+
+    @asynccontextmanager
+    async def write_lock(self):
+        """Section critique d'écriture, exclusive entre tous les workers"""
+        async with self._lock:
+            if FCNTL_AVAILABLE:
+                await self._acquire_file_lock()
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(self._fd(), fcntl.LOCK_UN)
+
+    # ---- Génération / invalidation ----
+
+    def current_generation(self) -> int:
+        return _GEN.unpack_from(self._generation_map())[0]
+
+    def bump_generation(self) -> int:
+        """À appeler sous write_lock() après un commit : invalide les caches de tous les workers"""
+        gen_map = self._generation_map()
+        current = _GEN.unpack_from(gen_map)[0]
+        if current != self._seen_generation:
+            # Écriture d'un autre worker pas encore vue par ce processus
+            self._fire(current)
+        generation = current + 1
+        _GEN.pack_into(gen_map, 0, generation)
+        self._seen_generation = generation
+        return generation
+
+    def register_invalidation_hook(self, hook: Callable[[int], None]) -> None:
+        """hook(generation) est appelé quand une écriture d'un autre worker est détectée"""
+        self._hooks.append(hook)
+
+    def check_invalidation(self) -> bool:
+        """Compare la génération partagée à la dernière vue. True si les caches ont été invalidés."""
+        generation = self.current_generation()
+        if generation == self._seen_generation:
+            return False
+        self._fire(generation)
+        return True
+
+    def _fire(self, generation: int) -> None:
+        self._seen_generation = generation
+        for hook in self._hooks:
+            try:
+                hook(generation)
+            except Exception:
+                logger.exception("❌ Crochet d'invalidation en échec")
+
+
+class InvalidationMiddleware:
+    """Middleware ASGI : vérifie le compteur de génération avant chaque requête"""
+
+    def __init__(self, app, coordinator: WriteCoordinator):
+        self.app = app
+        self.coordinator = coordinator
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.coordinator.check_invalidation()
+        await self.app(scope, receive, send)
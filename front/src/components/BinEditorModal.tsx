@@ -2,7 +2,7 @@ import { useState, useEffect, useRef } from 'react';
 import { motion } from 'framer-motion';
 import type { Bin, BinContent } from '../types/api';
 import { useStore } from '../store/useStore';
-import { apiClient } from '../services/api';
+import { apiClient, photoThumbnailUrl } from '../services/api';
 
 import { IconPicker } from './IconPicker';
 
@@ -215,14 +215,6 @@ export default function BinEditorModal({ bin, onClose, onSave, onDelete }: BinEd
     }
   };
 
-  const readFileAsDataUrl = (file: File): Promise<string> =>
-    new Promise((resolve, reject) => {
-      const reader = new FileReader();
-      reader.onload = () => resolve(String(reader.result || ''));
-      reader.onerror = () => reject(new Error('read_error'));
-      reader.readAsDataURL(file);
-    });
-
   const handleUploadPhotoFiles = async (e: any) => {
     const files = Array.from((e.target?.files || []) as File[]);
     if (files.length === 0) return;
@@ -235,8 +227,9 @@ export default function BinEditorModal({ bin, onClose, onSave, onDelete }: BinEd
     }
 
     try {
-      const encoded = await Promise.all(imageFiles.map(readFileAsDataUrl));
-      setPhotos((prev) => [...prev, ...encoded.filter(Boolean)]);
+      // Stockées côté serveur : le contenu de la boîte ne garde que l'URL
+      const uploaded = await Promise.all(imageFiles.map((file) => apiClient.uploadPhoto(file)));
+      setPhotos((prev) => [...prev, ...uploaded.map((photo) => photo.url)]);
     } catch (error) {
       console.error('Erreur upload photo locale:', error);
       alert("Impossible d'importer une ou plusieurs images.");
@@ -670,7 +663,7 @@ export default function BinEditorModal({ bin, onClose, onSave, onDelete }: BinEd
                 >
                   <div className="flex items-center gap-3">
                     <img
-                      src={photo}
+                      src={photoThumbnailUrl(photo)}
                       alt={`Photo ${index + 1}`}
                       className="w-20 h-20 object-cover rounded-lg"
                       onError={(e) => {
@@ -167,6 +167,18 @@ class ApiClient {
     });
   }
 
+  async uploadPhoto(file: File): Promise<{ id: string; url: string; thumbnail_url: string }> {
+    const formData = new FormData();
+    formData.append('file', file);
+    const url = `${this.baseUrl}/photos`;
+    const response = await fetch(url, { method: 'POST', body: formData });
+    if (!response.ok) {
+      const err = await response.json().catch(() => ({ detail: response.statusText }));
+      throw new Error(err.detail || 'Erreur import photo');
+    }
+    return response.json();
+  }
+
   async extractPDFText(file: File): Promise<{ lines: string[]; raw_text: string; page_count: number }> {
     const formData = new FormData();
     formData.append('file', file);
@@ -183,6 +195,8 @@ class ApiClient {
     components: { designation: string; qty: number; reference: string; package: string }[];
     raw_response: string;
     model: string;
+    lines?: { line: string; path: 'rules' | 'llm' | 'ignored' | 'unresolved' }[];
+    stats?: Record<string, number>;
   }> {
     return this.request('/bom/ai-parse', {
       method: 'POST',
@@ -237,3 +251,10 @@ class ApiClient {
 
 export const apiClient = new ApiClient();
 
+/**
+ * URL d'affichage d'une photo : la miniature pour les photos du store
+ * (/api/photos/<id>), l'URL telle quelle sinon (liens externes)
+ */
+export const photoThumbnailUrl = (url: string): string =>
+  /^\/api\/photos\/[0-9a-f]{64}$/.test(url) ? `${url}/thumb` : url;
+
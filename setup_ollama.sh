@@ -114,7 +114,7 @@ ollama list
 
 echo ""
 echo "🔗 Prochaines étapes:"
-echo "   1. Vérifiez que le backend a ollama installé: cd backend && pip install ollama"
+echo "   1. Réglez SCANGRID_OLLAMA_MODEL (et SCANGRID_OLLAMA_WARMUP=1) dans backend/.env si besoin"
 echo "   2. Redémarrez ScanGRID: ./launch.sh ou pm2 reload ecosystem.config.js"
 echo "   3. Testez l'amélioration de description dans l'interface web"
 echo ""